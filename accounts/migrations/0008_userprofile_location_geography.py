@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_is_subscribed'),
+    ]
+
+    operations = [
+        # geometry -> geography keeps the GiST index, distances and radius lookups become meters on the spheroid
+        migrations.AlterField(
+            model_name='userprofile',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, geography=True, null=True, srid=4326),
+        ),
+    ]
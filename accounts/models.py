@@ -88,7 +88,8 @@ class UserProfile(models.Model):
     latitude = models.CharField(max_length=20, blank=True, null=True)
     longitude = models.CharField(max_length=20, blank=True, null=True)
 
-    location = gismodels.PointField(blank=True, null=True, srid=4326)
+    # geography with the default GiST spatial index, used by the nearest vendor (KNN) queries
+    location = gismodels.PointField(blank=True, null=True, srid=4326, geography=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
@@ -98,7 +99,7 @@ class UserProfile(models.Model):
 
     def save(self, *args, **kwargs):
         if self.longitude and self.latitude:
-            self.location = Point(float(self.longitude), float(self.latitude))
+            self.location = Point(float(self.longitude), float(self.latitude), srid=4326)
 
         return super(UserProfile, self).save(*args, **kwargs)
 
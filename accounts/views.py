@@ -1,8 +1,7 @@
-from datetime import datetime
-
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
 from django.contrib import messages, auth
+from django.utils import timezone
 
 from accounts.forms import UserForm
 from accounts.models import UserProfile
@@ -11,7 +10,8 @@ from accounts.services import send_reset_password_email, set_new_password, valid
 from accounts.services.user_subscription_service import send_activate_subscription_email, activate_subscription
 from accounts.utils import detect_user_role, redirect_if_authorized
 from marketplace.services.vendor_detail_service import check_if_vendor_could_be_listed
-from orders.models import Order
+from orders.models import Order, VendorOrder
+from orders.services.vendor_stats_service import get_vendor_dashboard_stats
 from vendors.forms import VendorForm
 from vendors.models import Vendor
 
@@ -118,17 +118,11 @@ def vendor_dashboard(request):
     """Represent vendor dashboard"""
 
     vendor = Vendor.objects.get(user=request.user)
-    orders = Order.objects.filter(vendor__in=[vendor.id], is_ordered=True).order_by('-created_at')
-    recent_orders = orders[:10]
-    current_day_orders = Order.objects.current_day_orders_by_vendor(vendor_pk=vendor.pk, today=datetime.today())
-    day_revenue = Order.objects.get_total_revenue(current_day_orders, vendor_id=vendor.pk)
-    current_month_orders = Order.objects.current_month_orders_by_vendor(vendor_pk=vendor.pk, today=datetime.today())
-    month_revenue = Order.objects.get_total_revenue(current_month_orders, vendor_id=vendor.pk)
+    recent_orders = VendorOrder.objects.paid_orders_by_vendor(vendor.pk).select_related('order').order_by(
+        '-created_at')[:10]
     context = {
-        'orders_count': orders.count(),
         'recent_orders': recent_orders,
-        'day_revenue': day_revenue,
-        'month_revenue': month_revenue,
+        **get_vendor_dashboard_stats(vendor_id=vendor.pk, today=timezone.localdate()),
     }
     warnings = check_if_vendor_could_be_listed(vendor_id=vendor.id)
     if warnings:
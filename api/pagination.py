@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OrderCursorPagination(CursorPagination):
+    """Newest first pages of orders, cut by created_at so no page needs a COUNT or an OFFSET scan"""
+
+    page_size = 50
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
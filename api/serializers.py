@@ -1,4 +1,3 @@
-import json
 from abc import ABC
 
 from django.contrib.auth import authenticate
@@ -10,10 +9,13 @@ from rest_framework.exceptions import ValidationError
 from accounts.models import User, UserProfile
 from accounts.services import send_reset_password_email
 from accounts.services.user_registration_service import register_new_customer, register_new_vendor
+from food_marketplace.money import format_amounts
 from marketplace.models import Cart
+from marketplace.services.cart_manipulation_services import apply_cart_operations
+from marketplace.services.cart_storage_service import get_cart_storage, flush_cart, CART_OPERATIONS
 from menu.models import FoodItem
-from orders.models import Order, Payment, OrderedFood
-from orders.services.order_creation_service import get_order_data_by_vendor
+from orders.models import Order, Payment, OrderedFood, VendorOrder
+from orders.services.order_creation_service import get_vendor_order_amounts
 from vendors.models import Vendor
 
 
@@ -124,11 +126,12 @@ class RestaurantSerializer(serializers.ModelSerializer):
     latitude = serializers.CharField(source='user_profile.latitude', read_only=True)
     longitude = serializers.CharField(source='user_profile.longitude', read_only=True)
     vendor_slug = serializers.CharField(read_only=True)
+    is_open = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Vendor
         fields = ['vendor_name', 'latitude', 'longitude', 'pin_code', 'city', 'state',
-                  'address', 'restaurant_picture_url', 'vendor_slug']
+                  'address', 'restaurant_picture_url', 'vendor_slug', 'is_open']
 
     def get_restaurant_picture_url(self, Vendor):
         request = self.context.get('request')
@@ -174,6 +177,22 @@ class FoodItemSerializer(serializers.ModelSerializer):
         return request.build_absolute_uri(image_url)
 
 
+class SearchQuerySerializer(serializers.Serializer):
+
+    q = serializers.CharField(max_length=100)
+    options = serializers.ChoiceField(choices=['vendor', 'fooditem', 'all'], default='all')
+    open_now = serializers.BooleanField(default=False)
+
+
+class SearchResultSerializer(RestaurantSerializer):
+
+    rank = serializers.FloatField(read_only=True)
+    matching_dishes = FoodItemSerializer(many=True, read_only=True)
+
+    class Meta(RestaurantSerializer.Meta):
+        fields = RestaurantSerializer.Meta.fields + ['rank', 'matching_dishes']
+
+
 class ReadCartSerializer(serializers.ModelSerializer):
 
     quantity = serializers.IntegerField()
@@ -195,19 +214,25 @@ class CartCreateSerializer(serializers.ModelSerializer):
     quantity = serializers.IntegerField(required=True)
 
     def update(self, instance, validated_data):
-        instance.quantity = validated_data.get('quantity', instance.quantity)
-        instance.save()
+        instance.quantity = get_cart_storage().set(
+            user_id=instance.user_id,
+            fooditem_id=instance.fooditem_id,
+            quantity=validated_data.get('quantity', instance.quantity)
+        )
         return instance
 
     def create(self, validated_data):
-        try:
-            instance = Cart.objects.get(user=validated_data['user'], fooditem=validated_data['fooditem'])
-            instance.quantity = validated_data.get('quantity', instance.quantity)
-            instance.save()
-            return instance
-        except Exception:
-            instance = Cart.objects.get(**validated_data)
-            return instance
+        storage = get_cart_storage()
+        if storage.keeps_items_in_database:
+            return Cart.objects.set_item(
+                user_id=validated_data['user'].pk,
+                fooditem_id=validated_data['fooditem'].pk,
+                quantity=validated_data['quantity']
+            )
+        storage.set(user_id=validated_data['user'].pk, fooditem_id=validated_data['fooditem'].pk,
+                    quantity=validated_data['quantity'])
+        flush_cart(user_id=validated_data['user'].pk)
+        return Cart.objects.get(user=validated_data['user'], fooditem=validated_data['fooditem'])
 
     class Meta:
         model = Cart
@@ -215,6 +240,31 @@ class CartCreateSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class CartOperationSerializer(serializers.Serializer):
+
+    operation = serializers.ChoiceField(choices=CART_OPERATIONS)
+    fooditem = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=1)
+
+
+class CartBulkSerializer(serializers.Serializer):
+
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=200)
+
+    def validate_operations(self, operations):
+        fooditem_ids = {operation['fooditem'] for operation in operations}
+        existing_ids = set(FoodItem.objects.filter(pk__in=fooditem_ids).values_list('pk', flat=True))
+        missing_ids = fooditem_ids - existing_ids
+        if missing_ids:
+            raise ValidationError(f'Food items do not exist: {sorted(missing_ids)}')
+        return operations
+
+    def save(self, user_id: int) -> dict:
+        operations = [(operation['operation'], operation['fooditem'], operation['quantity'])
+                      for operation in self.validated_data['operations']]
+        return apply_cart_operations(user_id=user_id, operations=operations)
+
+
 class ProfileSerializer(serializers.ModelSerializer):
 
     profile_picture = serializers.ImageField(write_only=True)
@@ -361,6 +411,8 @@ class CustomerProfileSerializer(serializers.ModelSerializer):
 
 class CustomerOrderShortInfoSerializer(serializers.ModelSerializer):
 
+    total = serializers.CharField(read_only=True)
+
     class Meta:
         model = Order
         fields = ['order_number', 'created_at', 'total', 'status']
@@ -368,15 +420,19 @@ class CustomerOrderShortInfoSerializer(serializers.ModelSerializer):
 
 class VendorOrderShortInfoSerializer(serializers.ModelSerializer):
 
-    total = serializers.SerializerMethodField()
+    order_number = serializers.CharField(source='order.order_number')
+    total = serializers.CharField(read_only=True)
 
     class Meta:
-        model = Order
+        model = VendorOrder
         fields = ['order_number', 'created_at', 'total', 'status']
 
-    def get_total(self, order):
-        order_amounts = get_order_data_by_vendor(order_number=order.order_number, vendor_id=self.context['vendor_pk'])
-        return order_amounts['total']
+
+class VendorOrderFilterSerializer(serializers.Serializer):
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=Order.STATUS, required=False)
 
 
 class OrderedFoodSerializer(serializers.ModelSerializer):
@@ -384,6 +440,7 @@ class OrderedFoodSerializer(serializers.ModelSerializer):
     vendor = serializers.StringRelatedField(source='fooditem.vendor')
     image = serializers.ImageField(source='fooditem.image')
     food_title = serializers.CharField(source='fooditem.food_title')
+    price = serializers.CharField(read_only=True)
 
     class Meta:
         model = OrderedFood
@@ -427,21 +484,17 @@ class ABCOrderFullInfoSerializer(serializers.ModelSerializer):
 class CustomerOrderFullInfoSerializer(ABCOrderFullInfoSerializer):
 
     def get_order_amounts(self, order) -> dict:
-        taxes = json.loads(order.tax_data)
         order_amounts = {
-            'subtotal': order.total - order.total_tax,
+            'subtotal': order.subtotal,
             'total_tax': order.total_tax,
             'total': order.total,
-            'taxes': taxes
+            'taxes': order.get_tax_dict()
         }
-        return order_amounts
+        return format_amounts(order_amounts)
 
     def get_ordered_food(self, order) -> list:
-        ordered_food = []
-        ordered_food_query = OrderedFood.objects.filter(order=order)
-        for item in ordered_food_query:
-            ordered_food.append(OrderedFoodSerializer(instance=item).data)
-        return ordered_food
+        # ordered_food_items is prefetched with fooditem__vendor by the view
+        return OrderedFoodSerializer(order.ordered_food_items, many=True).data
 
 
 class VendorOrderFullInfoSerializer(ABCOrderFullInfoSerializer):
@@ -449,16 +502,12 @@ class VendorOrderFullInfoSerializer(ABCOrderFullInfoSerializer):
     order_amounts = serializers.SerializerMethodField()
     ordered_food = serializers.SerializerMethodField()
 
+    # vendor_parts and vendor_ordered_food are prefetched for the requesting vendor by the view
+
     def get_order_amounts(self, order) -> dict:
-        order_amounts = get_order_data_by_vendor(order_number=order.order_number, vendor_id=self.context['vendor_pk'])
-        return order_amounts
+        return format_amounts(get_vendor_order_amounts(order.vendor_parts[0]))
 
     def get_ordered_food(self, order) -> list:
-        vendor_id = self.context['vendor_pk']
-        ordered_food = []
-        ordered_food_query = OrderedFood.objects.filter(order=order, fooditem__vendor__pk=vendor_id)
-        for item in ordered_food_query:
-            ordered_food.append(OrderedFoodSerializer(instance=item).data)
-        return ordered_food
+        return OrderedFoodSerializer(order.vendor_ordered_food, many=True).data
 
 
@@ -1,3 +1,73 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from food_marketplace.money import Money
+from food_marketplace.testing import create_category, create_customer, create_fooditem, create_vendor
+from orders.models import Order, OrderedFood, Payment, VendorOrder
+
+
+class OrderApiQueryCountTest(TestCase):
+    """Order endpoints must run a constant number of queries whatever the page size or order size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendors = []
+        fooditems = []
+        for i in range(2):
+            vendor = create_vendor(i)
+            category = create_category(vendor, slug=f'pizza-{i}')
+            for j in range(4):
+                fooditems.append(create_fooditem(vendor, category, f'Food {j}', slug=f'food-{i}-{j}'))
+            cls.vendors.append(vendor)
+
+        cls.customer = create_customer()
+
+        cls.orders = []
+        for i in range(60):
+            payment = Payment.objects.create(user=cls.customer, transaction_id=f'transaction-{i}',
+                                             payment_method='PayPal', amount='20.00', status='COMPLETED')
+            order = Order.objects.create(user=cls.customer, payment=payment, order_number=f'20261018{i:012d}',
+                                         first_name='Customer', last_name='0', phone='123',
+                                         email='customer@example.com', address='Street', city='City',
+                                         total=Money(2000), total_tax=Money(0), tax_data={}, payment_method='PayPal',
+                                         is_ordered=True)
+            for vendor in cls.vendors:
+                VendorOrder.objects.create(order=order, vendor=vendor, subtotal=Money(1000), total_tax=Money(0),
+                                           total=Money(1000), created_at=order.created_at)
+            # the first order has a single item, every other one has all of them
+            for fooditem in fooditems[:1] if i == 0 else fooditems:
+                OrderedFood.objects.create(order=order, payment=payment, user=cls.customer, fooditem=fooditem,
+                                           quantity=1, price=Money(500), amount=Money(500))
+            cls.orders.append(order)
+
+    def _count_queries(self, user, url) -> int:
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, msg=response.content)
+        return len(queries)
+
+    def test_customer_orders_page(self):
+        url = '/api/customers/customer/orders/'
+        self.assertEqual(self._count_queries(self.customer, f'{url}?page_size=5'),
+                         self._count_queries(self.customer, f'{url}?page_size=50'))
+
+    def test_vendor_orders_page(self):
+        vendor = self.vendors[0]
+        url = f'/api/vendors/{vendor.vendor_slug}/orders/'
+        self.assertEqual(self._count_queries(vendor.user, f'{url}?page_size=5'),
+                         self._count_queries(vendor.user, f'{url}?page_size=50'))
+
+    def test_customer_order_detail(self):
+        url = '/api/customers/customer/orders/{}/'
+        self.assertEqual(self._count_queries(self.customer, url.format(self.orders[0].order_number)),
+                         self._count_queries(self.customer, url.format(self.orders[1].order_number)))
+
+    def test_vendor_order_detail(self):
+        vendor = self.vendors[0]
+        url = f'/api/vendors/{vendor.vendor_slug}/orders/{{}}/'
+        self.assertEqual(self._count_queries(vendor.user, url.format(self.orders[0].order_number)),
+                         self._count_queries(vendor.user, url.format(self.orders[1].order_number)))
@@ -2,13 +2,14 @@ from django.urls import path
 from rest_framework import routers
 
 from api.views import TokenAuthenticationViewSet, UsersViewSet, RestaurantsViewSet, CartViewSet, \
-    FoodItemsViewSet, ProfileViewSet, CustomerOrdersViewSet, VendorOrdersViewSet
+    FoodItemsViewSet, ProfileViewSet, CustomerOrdersViewSet, VendorOrdersViewSet, SearchViewSet
 
 router = routers.SimpleRouter()
 router.register(prefix='auth', viewset=TokenAuthenticationViewSet, basename='auth')
 router.register(prefix='users', viewset=UsersViewSet, basename='users')
 router.register(prefix='restaurants', viewset=RestaurantsViewSet, basename='restaurants')
 router.register(prefix='fooditems', viewset=FoodItemsViewSet, basename='fooditems')
+router.register(prefix='search', viewset=SearchViewSet, basename='search')
 
 
 customer_urlpaterns = [
@@ -18,6 +19,7 @@ customer_urlpaterns = [
             {'get': 'profile', 'put': 'profile', 'patch': 'profile'})
          ),
     path('customers/<str:username>/my_cart/', CartViewSet.as_view({'get': 'list'})),
+    path('customers/<str:username>/my_cart/bulk/', CartViewSet.as_view({'post': 'bulk'})),
     path('customers/<str:username>/my_cart/<int:pk>/', CartViewSet.as_view(
         {'get': 'retrieve', 'delete': 'destroy', 'put': 'update'})
          ),
@@ -1,5 +1,7 @@
 import rest_framework.status
 from django.contrib import auth
+from django.db.models import Prefetch
+from django.http import Http404
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
@@ -11,16 +13,22 @@ from rest_framework import status, mixins
 
 from accounts.models import UserProfile
 from api.filters import filter_fooditems
+from api.pagination import OrderCursorPagination
 from api.permissions import IsOwner, IsCustomerAccountOwner, IsCustomer, IsVendor, IsVendorAccountOwner
 from api.serializers import CustomAuthTokenSerializer, VendorCreateSerializer, UserCreateSerializer, \
     ForgetPasswordFormSerializer, RestaurantSerializer, FoodItemSerializer, ReadCartSerializer, CartCreateSerializer, \
     CustomerProfileSerializer, VendorProfileSerializer, CustomerOrderShortInfoSerializer, \
     CustomerOrderFullInfoSerializer, \
-    VendorOrderFullInfoSerializer, VendorOrderShortInfoSerializer
+    VendorOrderFullInfoSerializer, VendorOrderShortInfoSerializer, CartBulkSerializer, VendorOrderFilterSerializer, \
+    SearchQuerySerializer, SearchResultSerializer
 from marketplace.models import Cart
-from marketplace.services.cart_manipulation_services import get_cart_amounts
+from marketplace.services.cart_manipulation_services import get_cart_amounts, get_live_cart_items
+from marketplace.services.cart_storage_service import flush_cart, get_cart_storage
+from marketplace.services.search_backend_service import get_search_backend
 from menu.models import FoodItem
-from orders.models import Order
+from orders.models import Order, OrderedFood, VendorOrder
+from orders.services.order_archive_service import get_archived_order
+from orders.services.vendor_order_list_service import filter_vendor_orders
 from vendors.models import Vendor
 
 
@@ -96,7 +104,10 @@ class RestaurantsViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin, Gener
         vendor_slug = self.kwargs.get('vendor_slug')
         if vendor_slug:
             return Vendor.objects.get(vendor_slug=vendor_slug)
-        return Vendor.objects.valid_vendors()
+        vendors = Vendor.objects.valid_vendors().select_related('user_profile')
+        if self.request.query_params.get('open_now') in ('true', '1'):
+            vendors = vendors.open_now()
+        return vendors
 
     def get_serializer_class(self):
         if self.action == 'fooditems':
@@ -105,6 +116,19 @@ class RestaurantsViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin, Gener
             return RestaurantSerializer
 
 
+class SearchViewSet(ViewSet):
+
+    def list(self, request):
+        query = SearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        options = query.validated_data['options']
+        vendors = get_search_backend().search(query.validated_data['q'], match_vendors=options != 'fooditem',
+                                              match_dishes=options != 'vendor',
+                                              open_now=query.validated_data['open_now'])
+        serializer = SearchResultSerializer(vendors, many=True, context={'request': request})
+        return Response({'results': serializer.data})
+
+
 class FoodItemsViewSet(mixins.RetrieveModelMixin, GenericViewSet):
 
     serializer_class = FoodItemSerializer
@@ -121,13 +145,15 @@ class CartViewSet(mixins.DestroyModelMixin, mixins.CreateModelMixin, mixins.Upda
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        storage = get_cart_storage()
+        if not storage.keeps_items_in_database:
+            # the Cart row lags behind the live cart until it is flushed
+            instance.quantity = storage.get_items(instance.user_id).get(instance.fooditem_id, 0)
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer_class()(data=queryset, many=True, context={'request': request})
-        serializer.is_valid()
+        serializer = self.get_serializer(get_live_cart_items(user_id=request.user.pk), many=True)
         amounts = get_cart_amounts(user_id=request.user.pk)
         return Response(data={'carts': serializer.data, 'cart_amounts': amounts})
 
@@ -137,11 +163,19 @@ class CartViewSet(mixins.DestroyModelMixin, mixins.CreateModelMixin, mixins.Upda
         else:
             return CartCreateSerializer
 
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        serializer = CartBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        response = serializer.save(user_id=request.user.pk)
+        return Response(data=response)
+
+    def perform_destroy(self, instance):
+        get_cart_storage().remove(user_id=instance.user_id, fooditem_id=instance.fooditem_id)
+        flush_cart(user_id=instance.user_id)
+
     def get_queryset(self):
-        if self.action == 'list':
-            return Cart.objects.filter(user=self.request.user)
-        else:
-            return Cart.objects.all()
+        return Cart.objects.all()
 
 
 class ProfileViewSet(GenericViewSet, mixins.RetrieveModelMixin):
@@ -198,6 +232,7 @@ class CustomerOrdersViewSet(GenericViewSet, mixins.RetrieveModelMixin, mixins.Li
 
     lookup_field = 'order_number'
     permission_classes = [IsAuthenticated, IsCustomer, IsCustomerAccountOwner]
+    pagination_class = OrderCursorPagination
 
     def get_serializer_class(self):
 
@@ -208,10 +243,23 @@ class CustomerOrdersViewSet(GenericViewSet, mixins.RetrieveModelMixin, mixins.Li
 
     def get_queryset(self):
 
-        return Order.objects.filter(user=self.request.user)
+        orders = Order.objects.filter(user=self.request.user)
+        if self.kwargs.get('order_number'):
+            orders = orders.select_related('payment').prefetch_related(
+                Prefetch('ordered_food', queryset=OrderedFood.objects.select_related('fooditem__vendor'),
+                         to_attr='ordered_food_items')
+            )
+        return orders
 
     def get_object(self):
-        obj = get_object_or_404(self.get_queryset(), order_number=self.kwargs.get('order_number')).order_by('-created_at')
+        order_number = self.kwargs.get('order_number')
+        obj = self.get_queryset().filter(order_number=order_number).first()
+        if obj is None:
+            archived_order = get_archived_order(order_number, user_id=self.request.user.pk)
+            if archived_order is None:
+                raise Http404
+            obj = archived_order.order
+            obj.ordered_food_items = archived_order.ordered_food
         self.check_object_permissions(self.request, obj)
         return obj
 
@@ -220,25 +268,47 @@ class VendorOrdersViewSet(GenericViewSet, mixins.ListModelMixin):
 
     lookup_field = 'order_number'
     permission_classes = [IsAuthenticated, IsVendor, IsVendorAccountOwner]
+    pagination_class = OrderCursorPagination
 
     def list(self, request, *args, **kwargs):
         vendor = Vendor.objects.get(vendor_slug=self.kwargs['vendor_slug'])
-        queryset = self.get_queryset()
-        serializer = self.get_serializer_class()(queryset, many=True, context={'vendor_pk': vendor.pk})
-        return Response(serializer.data)
+        filters = VendorOrderFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+        vendor_orders = filter_vendor_orders(vendor_id=vendor.pk, **filters.validated_data)
+
+        page = self.paginate_queryset(vendor_orders)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def retrieve(self, request, *args, **kwargs):
-        vendor = Vendor.objects.get(vendor_slug=self.kwargs['vendor_slug'])
         instance = self.get_object()
-        serializer = self.get_serializer(instance, context={'vendor_pk': vendor.pk})
+        serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
     def get_queryset(self):
 
-        return Order.objects.filter(vendor__vendor_slug__in=[self.kwargs['vendor_slug']]).order_by('-created_at')
+        vendor_slug = self.kwargs['vendor_slug']
+        return Order.objects.filter(vendor_orders__vendor__vendor_slug=vendor_slug).select_related(
+            'payment'
+        ).prefetch_related(
+            Prefetch('vendor_orders', queryset=VendorOrder.objects.filter(vendor__vendor_slug=vendor_slug),
+                     to_attr='vendor_parts'),
+            Prefetch('ordered_food', to_attr='vendor_ordered_food',
+                     queryset=OrderedFood.objects.filter(fooditem__vendor__vendor_slug=vendor_slug).select_related(
+                         'fooditem__vendor')),
+        )
 
     def get_object(self):
-        obj = get_object_or_404(self.get_queryset(), order_number=self.kwargs.get('order_number'))
+        order_number = self.kwargs.get('order_number')
+        obj = self.get_queryset().filter(order_number=order_number).first()
+        if obj is None:
+            vendor = get_object_or_404(Vendor, vendor_slug=self.kwargs['vendor_slug'])
+            archived_order = get_archived_order(order_number, vendor_id=vendor.pk)
+            if archived_order is None:
+                raise Http404
+            obj = archived_order.order
+            obj.vendor_parts = [archived_order.get_vendor_order(vendor.pk)]
+            obj.vendor_ordered_food = archived_order.get_ordered_food_by_vendor(vendor.pk)
         self.check_object_permissions(self.request, obj)
         return obj
 
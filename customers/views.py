@@ -1,12 +1,13 @@
-import json
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db import IntegrityError
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
 from accounts.forms import UserProfileForm, UserInfoForm
 from accounts.models import UserProfile
 from accounts.utils import check_role_customer
 from orders.models import Order, OrderedFood
+from orders.services.order_archive_service import get_archived_order
 
 
 @login_required()
@@ -46,19 +47,23 @@ def my_orders(request):
 @login_required()
 @user_passes_test(check_role_customer)
 def order_details(request, order_number):
-    order = Order.objects.get(order_number=order_number, is_ordered=True)
-    if order.user != request.user:
+    order = Order.objects.filter(order_number=order_number, is_ordered=True).first()
+    if order is not None:
+        ordered_food = OrderedFood.objects.filter(order=order)
+    else:
+        archived_order = get_archived_order(order_number)
+        if archived_order is None:
+            raise Http404
+        order, ordered_food = archived_order.order, archived_order.ordered_food
+
+    if order.user_id != request.user.pk:
         return redirect('my-account')
     else:
-        ordered_food = OrderedFood.objects.filter(order=order)
-        total = order(order.total, 2)
-        subtotal = round((total - order.total_tax), 2)
-        taxes = json.loads(order.tax_data)
         context = {
             'order': order,
             'ordered_food': ordered_food,
-            'total': total,
-            'subtotal': subtotal,
-            'taxes': taxes,
+            'total': order.total,
+            'subtotal': order.subtotal,
+            'taxes': order.get_tax_dict(),
         }
         return render(request, 'customers/order_details.html', context)
@@ -11,5 +11,17 @@ app.conf.beat_schedule = {
     'send-daily-specials-to-subscribers': {
         'task': 'accounts.services.tasks.send_specials_to_subscribers_task',
         'schedule': crontab(hour='0', minute='0')
-    }
+    },
+    'flush-dirty-carts': {
+        'task': 'marketplace.tasks.flush_dirty_carts_task',
+        'schedule': crontab(minute='*/5')
+    },
+    'archive-old-orders': {
+        'task': 'orders.tasks.archive_old_orders_task',
+        'schedule': crontab(hour='3', minute='0')
+    },
+    'purge-unpaid-orders': {
+        'task': 'orders.tasks.purge_unpaid_orders_task',
+        'schedule': crontab(minute='30')
+    },
 }
@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+from django.db import models
+
+
+class Money(int):
+    """Amount of money in minor units (cents).
+
+    Arithmetic stays in integers and keeps the type, str() renders the amount in major units ('12.34'),
+    so templates show it as is. JSON encoders see a plain int, use format_amounts() for display payloads.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_decimal(cls, amount) -> 'Money':
+        """Convert an amount in major units (Decimal, str or float) to cents, rounding half up"""
+        cents = (Decimal(str(amount)) * 100).to_integral_value(rounding='ROUND_HALF_UP')
+        return cls(cents)
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(int(self)).scaleb(-2)
+
+    def apply_rate(self, basis_points: int) -> 'Money':
+        """Return the given share of the amount, 1% is 100 basis points, rounding half up"""
+        cents = (abs(int(self)) * basis_points + 5000) // 10000
+        return Money(cents if self >= 0 else -cents)
+
+    def __add__(self, other):
+        if isinstance(other, int):
+            return Money(int(self) + int(other))
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, int):
+            return Money(int(self) - int(other))
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if isinstance(other, int):
+            return Money(int(other) - int(self))
+        return NotImplemented
+
+    def __mul__(self, other):
+        if isinstance(other, int) and not isinstance(other, Money):
+            return Money(int(self) * other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-int(self))
+
+    def __str__(self):
+        sign = '-' if self < 0 else ''
+        units, cents = divmod(abs(int(self)), 100)
+        return f'{sign}{units}.{cents:02d}'
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+
+class MoneyField(models.BigIntegerField):
+    """Stores Money as a bigint number of cents"""
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else Money(value)
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        return None if value is None else Money(value)
+
+
+def to_basis_points(percentage) -> int:
+    """Convert a percentage with two decimal places ('12.50') to basis points (1250)"""
+    return int(Decimal(str(percentage)) * 100)
+
+
+def load_tax_dict(tax_dict: dict) -> dict:
+    """Wrap stored {tax_type: {percentage: cents}} amounts into Money"""
+    return {tax_type: {percentage: Money(amount) for percentage, amount in data.items()}
+            for tax_type, data in tax_dict.items()}
+
+
+def format_amounts(data):
+    """Render Money amounts of a (nested) dict or list as strings for JSON payloads"""
+    if isinstance(data, Money):
+        return str(data)
+    if isinstance(data, dict):
+        return {key: format_amounts(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [format_amounts(value) for value in data]
+    return data
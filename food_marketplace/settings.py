@@ -25,6 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'accounts',
     'vendors',
@@ -113,6 +114,27 @@ CACHES = {
     }
 }
 
+# Carts are written straight to the Cart table. With 'marketplace.services.cart_storage_service.RedisCartStorage'
+# live carts are kept in the default cache and flushed to the Cart table in the background
+CART_STORAGE_BACKEND = 'marketplace.services.cart_storage_service.DatabaseCartStorage'
+CART_FLUSH_DELAY = 5  # seconds
+# Use 'marketplace.services.search_backend_service.InMemorySearchBackend' without PostgreSQL full-text search
+SEARCH_BACKEND = 'marketplace.services.search_backend_service.PostgresSearchBackend'
+# Nearby vendor rankings are cached per geohash cell (precision 6 is about 1.2 x 0.6 km) and radius bucket
+NEARBY_VENDORS_GEOHASH_PRECISION = 6
+NEARBY_VENDORS_CACHE_TIMEOUT = 600  # seconds
+NEARBY_VENDORS_CACHE_LIMIT = 1000
+ORDER_EVENTS_BACKEND = 'orders.services.order_events_service.RedisOrderEventBroker'
+ORDER_EVENTS_HEARTBEAT = 15  # seconds
+# SSE streams hold a sync worker, browsers reconnect once a stream ends
+ORDER_EVENTS_STREAM_LIFETIME = 300  # seconds
+# Completed orders older than this are moved to gzipped JSONL files, see orders.services.order_archive_service
+# set ORDER_ARCHIVE_DIR to a directory outside the deployment in production, the default is git-ignored
+ORDER_ARCHIVE_DIR = Path(os.getenv('ORDER_ARCHIVE_DIR', BASE_DIR / 'archive' / 'orders'))
+ORDER_ARCHIVE_AFTER_DAYS = 365
+# Orders that are still unpaid after this are deleted by orders.tasks.purge_unpaid_orders_task
+UNPAID_ORDER_TTL_HOURS = 24
+
 # Celery settings
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL")
 CELERY_TIMEZONE = os.getenv("CELERY_TIMEZONE")
@@ -120,7 +142,7 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = False
 # CELERY_BROKER_CONNECTION_RETRY = True
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
-CELERY_IMPORTS = ("accounts.services", "mailings")
+CELERY_IMPORTS = ("accounts.services", "mailings", "marketplace.tasks", "orders.tasks")
 
 
 AUTH_USER_MODEL = 'accounts.User'
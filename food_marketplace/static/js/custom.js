@@ -270,4 +270,61 @@ $(document).ready(function(){
             }
         })
     })
+
+    // ORDER STATUS
+    var order_status_colors = {'New': '#f5b400', 'Accepted': '#196dd4', 'Completed': '#38a326'}
+
+    function show_order_status(order_number, status){
+        $('[data-order-status="'+order_number+'"]').html(status).css('background-color', order_status_colors[status])
+        if(status == 'Completed'){
+            $('.change_order_status[data-url*="/'+order_number+'/"]').remove()
+        }else if(status == 'Accepted'){
+            $('.change_order_status[data-url*="/'+order_number+'/"]').attr('data-status', 'Completed').html('Complete')
+        }
+    }
+
+    function change_orders_status(url, data){
+        data['csrfmiddlewaretoken'] = $('input[name=csrfmiddlewaretoken]').val()
+        $.ajax({
+            type: 'POST',
+            url: url,
+            data: data,
+            traditional: true,
+            success: function(response){
+                if(response.status == 'success'){
+                    for(var i = 0; i < response.updated.length; i++){
+                        show_order_status(response.updated[i], data['status'])
+                    }
+                }else{
+                    Swal.fire(response.message, '', 'error')
+                }
+            }
+        })
+    }
+
+    $(document).on('click', '.change_order_status', function(e){
+        e.preventDefault();
+        change_orders_status($(this).attr('data-url'), {'status': $(this).attr('data-status')})
+    })
+
+    $('.bulk_order_status').on('click', function(e){
+        e.preventDefault();
+        var order_numbers = $('.select_order:checked').map(function(){ return this.value }).get()
+        if(order_numbers.length == 0){
+            Swal.fire('Please select orders', '', 'info')
+            return
+        }
+        change_orders_status($('#change_orders_status_url').val(), {'status': $(this).attr('data-status'), 'order_numbers': order_numbers})
+    })
+
+    // status changes pushed by the server, vendors see their part of the order, customers the whole order
+    var order_events_url = $('#order_events_url').val()
+    if(order_events_url && window.EventSource){
+        var is_vendor_page = $('#order_events_url').data('vendor') === true
+        var order_events = new EventSource(order_events_url)
+        order_events.addEventListener('order_status', function(e){
+            var event = JSON.parse(e.data)
+            show_order_status(event.order_number, is_vendor_page ? event.status : event.order_status)
+        })
+    }
 });
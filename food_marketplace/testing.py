@@ -0,0 +1,38 @@
+from accounts.models import User, UserProfile
+from menu.models import Category, FoodItem
+from vendors.models import Vendor
+
+
+def create_user(username, role=User.CUSTOMER, last_name='0') -> User:
+    """Create an active account of the role, named 'Customer <last_name>' or 'Vendor <last_name>'"""
+    first_name = 'Vendor' if role == User.VENDOR else 'Customer'
+    user = User.objects.create_user(first_name=first_name, last_name=last_name, username=username,
+                                    email=f'{username}@example.com', password='password')
+    user.role, user.is_active = role, True
+    user.save()
+    return user
+
+
+def create_customer(username='customer', last_name='0') -> User:
+    return create_user(username, User.CUSTOMER, last_name)
+
+
+def create_vendor(index=0, vendor_name=None, latitude=None, longitude=None, **fields) -> Vendor:
+    """Create a vendor with an active vendor account 'vendor<index>' and its profile.
+
+    Extra fields (is_approved, is_listed, ...) are passed to the vendor, which is neither approved nor listed by default.
+    """
+    user = create_user(f'vendor{index}', User.VENDOR, str(index))
+    profile = UserProfile.objects.create(user=user, latitude=latitude, longitude=longitude)
+    return Vendor.objects.create(user=user, user_profile=profile, vendor_name=vendor_name or f'Vendor {index}',
+                                 vendor_slug=f'vendor-{index}', vendor_license='license.png', **fields)
+
+
+def create_category(vendor, category_name='Pizza', slug='pizza') -> Category:
+    return Category.objects.create(vendor=vendor, category_name=category_name, slug=slug)
+
+
+def create_fooditem(vendor, category, food_title='Margherita', slug='margherita', price='5.00', **fields) -> FoodItem:
+    return FoodItem.objects.create(vendor=vendor, category=category, food_title=food_title, slug=slug, price=price,
+                                   image='food.png', **fields)
+
@@ -15,6 +15,7 @@ urlpatterns = [
     path('cart/', marketplace_views.cart, name='cart'),
 
     path('search/', marketplace_views.search, name='search'),
+    path('search/suggest/', marketplace_views.search_suggest, name='search-suggest'),
 
     path('checkout/', marketplace_views.checkout, name='checkout'),
 
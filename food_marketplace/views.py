@@ -1,24 +1,20 @@
-from django.contrib.gis.db.models.functions import Distance
-from django.contrib.gis.geos import GEOSGeometry
-from django.contrib.gis.measure import D
 from django.shortcuts import render
 
 from food_marketplace.utils import get_or_set_current_location
+from marketplace.services.nearest_vendors_service import get_nearest_vendors
 from vendors.models import Vendor
 
+HOME_VENDORS_LIMIT = 8
+HOME_TOP_VENDORS_LIMIT = 3
+
 
-# TODO: use part from search service to get rid of self repeating
 def home(request):
     coordinates = get_or_set_current_location(request)
     if coordinates:
-
-        pnt = GEOSGeometry("POINT(%s %s)" % (coordinates[0], coordinates[1]))
-        vendors = Vendor.objects.filter(user_profile__location__distance_lte=(pnt, D(km=100))
-                                        ).annotate(distance=Distance("user_profile__location", pnt)).order_by("distance")
-        for vendor in vendors:
-            vendor.kms = round(vendor.distance.km, 1)
+        vendors = get_nearest_vendors(longitude=coordinates[0], latitude=coordinates[1], radius_km=100,
+                                      limit=HOME_VENDORS_LIMIT)
     else:
-        vendors = Vendor.objects.valid_vendors()
-    top_vendors = vendors[:3]
-    return render(request, 'home.html', context={'vendors': vendors[:8],
+        vendors = list(Vendor.objects.valid_vendors().select_related('user_profile')[:HOME_VENDORS_LIMIT])
+    top_vendors = vendors[:HOME_TOP_VENDORS_LIMIT]
+    return render(request, 'home.html', context={'vendors': vendors,
                                                  'top_vendors': top_vendors})
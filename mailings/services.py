@@ -3,7 +3,7 @@ from django.contrib.auth.tokens import default_token_generator
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, get_connection
 
 from accounts.models import User
 
@@ -34,3 +34,30 @@ def send_notification(message_subject: str, email_template: str, context: dict):
     mail.content_subtype = 'html'
     mail.send()
 
+
+class NotificationBatchError(Exception):
+    """Sending stopped at a failed message, the first `sent` messages of the batch have been delivered"""
+
+    def __init__(self, sent: int):
+        super().__init__(f'Notification batch failed after {sent} sent messages')
+        self.sent = sent
+
+
+def send_notifications(message_subject: str, email_template: str, contexts: list):
+    """Render one notification per context and send them all over a single SMTP connection"""
+
+    from_email = settings.DEFAULT_FROM_EMAIL
+    messages = []
+    for context in contexts:
+        context['domain'] = settings.DOMAIN
+        mail = EmailMessage(message_subject, render_to_string(email_template, context), to=context['to_email'],
+                            from_email=from_email)
+        mail.content_subtype = 'html'
+        messages.append(mail)
+
+    with get_connection() as connection:
+        for sent, mail in enumerate(messages):
+            try:
+                connection.send_messages([mail])
+            except Exception as e:
+                raise NotificationBatchError(sent) from e
@@ -1,6 +1,6 @@
 from celery import shared_task
 
-from mailings.services import send_notification, send_email
+from mailings.services import send_notification, send_email, send_notifications, NotificationBatchError
 
 
 @shared_task(bind=True, max_retries=3)
@@ -21,3 +21,13 @@ def send_notification_task(self, message_subject: str, email_template: str, cont
         self.retry(countdown=3)
 
 
+@shared_task(bind=True, max_retries=3)
+def send_notifications_task(self, message_subject: str, email_template: str, contexts: list):
+    try:
+        send_notifications(message_subject, email_template, contexts)
+        return 'Success'
+    except NotificationBatchError as e:
+        # only the messages that have not been delivered yet are sent again
+        self.retry(args=(message_subject, email_template, contexts[e.sent:]), countdown=3)
+    except Exception:
+        self.retry(countdown=3)
@@ -1,28 +1,53 @@
-from marketplace.services.cart_data_service import count_cart_items_quantity, calculate_subtotal_of_cart, \
-    get_tax_data_of_cart
+import threading
+from collections import Counter
+
+from django.utils.functional import SimpleLazyObject
+
+from marketplace.services.cart_data_service import get_cart_summary
+
+
+class _EvaluationCounter:
+    """Per process count of cart context values that templates actually read"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def add(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+cart_context_evaluations = _EvaluationCounter()
+
+
+def _lazy_cart_value(request, name: str):
+
+    def evaluate():
+        cart_context_evaluations.add(name)
+        return getattr(get_cart_summary(request), name)
+
+    return SimpleLazyObject(evaluate)
 
 
 def get_cart_counter(request):
 
-    if request.user.is_authenticated:
-        cart_count = count_cart_items_quantity(request.user.pk)
-    else:
-        cart_count = 0
-    return dict(cart_count=cart_count)
+    return {'cart_count': _lazy_cart_value(request, 'cart_count')}
 
 
 def get_cart_amounts(request):
 
     if request.user.is_authenticated:
-        subtotal = round(calculate_subtotal_of_cart(request.user.pk), 2)
-        tax_data = get_tax_data_of_cart(subtotal=subtotal)
-        tax_dict = tax_data['tax_dict']
-        taxes = tax_data['taxes']
-        grand_total = round((subtotal + taxes), 2)
-        response = dict(subtotal=subtotal, taxes=taxes, grand_total=grand_total, tax_dict=tax_dict)
+        response = {name: _lazy_cart_value(request, name) for name in ('subtotal', 'taxes', 'grand_total', 'tax_dict')}
     else:
         response = {}
 
     return response
-
-
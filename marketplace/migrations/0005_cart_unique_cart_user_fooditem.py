@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicated_cart_items(apps, schema_editor):
+    Cart = apps.get_model('marketplace', 'Cart')
+
+    duplicates = Cart.objects.values('user', 'fooditem').annotate(
+        items=Count('id'), total_quantity=Sum('quantity')
+    ).filter(items__gt=1).order_by()
+    for duplicate in duplicates:
+        cart_items = Cart.objects.filter(user=duplicate['user'], fooditem=duplicate['fooditem']).order_by('created_at')
+        kept_item = cart_items.first()
+        cart_items.exclude(pk=kept_item.pk).delete()
+        Cart.objects.filter(pk=kept_item.pk).update(quantity=duplicate['total_quantity'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0004_alter_tax_tax_percentage'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicated_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user', 'fooditem'), name='unique_cart_user_fooditem'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('marketplace', '0005_cart_unique_cart_user_fooditem'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='cart',
+            index=models.Index(fields=['user', 'created_at'], name='cart_user_created_idx'),
+        ),
+    ]
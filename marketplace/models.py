@@ -1,9 +1,68 @@
-from django.db import models
+from typing import Optional
+
+from django.db import models, connections
+from django.utils import timezone
 
 from accounts.models import User
 from menu.models import FoodItem
 
 
+class CartManager(models.Manager):
+
+    def add_quantity(self, user_id: int, fooditem_id: int, quantity: int = 1) -> int:
+        """Insert the cart item or increase its quantity in one statement, return the new quantity"""
+        return self._upsert(user_id, fooditem_id, quantity, increment=True)[1]
+
+    def set_quantity(self, user_id: int, fooditem_id: int, quantity: int) -> int:
+        """Insert the cart item or overwrite its quantity in one statement, return the new quantity"""
+        return self._upsert(user_id, fooditem_id, quantity, increment=False)[1]
+
+    def set_item(self, user_id: int, fooditem_id: int, quantity: int) -> 'Cart':
+        """Same as set_quantity, but return the upserted cart item"""
+        pk, quantity = self._upsert(user_id, fooditem_id, quantity, increment=False)
+        return self.model(pk=pk, user_id=user_id, fooditem_id=fooditem_id, quantity=quantity)
+
+    def decrease_quantity(self, user_id: int, fooditem_id: int) -> Optional[int]:
+        """Decrease the quantity by one, deleting the item when it reaches zero.
+        Return the new quantity or None if the user has no such cart item"""
+
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        sql = f"""
+            WITH updated AS (
+                UPDATE {table} SET quantity = quantity - 1, updated_at = %s
+                WHERE user_id = %s AND fooditem_id = %s AND quantity > 1
+                RETURNING quantity
+            ), deleted AS (
+                DELETE FROM {table}
+                WHERE user_id = %s AND fooditem_id = %s AND quantity <= 1
+                RETURNING 0 AS quantity
+            )
+            SELECT quantity FROM updated UNION ALL SELECT quantity FROM deleted
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [timezone.now(), user_id, fooditem_id, user_id, fooditem_id])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _upsert(self, user_id: int, fooditem_id: int, quantity: int, increment: bool) -> tuple:
+
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        new_quantity = f'{table}.quantity + EXCLUDED.quantity' if increment else 'EXCLUDED.quantity'
+        sql = f"""
+            INSERT INTO {table} (user_id, fooditem_id, quantity, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (user_id, fooditem_id)
+            DO UPDATE SET quantity = {new_quantity}, updated_at = EXCLUDED.updated_at
+            RETURNING id, quantity
+        """
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, fooditem_id, quantity, now, now])
+            return cursor.fetchone()
+
+
 class Cart(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -12,6 +71,16 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'fooditem'], name='unique_cart_user_fooditem'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='cart_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username}, {self.fooditem.food_title}"
 
@@ -1,44 +1,75 @@
-from django.core.exceptions import ObjectDoesNotExist
+from dataclasses import dataclass, field
 
-from marketplace.models import Tax, Cart
+from django.db.models import Sum, F, BigIntegerField
+from django.db.models.functions import Cast
+
+from food_marketplace.money import Money
+from marketplace.models import Cart
+from marketplace.services.cart_storage_service import get_cart_storage
+from marketplace.services.tax_cache_service import get_tax_data
 from menu.models import FoodItem
 
 
-def get_tax_data_of_cart(subtotal: float) -> dict:
+@dataclass
+class CartSummary:
+    """Counter and amounts of the user's cart computed from one aggregated query.
+    Live carts that are not stored in the database only need their food prices to be fetched"""
 
-    tax_dict = {}
-    taxes = 0.00
+    cart_count: int = 0
+    subtotal: Money = Money(0)
+    subtotal_by_vendor: dict = field(default_factory=dict)
+    tax_dict: dict = field(default_factory=dict)
+    taxes: Money = Money(0)
+    grand_total: Money = Money(0)
 
-    get_taxes = Tax.objects.filter(is_active=True)
-    for tax in get_taxes:
-        tax_type = tax.tax_type
-        percentage = tax.tax_percentage
-        tax_amount = round(subtotal * float(percentage) / 100, 2)
-        tax_dict.update({tax_type: {str(percentage): str(tax_amount)}})
-        taxes += tax_amount
+    @classmethod
+    def for_user(cls, user_id: int) -> 'CartSummary':
 
-    return {'tax_dict': tax_dict, 'taxes': round(taxes, 2)}
+        storage = get_cart_storage()
+        if storage.keeps_items_in_database:
+            rows = Cart.objects.filter(user=user_id).values('fooditem__vendor').annotate(
+                items_qty=Sum('quantity'),
+                amount=Cast(Sum(F('quantity') * F('fooditem__price') * 100), BigIntegerField())
+            ).order_by().values_list('fooditem__vendor', 'items_qty', 'amount')
+        else:
+            items = storage.get_items(user_id)
+            fooditems = FoodItem.objects.filter(pk__in=list(items)).annotate(
+                price_cents=Cast(F('price') * 100, BigIntegerField())
+            ).values_list('pk', 'vendor', 'price_cents')
+            rows = [(vendor_id, items[pk], price * items[pk]) for pk, vendor_id, price in fooditems]
 
+        cart_count = 0
+        subtotal_by_vendor = {}
+        for vendor_id, items_qty, amount in rows:
+            cart_count += items_qty
+            subtotal_by_vendor[vendor_id] = subtotal_by_vendor.get(vendor_id, Money(0)) + amount
 
-def calculate_subtotal_of_cart(user_id: int) -> float:
+        subtotal = Money(sum(subtotal_by_vendor.values()))
+        tax_data = get_tax_data(subtotal=subtotal)
+        return cls(
+            cart_count=cart_count,
+            subtotal=subtotal,
+            subtotal_by_vendor=subtotal_by_vendor,
+            tax_dict=tax_data['tax_dict'],
+            taxes=tax_data['taxes'],
+            grand_total=subtotal + tax_data['taxes'],
+        )
 
-    subtotal = 0.00
-    cart_items = Cart.objects.filter(user=user_id)
-    for item in cart_items:
-        fooditem = FoodItem.objects.get(pk=item.fooditem.id)
-        subtotal += round(fooditem.price * item.quantity)
+    def get_counter(self) -> dict:
+        return dict(cart_count=self.cart_count)
 
-    return round(subtotal, 2)
+    def get_amounts(self) -> dict:
+        return dict(subtotal=self.subtotal, taxes=self.taxes, grand_total=self.grand_total, tax_dict=self.tax_dict)
 
 
-def count_cart_items_quantity(user_id: int) -> int:
+def get_cart_summary(request) -> CartSummary:
+    """Return cart summary of the request's user, computed at most once per request"""
 
-    cart_count = 0
-    try:
-        cart_items = Cart.objects.filter(user=user_id)
-        if cart_items:
-            for item in cart_items:
-                cart_count += item.quantity
-    except ObjectDoesNotExist:
-        cart_count = 0
-    return cart_count
+    summary = getattr(request, '_cart_summary', None)
+    if summary is None:
+        if request.user.is_authenticated:
+            summary = CartSummary.for_user(request.user.pk)
+        else:
+            summary = CartSummary()
+        request._cart_summary = summary
+    return summary
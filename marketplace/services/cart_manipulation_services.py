@@ -1,73 +1,66 @@
 from django.core.exceptions import ObjectDoesNotExist
 
-from accounts.models import User
+from food_marketplace.money import format_amounts
 from marketplace.models import Cart
-from marketplace.services.cart_data_service import count_cart_items_quantity, get_tax_data_of_cart, \
-    calculate_subtotal_of_cart
+from marketplace.services.cart_data_service import CartSummary
+from marketplace.services.cart_storage_service import get_cart_storage, flush_cart
 from menu.models import FoodItem
 
 
 def add_item_to_cart(food_id: int, user_id: int, quantity: int = None) -> dict:
 
-    try:
-        result = _increase_cart_item_quantity(food_id=food_id, user_id=user_id, quantity=quantity)
-    except ObjectDoesNotExist:
-        result = _add_new_cart_item(food_id=food_id, user_id=user_id, quantity=quantity)
+    if quantity:
+        qty = get_cart_storage().set(user_id=user_id, fooditem_id=food_id, quantity=quantity)
+        message = 'Set the cart item quantity'
+    else:
+        qty = get_cart_storage().add(user_id=user_id, fooditem_id=food_id)
+        message = 'Added the item to your cart' if qty == 1 else 'Increased the cart item quantity'
 
-    response = _form_response(
-        qty=result['qty'],
-        message=result['message'],
-        user_id=user_id
-    )
+    response = _form_response(qty=qty, message=message, user_id=user_id)
     return response
 
 
-def decrease_cart_item_quantity(user_id: int, food_id: int, qty: int):
+def decrease_cart_item_quantity(user_id: int, food_id: int) -> dict:
 
-    if qty > 1:
-        result = _decrease_cart_item_qty(food_id=food_id, user_id=user_id)
-    else:
-        result = _delete_cart_item(food_id=food_id, user_id=user_id)
+    qty = get_cart_storage().decrease(user_id=user_id, fooditem_id=food_id)
+    if qty is None:
+        return {'status': 'Failed', 'message': 'You do not have this item in your cart'}
 
-    response = _form_response(
-        qty=result['qty'],
-        message=result['message'],
-        user_id=user_id
-    )
+    message = 'Decreased the cart quantity' if qty else 'Cart item has been deleted!'
+    response = _form_response(qty=qty, message=message, user_id=user_id)
     return response
 
 
-def delete_cart_item(user_id: int, cart_id: int):
+def delete_cart_item(user_id: int, cart_id: int) -> dict:
 
-    try:
-        result = _delete_cart_item(cart_id=cart_id)
-        response = _form_response(
-            qty=result['qty'],
-            message=result['message'],
-            user_id=user_id
-        )
-    except ObjectDoesNotExist:
+    # cart ids come from the rendered cart page, which is built from the flushed Cart table
+    food_id = Cart.objects.filter(pk=cart_id, user=user_id).values_list('fooditem_id', flat=True).first()
+    if food_id and get_cart_storage().remove(user_id=user_id, fooditem_id=food_id):
+        response = _form_response(qty=0, message='Cart item has been deleted!', user_id=user_id)
+    else:
         response = {'status': 'Failed', 'message': 'Cart item does not exist!'}
     return response
 
 
-def _get_cart_counter(user_id: int):
-
-    cart_count = 0
-    cart_count += count_cart_items_quantity(user_id)
+def apply_cart_operations(user_id: int, operations: list) -> dict:
+    """Apply a batch of (operation, food_id, quantity) changes and return one recomputed summary"""
 
-    return dict(cart_count=cart_count)
+    get_cart_storage().apply_operations(user_id=user_id, operations=operations)
+    summary = CartSummary.for_user(user_id)
+    response = {
+        'status': 'Success',
+        'cart_counter': summary.get_counter(),
+        'cart_amounts': get_cart_amounts(user_id=user_id, summary=summary)
+    }
+    return response
 
 
-def get_cart_amounts(user_id: int):
+def get_cart_amounts(user_id: int, summary: CartSummary = None):
 
-    subtotal = calculate_subtotal_of_cart(user_id=user_id)
-    tax_data = get_tax_data_of_cart(subtotal=subtotal)
-    tax_dict = tax_data['tax_dict']
-    taxes = tax_data['taxes']
-    grand_total = round((subtotal + taxes), 2)
+    if summary is None:
+        summary = CartSummary.for_user(user_id)
 
-    return dict(subtotal=str(subtotal), taxes=str(taxes), grand_total=str(grand_total), tax_dict=tax_dict)
+    return format_amounts(summary.get_amounts())
 
 
 def check_does_fooditem_exist(food_id: int):
@@ -79,21 +72,10 @@ def check_does_fooditem_exist(food_id: int):
         return False
 
 
-def check_does_cart_item_exist(food_id: int = None, user_id: int = None, cart_id: int = None):
-
-    try:
-        if not cart_id:
-            cart_item = Cart.objects.get(user=user_id, fooditem=food_id)
-        else:
-            cart_item = Cart.objects.get(pk=cart_id)
-        return {'item_qty': cart_item.quantity}
-    except ObjectDoesNotExist:
-        return {}
-
-
 def get_ordered_cart_items_by_user(user_id: int, get_ids: bool = False) -> dict:
 
     response = {}
+    flush_cart(user_id=user_id)
     cart_items = Cart.objects.filter(user=user_id).order_by('created_at')
     if get_ids:
         cart_items_id = []
@@ -109,70 +91,42 @@ def get_ordered_cart_items_by_user(user_id: int, get_ids: bool = False) -> dict:
     return response
 
 
+def get_live_cart_items(user_id: int) -> list:
+    """Cart items as the cart storage holds them, without flushing it. Items not flushed yet have no pk"""
+
+    storage = get_cart_storage()
+    if storage.keeps_items_in_database:
+        return list(Cart.objects.filter(user=user_id).select_related('fooditem__category').order_by('created_at'))
+
+    items = storage.get_items(user_id)
+    cart_ids = dict(Cart.objects.filter(user=user_id).values_list('fooditem_id', 'pk'))
+    fooditems = FoodItem.objects.select_related('category').in_bulk(list(items))
+    return [Cart(pk=cart_ids.get(fooditem_id), user_id=user_id, fooditem=fooditems[fooditem_id], quantity=qty)
+            for fooditem_id, qty in items.items() if fooditem_id in fooditems]
+
+
 def _form_response(message: str, qty: int, user_id: int) -> dict:
 
+    summary = CartSummary.for_user(user_id)
     response = {
         'status': 'Success',
         'message': message,
-        'cart_counter': _get_cart_counter(user_id=user_id),
+        'cart_counter': summary.get_counter(),
         'qty': qty,
-        'cart_amounts': get_cart_amounts(user_id=user_id)
+        'cart_amounts': get_cart_amounts(user_id=user_id, summary=summary)
     }
     return response
 
 
-def _increase_cart_item_quantity(food_id: int, user_id: int, quantity: int = None):
-
-    cart_item = Cart.objects.get(user=user_id, fooditem=food_id)
-    # increase cart quantity
-    if quantity:
-        cart_item.quantity = quantity
-    else:
-        cart_item.quantity += 1
-    message = 'Increased the cart item quantity'
-    cart_item.save()
-
-    response = dict(message=message, qty=cart_item.quantity)
-    return response
-
-
-def _add_new_cart_item(food_id, user_id: int, quantity: int = None):
-
-    quantity = quantity if quantity else 1
-    user = User.objects.get(pk=user_id)
-    fooditem = FoodItem.objects.get(pk=food_id)
-    cart_item = Cart.objects.create(user=user, fooditem=fooditem, quantity=quantity)
-    message = f"Added '{fooditem.food_title}' to your cart"
-
-    response = dict(message=message, qty=cart_item.quantity)
-    return response
-
-
-def _decrease_cart_item_qty(user_id: int, food_id: int):
-
-    cart_item = Cart.objects.get(user=user_id, fooditem=food_id)
-    cart_item.quantity -= 1
-    cart_item.save()
-    message = 'Decreased the cart quantity'
-
-    response = dict(message=message, qty=cart_item.quantity)
-    return response
-
+def clean_customer_cart(user_id: int):
 
-def _delete_cart_item(user_id: int = None, food_id: int = None, cart_id: int = None):
+    get_cart_storage().clear(user_id=user_id)
 
-    if cart_id:
-        cart_item = Cart.objects.get(pk=cart_id)
-    else:
-        cart_item = Cart.objects.get(user=user_id, fooditem=food_id)
-        cart_item.quantity = 0
-    cart_item.delete()
-    message = 'Cart item has been deleted!'
-    response = dict(message=message, qty=0)
-    return response
 
+def remove_ordered_items_from_cart(user_id: int, quantities: dict) -> None:
+    """Take the ordered quantities {fooditem_id: quantity} out of the cart, keeping anything added since"""
 
-def clean_customer_cart(user_id: int):
-
-    Cart.objects.filter(user=user_id).delete()
+    operations = [('add', fooditem_id, -quantity) for fooditem_id, quantity in quantities.items()]
+    if operations:
+        get_cart_storage().apply_operations(user_id=user_id, operations=operations)
 
@@ -0,0 +1,400 @@
+import threading
+from functools import lru_cache
+from typing import Optional
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from accounts.models import User
+from marketplace.models import Cart
+from menu.models import FoodItem
+
+CART_OPERATIONS = ('add', 'set', 'remove')
+
+
+class BaseCartStorage:
+    """Interface of the live cart storage used by the cart services.
+
+    Quantities are kept as {fooditem_id: quantity}. Storages that do not write to the Cart table on every
+    change must persist the cart in flush(), the Cart table is only consistent with the storage after it.
+    """
+
+    keeps_items_in_database = False
+
+    def add(self, user_id: int, fooditem_id: int, quantity: int = 1) -> int:
+        raise NotImplementedError
+
+    def set(self, user_id: int, fooditem_id: int, quantity: int) -> int:
+        raise NotImplementedError
+
+    def decrease(self, user_id: int, fooditem_id: int) -> Optional[int]:
+        """Return the new quantity or None if the user has no such cart item"""
+        raise NotImplementedError
+
+    def remove(self, user_id: int, fooditem_id: int) -> bool:
+        raise NotImplementedError
+
+    def get_items(self, user_id: int) -> dict:
+        raise NotImplementedError
+
+    def clear(self, user_id: int) -> None:
+        raise NotImplementedError
+
+    def apply_operations(self, user_id: int, operations: list) -> None:
+        """Atomically apply (operation, fooditem_id, quantity) changes, operation is one of CART_OPERATIONS.
+        Setting or adding up to a quantity below 1 removes the item"""
+        raise NotImplementedError
+
+    def flush(self, user_id: int) -> None:
+        pass
+
+
+class DatabaseCartStorage(BaseCartStorage):
+    """Write every change straight to the Cart table"""
+
+    keeps_items_in_database = True
+
+    def add(self, user_id: int, fooditem_id: int, quantity: int = 1) -> int:
+        return Cart.objects.add_quantity(user_id=user_id, fooditem_id=fooditem_id, quantity=quantity)
+
+    def set(self, user_id: int, fooditem_id: int, quantity: int) -> int:
+        return Cart.objects.set_quantity(user_id=user_id, fooditem_id=fooditem_id, quantity=quantity)
+
+    def decrease(self, user_id: int, fooditem_id: int) -> Optional[int]:
+        return Cart.objects.decrease_quantity(user_id=user_id, fooditem_id=fooditem_id)
+
+    def remove(self, user_id: int, fooditem_id: int) -> bool:
+        deleted, _ = Cart.objects.filter(user=user_id, fooditem=fooditem_id).delete()
+        return bool(deleted)
+
+    def get_items(self, user_id: int) -> dict:
+        return dict(Cart.objects.filter(user=user_id).values_list('fooditem_id', 'quantity'))
+
+    def clear(self, user_id: int) -> None:
+        Cart.objects.filter(user=user_id).delete()
+
+    def apply_operations(self, user_id: int, operations: list) -> None:
+
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+            items = _apply_operations_to_items(items=self.get_items(user_id), operations=operations)
+            _persist_cart_items(user_id=user_id, items=items)
+
+
+class WriteBehindCartStorage(BaseCartStorage):
+    """Base for storages keeping live carts in memory and persisting them to the Cart table later"""
+
+    def _pop_dirty_items(self, user_id: int) -> Optional[dict]:
+        """Unmark the cart as dirty and return its items, None if there is nothing to persist"""
+        raise NotImplementedError
+
+    def _mark_dirty(self, user_id: int) -> None:
+        raise NotImplementedError
+
+    def flush(self, user_id: int) -> None:
+
+        with transaction.atomic():
+            # serialize concurrent flushes of the same cart, so an older snapshot never overwrites a newer one
+            list(User.objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+            items = self._pop_dirty_items(user_id)
+            if items is None:
+                return
+            try:
+                _persist_cart_items(user_id=user_id, items=items)
+            except Exception:
+                self._mark_dirty(user_id)
+                raise
+
+    @staticmethod
+    def _load_items_from_database(user_id: int) -> dict:
+        return dict(Cart.objects.filter(user=user_id).values_list('fooditem_id', 'quantity'))
+
+
+# KEYS[1] - cart hash, KEYS[2] - set of dirty carts, KEYS[3] - flush debounce key
+# ARGV[1] - user id, ARGV[2] - cart ttl, ARGV[3] - flush delay, ARGV[4] - operation, ARGV[5] - fooditem id,
+# ARGV[6] - quantity. Returns {-2, 0} if the cart is not loaded, {-1, 0} if there is no such item,
+# otherwise {new quantity, 1 if a flush has to be scheduled}
+_CART_OPERATION_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {-2, 0}
+end
+local op = ARGV[4]
+local qty
+if op == 'add' then
+    qty = redis.call('HINCRBY', KEYS[1], ARGV[5], ARGV[6])
+    if qty < 1 then
+        redis.call('HDEL', KEYS[1], ARGV[5])
+        qty = 0
+    end
+elseif op == 'set' then
+    qty = tonumber(ARGV[6])
+    if qty < 1 then
+        redis.call('HDEL', KEYS[1], ARGV[5])
+        qty = 0
+    else
+        redis.call('HSET', KEYS[1], ARGV[5], qty)
+    end
+else
+    local current = tonumber(redis.call('HGET', KEYS[1], ARGV[5]))
+    if not current then
+        return {-1, 0}
+    end
+    if op == 'decrease' and current > 1 then
+        qty = redis.call('HINCRBY', KEYS[1], ARGV[5], -1)
+    else
+        redis.call('HDEL', KEYS[1], ARGV[5])
+        qty = 0
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[1])
+local scheduled = redis.call('SET', KEYS[3], 1, 'NX', 'EX', ARGV[3])
+return {qty, scheduled and 1 or 0}
+"""
+
+
+# KEYS[1] - cart hash, ARGV[1] - cart ttl, ARGV[2:] - field/value pairs of the cart loaded from the database
+_LOAD_CART_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+
+
+class RedisCartStorage(WriteBehindCartStorage):
+    """Keep live carts as hashes in the CACHES['default'] Redis and flush them to the Cart table
+    asynchronously (CART_FLUSH_DELAY seconds after the first unsaved change) and at checkout"""
+
+    # marks a cart hash as loaded from the database, so an empty cart still exists in Redis
+    _LOADED_FIELD = '_'
+    _DIRTY_CARTS_KEY = 'cart:dirty'
+    # reloads of a cart expiring between loading it and applying a batch of operations
+    APPLY_ATTEMPTS = 3
+
+    def __init__(self):
+        self.client = redis.Redis.from_url(settings.CACHES['default']['LOCATION'])
+        self.cart_ttl = getattr(settings, 'CART_STORAGE_TTL', 60 * 60 * 24 * 7)
+        self.flush_delay = getattr(settings, 'CART_FLUSH_DELAY', 5)
+        self._operation = self.client.register_script(_CART_OPERATION_SCRIPT)
+        self._load_cart = self.client.register_script(_LOAD_CART_SCRIPT)
+
+    def add(self, user_id: int, fooditem_id: int, quantity: int = 1) -> int:
+        return self._run_operation('add', user_id, fooditem_id, quantity)
+
+    def set(self, user_id: int, fooditem_id: int, quantity: int) -> int:
+        return self._run_operation('set', user_id, fooditem_id, quantity)
+
+    def decrease(self, user_id: int, fooditem_id: int) -> Optional[int]:
+        qty = self._run_operation('decrease', user_id, fooditem_id)
+        return None if qty < 0 else qty
+
+    def remove(self, user_id: int, fooditem_id: int) -> bool:
+        return self._run_operation('remove', user_id, fooditem_id) == 0
+
+    def get_items(self, user_id: int) -> dict:
+        items = self.client.hgetall(self._cart_key(user_id))
+        if not items:
+            items = self._load(user_id)
+        return self._decode_items(items)
+
+    def clear(self, user_id: int) -> None:
+        pipe = self.client.pipeline()
+        pipe.delete(self._cart_key(user_id))
+        pipe.hset(self._cart_key(user_id), self._LOADED_FIELD, 1)
+        pipe.expire(self._cart_key(user_id), self.cart_ttl)
+        pipe.srem(self._DIRTY_CARTS_KEY, user_id)
+        pipe.execute()
+        Cart.objects.filter(user=user_id).delete()
+
+    def apply_operations(self, user_id: int, operations: list) -> None:
+
+        keys = [self._cart_key(user_id), self._DIRTY_CARTS_KEY, f'cart:flush:{user_id}']
+        for _ in range(self.APPLY_ATTEMPTS):
+            # make sure the cart is loaded, then run all the operations in one MULTI/EXEC block
+            self.get_items(user_id)
+            pipe = self.client.pipeline(transaction=True)
+            for operation, fooditem_id, quantity in operations:
+                args = [user_id, self.cart_ttl, self.flush_delay, operation, fooditem_id, quantity]
+                self._operation(keys=keys, args=args, client=pipe)
+            results = pipe.execute()
+            # the block runs atomically, if the cart expired after loading none of the operations was applied
+            if not any(qty == -2 for qty, _ in results):
+                break
+        else:
+            raise RuntimeError(f'Cart of user {user_id} expired while applying operations')
+        if any(flush_required for _, flush_required in results):
+            _schedule_flush(user_id=user_id, countdown=self.flush_delay)
+
+    def flush(self, user_id: int) -> None:
+        if self.client.sismember(self._DIRTY_CARTS_KEY, user_id):
+            super().flush(user_id)
+
+    def get_dirty_user_ids(self) -> list:
+        return [int(user_id) for user_id in self.client.smembers(self._DIRTY_CARTS_KEY)]
+
+    def _pop_dirty_items(self, user_id: int) -> Optional[dict]:
+        # unmark before reading, a change made meanwhile marks the cart dirty again
+        if not self.client.srem(self._DIRTY_CARTS_KEY, user_id):
+            return None
+        return self._decode_items(self.client.hgetall(self._cart_key(user_id)))
+
+    def _mark_dirty(self, user_id: int) -> None:
+        self.client.sadd(self._DIRTY_CARTS_KEY, user_id)
+
+    def _run_operation(self, operation: str, user_id: int, fooditem_id: int, quantity: int = 0) -> int:
+
+        keys = [self._cart_key(user_id), self._DIRTY_CARTS_KEY, f'cart:flush:{user_id}']
+        args = [user_id, self.cart_ttl, self.flush_delay, operation, fooditem_id, quantity]
+        qty, flush_required = self._operation(keys=keys, args=args)
+        if qty == -2:
+            self._load(user_id)
+            qty, flush_required = self._operation(keys=keys, args=args)
+        if flush_required:
+            _schedule_flush(user_id=user_id, countdown=self.flush_delay)
+        return qty
+
+    def _load(self, user_id: int) -> dict:
+
+        items = self._load_items_from_database(user_id)
+        mapping = [self._LOADED_FIELD, 1]
+        for fooditem_id, qty in items.items():
+            mapping.extend([fooditem_id, qty])
+        # a concurrent request could load the cart and change it already, then its state wins
+        loaded = self._load_cart(keys=[self._cart_key(user_id)], args=[self.cart_ttl, *mapping])
+        return dict(zip(loaded[::2], loaded[1::2]))
+
+    @staticmethod
+    def _cart_key(user_id: int) -> str:
+        return f'cart:{user_id}'
+
+    def _decode_items(self, items: dict) -> dict:
+        return {int(fooditem_id): int(qty) for fooditem_id, qty in items.items()
+                if fooditem_id not in (self._LOADED_FIELD, self._LOADED_FIELD.encode())}
+
+
+class LocMemCartStorage(WriteBehindCartStorage):
+    """Process-local stand-in of RedisCartStorage for tests and local development.
+    Changes are persisted to the Cart table only by flush()"""
+
+    def __init__(self):
+        self._carts = {}
+        self._dirty = set()
+        self._lock = threading.RLock()
+
+    def add(self, user_id: int, fooditem_id: int, quantity: int = 1) -> int:
+        with self._lock:
+            cart = self._get_cart(user_id)
+            cart[fooditem_id] = cart.get(fooditem_id, 0) + quantity
+            self._dirty.add(user_id)
+            return cart[fooditem_id]
+
+    def set(self, user_id: int, fooditem_id: int, quantity: int) -> int:
+        with self._lock:
+            if quantity < 1:
+                self._get_cart(user_id).pop(fooditem_id, None)
+                quantity = 0
+            else:
+                self._get_cart(user_id)[fooditem_id] = quantity
+            self._dirty.add(user_id)
+            return quantity
+
+    def decrease(self, user_id: int, fooditem_id: int) -> Optional[int]:
+        with self._lock:
+            cart = self._get_cart(user_id)
+            if fooditem_id not in cart:
+                return None
+            if cart[fooditem_id] > 1:
+                cart[fooditem_id] -= 1
+            else:
+                del cart[fooditem_id]
+            self._dirty.add(user_id)
+            return cart.get(fooditem_id, 0)
+
+    def remove(self, user_id: int, fooditem_id: int) -> bool:
+        with self._lock:
+            removed = self._get_cart(user_id).pop(fooditem_id, None) is not None
+            if removed:
+                self._dirty.add(user_id)
+            return removed
+
+    def get_items(self, user_id: int) -> dict:
+        with self._lock:
+            return dict(self._get_cart(user_id))
+
+    def apply_operations(self, user_id: int, operations: list) -> None:
+        with self._lock:
+            self._carts[user_id] = _apply_operations_to_items(items=self._get_cart(user_id), operations=operations)
+            self._dirty.add(user_id)
+
+    def clear(self, user_id: int) -> None:
+        with self._lock:
+            self._carts[user_id] = {}
+            self._dirty.discard(user_id)
+        Cart.objects.filter(user=user_id).delete()
+
+    def _pop_dirty_items(self, user_id: int) -> Optional[dict]:
+        with self._lock:
+            if user_id not in self._dirty:
+                return None
+            self._dirty.discard(user_id)
+            return dict(self._get_cart(user_id))
+
+    def _mark_dirty(self, user_id: int) -> None:
+        with self._lock:
+            self._dirty.add(user_id)
+
+    def _get_cart(self, user_id: int) -> dict:
+        if user_id not in self._carts:
+            self._carts[user_id] = self._load_items_from_database(user_id)
+        return self._carts[user_id]
+
+
+@lru_cache(maxsize=None)
+def get_cart_storage() -> BaseCartStorage:
+
+    backend = getattr(settings, 'CART_STORAGE_BACKEND', 'marketplace.services.cart_storage_service.DatabaseCartStorage')
+    return import_string(backend)()
+
+
+def flush_cart(user_id: int) -> None:
+    """Make the Cart table consistent with the live cart of the user"""
+
+    get_cart_storage().flush(user_id)
+
+
+def _apply_operations_to_items(items: dict, operations: list) -> dict:
+
+    items = dict(items)
+    for operation, fooditem_id, quantity in operations:
+        if operation == 'add' and items.get(fooditem_id, 0) + quantity > 0:
+            items[fooditem_id] = items.get(fooditem_id, 0) + quantity
+        elif operation == 'set' and quantity > 0:
+            items[fooditem_id] = quantity
+        else:
+            items.pop(fooditem_id, None)
+    return items
+
+
+def _persist_cart_items(user_id: int, items: dict) -> None:
+
+    # food items could be deleted while they were in the live cart
+    existing_ids = FoodItem.objects.filter(pk__in=list(items)).values_list('pk', flat=True)
+    items = {fooditem_id: items[fooditem_id] for fooditem_id in existing_ids}
+
+    Cart.objects.filter(user=user_id).exclude(fooditem__in=list(items)).delete()
+    Cart.objects.bulk_create(
+        [Cart(user_id=user_id, fooditem_id=fooditem_id, quantity=qty) for fooditem_id, qty in items.items()],
+        update_conflicts=True,
+        unique_fields=['user', 'fooditem'],
+        update_fields=['quantity', 'updated_at'],
+    )
+
+
+def _schedule_flush(user_id: int, countdown: int) -> None:
+
+    from marketplace.tasks import flush_cart_task
+    flush_cart_task.apply_async(args=(user_id, ), countdown=countdown)
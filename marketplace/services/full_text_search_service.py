@@ -0,0 +1,81 @@
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db.models import F, FloatField, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from menu.models import Category, FoodItem
+from vendors.models import Vendor
+
+SEARCH_CONFIG = 'english'
+SEARCH_VENDORS_LIMIT = 50
+SEARCH_DISHES_LIMIT = 200
+
+
+def search_vendors(keyword: str, match_vendors: bool = True, match_dishes: bool = True,
+                   limit: int = SEARCH_VENDORS_LIMIT, open_now: bool = False) -> list:
+    """Valid vendors whose name or available dishes match the keyword, most relevant first.
+
+    Words are matched by the search_vector GIN indexes, typos by the trigram GIN indexes of vendor names and
+    dish titles. A vendor scores the rank of its name plus the rank of its best dish, gets `rank` set and
+    its matching dishes, best first, in `matching_dishes`. With open_now only the vendors open now are searched"""
+
+    query = SearchQuery(keyword, search_type='websearch', config=SEARCH_CONFIG)
+    valid_vendors = Vendor.objects.valid_vendors()
+    if open_now:
+        valid_vendors = valid_vendors.open_now()
+    scores = defaultdict(float)
+    dishes_by_vendor = defaultdict(list)
+
+    if match_dishes:
+        dishes = (
+            FoodItem.objects.filter(is_available=True, vendor__in=valid_vendors)
+            .filter(Q(search_vector=query) | Q(food_title__trigram_similar=keyword))
+            .annotate(rank=_rank('food_title', query, keyword))
+            .select_related('category')
+            .order_by('-rank')[:SEARCH_DISHES_LIMIT]
+        )
+        for dish in dishes:
+            if not dishes_by_vendor[dish.vendor_id]:
+                scores[dish.vendor_id] += dish.rank
+            dishes_by_vendor[dish.vendor_id].append(dish)
+
+    if match_vendors:
+        vendors = (
+            valid_vendors
+            .filter(Q(search_vector=query) | Q(vendor_name__trigram_similar=keyword))
+            .annotate(rank=_rank('vendor_name', query, keyword))
+            .order_by('-rank')
+            .values_list('pk', 'rank')[:limit]
+        )
+        for vendor_id, rank in vendors:
+            scores[vendor_id] += rank
+
+    ranked_ids = sorted(scores, key=scores.get, reverse=True)[:limit]
+    vendors_by_pk = Vendor.objects.select_related('user_profile').in_bulk(ranked_ids)
+    result = []
+    for vendor_id in ranked_ids:
+        vendor = vendors_by_pk[vendor_id]
+        vendor.rank = scores[vendor_id]
+        vendor.matching_dishes = dishes_by_vendor.get(vendor_id, [])
+        result.append(vendor)
+    return result
+
+
+def _rank(title_field: str, query: SearchQuery, keyword: str):
+    rank = Coalesce(SearchRank(F('search_vector'), query), Value(0.0), output_field=FloatField())
+    return rank + TrigramSimilarity(title_field, keyword)
+
+
+def update_vendor_search_vectors(vendors: QuerySet) -> None:
+
+    vendors.update(search_vector=SearchVector('vendor_name', weight='A', config=SEARCH_CONFIG))
+
+
+def update_fooditem_search_vectors(fooditems: QuerySet) -> None:
+    """Recompute the vectors of the food items in one UPDATE, the category name is read by a subquery"""
+
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('category_name'))
+    fooditems.update(search_vector=SearchVector('food_title', weight='A', config=SEARCH_CONFIG)
+                     + SearchVector(category_name, weight='B', config=SEARCH_CONFIG)
+                     + SearchVector('description', weight='C', config=SEARCH_CONFIG))
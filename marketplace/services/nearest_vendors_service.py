@@ -0,0 +1,142 @@
+import math
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import GeometryDistance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+
+from vendors.models import Vendor
+
+_VERSION_KEY = 'nearby_vendors:version'
+_GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# requested radii are rounded up to one of these, larger ones are not cached
+RADIUS_BUCKETS_KM = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+EARTH_RADIUS_KM = 6371.0088
+
+
+def get_nearest_vendors(longitude, latitude, radius_km, limit: Optional[int] = None,
+                        vendors: Optional[QuerySet] = None) -> list:
+    """Valid vendors (or the given ones) within the radius, closest to the point first, with distance and kms set"""
+
+    distances = get_nearby_vendor_distances(longitude, latitude, radius_km)
+    if vendors is None:
+        vendors = Vendor.objects.valid_vendors()
+        if limit:
+            # every ranked vendor is valid unless it changed since, then a page may come out shorter
+            distances = distances[:limit]
+
+    vendors_by_pk = vendors.select_related('user_profile').in_bulk([vendor_id for vendor_id, _ in distances])
+    nearest = _rank_by_distance(vendors_by_pk, distances)
+    return nearest[:limit] if limit else nearest
+
+
+def sort_vendors_by_distance(vendors: list, longitude, latitude, radius_km) -> list:
+    """Already loaded vendors within the radius, closest to the point first, with distance and kms set"""
+
+    distances = get_nearby_vendor_distances(longitude, latitude, radius_km)
+    return _rank_by_distance({vendor.pk: vendor for vendor in vendors}, distances)
+
+
+def _rank_by_distance(vendors_by_pk: dict, distances: list) -> list:
+
+    nearest = []
+    for vendor_id, km in distances:
+        vendor = vendors_by_pk.get(vendor_id)
+        if vendor is None:
+            continue
+        vendor.distance = D(km=km)
+        vendor.kms = round(km, 1)
+        nearest.append(vendor)
+    return nearest
+
+
+def get_nearby_vendor_distances(longitude, latitude, radius_km) -> list:
+    """[(vendor_id, km), ...] of the valid vendors within the radius of the point, nearest first.
+
+    The candidates are cached per geohash cell of the point and radius bucket, so all requests from one cell share
+    a single spatial query: the vendors within the bucket radius of the cell center, padded by the cell diagonal,
+    with their coordinates. Distances and the radius are then measured from the point itself"""
+
+    longitude, latitude, radius_km = float(longitude), float(latitude), float(radius_km)
+    bucket = next((bucket for bucket in RADIUS_BUCKETS_KM if bucket >= radius_km), None)
+    if bucket is None:
+        candidates = _query_vendor_candidates(longitude, latitude, radius_km)
+    else:
+        precision = getattr(settings, 'NEARBY_VENDORS_GEOHASH_PRECISION', 6)
+        cell, (min_longitude, min_latitude, max_longitude, max_latitude) = _geohash_cell(longitude, latitude, precision)
+        key = f'nearby_vendor_candidates:{cache.get(_VERSION_KEY, 0)}:{cell}:{bucket}'
+        candidates = cache.get(key)
+        if candidates is None:
+            diagonal_km = _great_circle_km(min_longitude, min_latitude, max_longitude, max_latitude)
+            candidates = _query_vendor_candidates((min_longitude + max_longitude) / 2,
+                                                  (min_latitude + max_latitude) / 2, bucket + diagonal_km)
+            cache.set(key, candidates, timeout=getattr(settings, 'NEARBY_VENDORS_CACHE_TIMEOUT', 600))
+
+    distances = [(vendor_id, round(_great_circle_km(longitude, latitude, vendor_longitude, vendor_latitude), 3))
+                 for vendor_id, vendor_longitude, vendor_latitude in candidates]
+    return sorted([(vendor_id, km) for vendor_id, km in distances if km <= radius_km], key=lambda item: item[1])
+
+
+def invalidate_nearby_vendors() -> None:
+    """Drop the cached rankings of every cell once the current transaction is committed"""
+
+    def _bump_version():
+        cache.add(_VERSION_KEY, 0, timeout=None)
+        cache.incr(_VERSION_KEY)
+
+    transaction.on_commit(_bump_version)
+
+
+def _query_vendor_candidates(longitude: float, latitude: float, radius_km: float) -> list:
+    """[(vendor_id, longitude, latitude), ...] of the valid vendors within the radius, nearest first.
+
+    Ordering by the KNN <-> operator with a LIMIT lets PostgreSQL walk the GiST index of the location
+    geography column nearest first instead of computing the distance of every vendor"""
+
+    point = Point(longitude, latitude, srid=4326)
+    rows = Vendor.objects.valid_vendors().filter(
+        user_profile__location__dwithin=(point, D(km=radius_km))
+    ).order_by(
+        GeometryDistance('user_profile__location', point)
+    ).values_list('pk', 'user_profile__location')[:getattr(settings, 'NEARBY_VENDORS_CACHE_LIMIT', 1000)]
+    return [(vendor_id, location.x, location.y) for vendor_id, location in rows]
+
+
+def _great_circle_km(longitude: float, latitude: float, other_longitude: float, other_latitude: float) -> float:
+    """Haversine distance on the mean Earth sphere, within 0.5% of the spheroid distance of PostGIS"""
+
+    longitude, latitude, other_longitude, other_latitude = map(
+        math.radians, (longitude, latitude, other_longitude, other_latitude))
+    a = (math.sin((other_latitude - latitude) / 2) ** 2
+         + math.cos(latitude) * math.cos(other_latitude) * math.sin((other_longitude - longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _geohash_cell(longitude: float, latitude: float, precision: int) -> tuple:
+    """Return (geohash, (min longitude, min latitude, max longitude, max latitude)) of the cell containing the point"""
+
+    longitude_range, latitude_range = [-180.0, 180.0], [-90.0, 90.0]
+    cell = []
+    bits = bits_count = 0
+    even = True
+    while len(cell) < precision:
+        # bits alternate between longitude and latitude, starting with longitude
+        value_range, value = (longitude_range, longitude) if even else (latitude_range, latitude)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        even = not even
+        bits_count += 1
+        if bits_count == 5:
+            cell.append(_GEOHASH_ALPHABET[bits])
+            bits = bits_count = 0
+    return ''.join(cell), (longitude_range[0], latitude_range[0], longitude_range[1], latitude_range[1])
@@ -0,0 +1,425 @@
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from accounts.models import User
+from marketplace.services.full_text_search_service import search_vendors, update_vendor_search_vectors, \
+    update_fooditem_search_vectors, SEARCH_VENDORS_LIMIT
+from menu.models import Category, FoodItem
+from vendors.models import Vendor
+
+SUGGESTIONS_LIMIT = 10
+# fields of FoodItem kept by InMemorySearchBackend to display the matching dishes
+_DISH_FIELDS = [field.attname for field in FoodItem._meta.concrete_fields if field.name != 'search_vector']
+
+
+class BaseSearchBackend:
+    """Interface of the vendor and dish search used by the search services.
+
+    search() returns valid vendors, only the ones open now with open_now, most relevant first, each with `rank`
+    and its matching available dishes in `matching_dishes`. The index_*/remove_* hooks are called by
+    marketplace.signals on every change.
+    """
+
+    def search(self, keyword: str, match_vendors: bool = True, match_dishes: bool = True,
+               limit: int = SEARCH_VENDORS_LIMIT, open_now: bool = False) -> list:
+        raise NotImplementedError
+
+    def suggest(self, prefix: str, limit: int = SUGGESTIONS_LIMIT) -> list:
+        """Vendor names, dish titles and category names for a typeahead"""
+        raise NotImplementedError
+
+    def index_vendor(self, vendor: Vendor) -> None:
+        pass
+
+    def remove_vendor(self, vendor: Vendor) -> None:
+        pass
+
+    def index_user(self, user: User) -> None:
+        """Called when a vendor account is activated or deactivated"""
+        pass
+
+    def index_category(self, category: Category) -> None:
+        pass
+
+    def remove_category(self, category: Category) -> None:
+        pass
+
+    def index_fooditem(self, fooditem: FoodItem) -> None:
+        pass
+
+    def remove_fooditem(self, fooditem: FoodItem) -> None:
+        pass
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Full-text and trigram search over the search_vector columns and GIN indexes of PostgreSQL"""
+
+    def search(self, keyword: str, match_vendors: bool = True, match_dishes: bool = True,
+               limit: int = SEARCH_VENDORS_LIMIT, open_now: bool = False) -> list:
+        return search_vendors(keyword, match_vendors=match_vendors, match_dishes=match_dishes, limit=limit,
+                              open_now=open_now)
+
+    def suggest(self, prefix: str, limit: int = SUGGESTIONS_LIMIT) -> list:
+
+        # icontains is served by the trigram GIN indexes
+        suggestions = list(Vendor.objects.valid_vendors().filter(vendor_name__icontains=prefix)
+                           .order_by('vendor_name').values_list('vendor_name', flat=True)[:limit])
+        if len(suggestions) < limit:
+            suggestions += FoodItem.objects.filter(
+                is_available=True, vendor__in=Vendor.objects.valid_vendors(), food_title__icontains=prefix
+            ).order_by('food_title').values_list('food_title', flat=True).distinct()[:limit - len(suggestions)]
+        return suggestions
+
+    def index_vendor(self, vendor: Vendor) -> None:
+        update_vendor_search_vectors(Vendor.objects.filter(pk=vendor.pk))
+
+    def index_category(self, category: Category) -> None:
+        update_fooditem_search_vectors(FoodItem.objects.filter(category=category))
+
+    def index_fooditem(self, fooditem: FoodItem) -> None:
+        update_fooditem_search_vectors(FoodItem.objects.filter(pk=fooditem.pk))
+
+
+class _PrefixTrie:
+    """Set of tokens that lists the tokens starting with a prefix in alphabetical order"""
+
+    _END = ''
+
+    def __init__(self):
+        self._root = {}
+
+    def add(self, token: str) -> None:
+        node = self._root
+        for char in token:
+            node = node.setdefault(char, {})
+        node[self._END] = True
+
+    def remove(self, token: str) -> None:
+        path = [self._root]
+        for char in token:
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].pop(self._END, None)
+        # prune the branches left empty, path[depth] is the node of token[:depth]
+        for depth in range(len(token), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][token[depth - 1]]
+
+    def tokens_with_prefix(self, prefix: str):
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return
+        stack = [(prefix, node)]
+        while stack:
+            token, node = stack.pop()
+            if self._END in node:
+                yield token
+            stack.extend((token + char, child) for char, child in sorted(node.items(), reverse=True)
+                         if char != self._END)
+
+
+class InMemorySearchBackend(BaseSearchBackend):
+    """Inverted index with a prefix trie over vendor names, dish titles and category names, kept in the process.
+
+    Built from the database on first use, then updated incrementally after every committed change.
+    Every process has its own index, so it suits development, tests and single process deployments.
+    Query tokens match indexed tokens by prefix, an exact match scores twice as much. All vendors are indexed
+    along with whether they are valid, so results and suggestions are limited to the valid ones without a query.
+    Dishes keep the fields they are displayed with, search() only queries the vendors of the page.
+    """
+
+    # relevance of a token by where it was found
+    VENDOR_NAME_WEIGHT = 1.0
+    FOOD_TITLE_WEIGHT = 1.0
+    CATEGORY_NAME_WEIGHT = 0.4
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._trie = _PrefixTrie()
+        # token -> {(kind, id), ...}, kind is 'vendor' or 'dish'
+        self._postings = defaultdict(set)
+        # (kind, id) -> {'vendor_id': ..., 'tokens': {token: weight}, 'labels': [...], 'dish': {...}}
+        self._docs = {}
+        # vendor_id -> {'user_id': ..., 'is_listed': approved and listed, 'is_active': of the user}
+        self._vendors = {}
+        self._vendor_ids_by_user = {}
+        # token -> Counter of the (name, vendor_id) containing it, for suggestions
+        self._labels = defaultdict(Counter)
+        # category_id -> (category_name, vendor_id)
+        self._categories = {}
+        self._category_dishes = defaultdict(set)
+
+    def search(self, keyword: str, match_vendors: bool = True, match_dishes: bool = True,
+               limit: int = SEARCH_VENDORS_LIMIT, open_now: bool = False) -> list:
+
+        tokens = _tokenize(keyword)
+        if not tokens:
+            return []
+        kinds = {kind for kind, enabled in (('vendor', match_vendors), ('dish', match_dishes)) if enabled}
+
+        with self._lock:
+            self._ensure_loaded()
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for indexed_token in self._trie.tokens_with_prefix(token):
+                    exact = 1.0 if indexed_token == token else 0.5
+                    for doc in self._postings.get(indexed_token, ()):
+                        if doc[0] in kinds:
+                            score = self._docs[doc]['tokens'][indexed_token] * exact
+                            token_scores[doc] = max(token_scores.get(doc, 0.0), score)
+                # every query token has to match
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {doc: score + token_scores[doc] for doc, score in scores.items() if doc in token_scores}
+            scores = {doc: score for doc, score in scores.items() if self._is_valid(self._docs[doc]['vendor_id'])}
+            vendor_ids = {doc: self._docs[doc]['vendor_id'] for doc in scores}
+            dishes = {doc[1]: (self._docs[doc]['dish'], self._categories.get(self._docs[doc]['category_id']))
+                      for doc in scores if doc[0] == 'dish'}
+
+        vendor_scores = defaultdict(float)
+        dishes_by_vendor = defaultdict(list)
+        for doc, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            kind, id_ = doc
+            vendor_id = vendor_ids[doc]
+            if kind == 'vendor':
+                vendor_scores[vendor_id] += score
+            else:
+                if not dishes_by_vendor[vendor_id]:
+                    vendor_scores[vendor_id] += score
+                dishes_by_vendor[vendor_id].append(id_)
+
+        ranked_ids = sorted(vendor_scores, key=vendor_scores.get, reverse=True)
+        vendors = Vendor.objects.select_related('user_profile')
+        if open_now:
+            # opening hours are compiled with update(), so open_now is read from the database
+            vendors = vendors.open_now()
+        else:
+            ranked_ids = ranked_ids[:limit]
+        vendors_by_pk = vendors.in_bulk(ranked_ids)
+        ranked_ids = [vendor_id for vendor_id in ranked_ids if vendor_id in vendors_by_pk][:limit]
+
+        result = []
+        for vendor_id in ranked_ids:
+            vendor = vendors_by_pk[vendor_id]
+            vendor.rank = vendor_scores[vendor_id]
+            vendor.matching_dishes = [_build_dish(*dishes[dish_id]) for dish_id in dishes_by_vendor.get(vendor_id, [])]
+            result.append(vendor)
+        return result
+
+    def suggest(self, prefix: str, limit: int = SUGGESTIONS_LIMIT) -> list:
+
+        tokens = _tokenize(prefix)
+        if not tokens:
+            return []
+        suggestions = []
+        with self._lock:
+            self._ensure_loaded()
+            for token in self._trie.tokens_with_prefix(tokens[-1]):
+                for label, vendor_id in self._labels.get(token, ()):
+                    if label in suggestions or not self._is_valid(vendor_id):
+                        continue
+                    # the words before the last one have to be complete
+                    if set(tokens[:-1]) <= set(_tokenize(label)):
+                        suggestions.append(label)
+                        if len(suggestions) == limit:
+                            return suggestions
+        return suggestions
+
+    def index_vendor(self, vendor: Vendor) -> None:
+        # the user of an indexed vendor is followed by index_user, a new vendor brings it along
+        is_active = vendor.user.is_active if self._loaded and vendor.pk not in self._vendors else None
+        self._on_commit(self._set_vendor, vendor.pk, vendor.vendor_name, vendor.user_id,
+                        vendor.is_approved and vendor.is_listed, is_active)
+
+    def remove_vendor(self, vendor: Vendor) -> None:
+        self._on_commit(self._remove_vendor, vendor.pk)
+
+    def index_user(self, user: User) -> None:
+        self._on_commit(self._set_user_active, user.pk, user.is_active)
+
+    def index_category(self, category: Category) -> None:
+        self._on_commit(self._set_category, category.pk, category.category_name, category.vendor_id)
+
+    def remove_category(self, category: Category) -> None:
+        self._on_commit(self._set_category, category.pk, None, category.vendor_id)
+
+    def index_fooditem(self, fooditem: FoodItem) -> None:
+        if fooditem.is_available:
+            self._on_commit(self._add_dish, {field: getattr(fooditem, field) for field in _DISH_FIELDS})
+        else:
+            self.remove_fooditem(fooditem)
+
+    def remove_fooditem(self, fooditem: FoodItem) -> None:
+        self._on_commit(self._remove_dish, fooditem.pk)
+
+    def _on_commit(self, method, *args) -> None:
+
+        def apply():
+            with self._lock:
+                # changes before the first load are part of it
+                if self._loaded:
+                    method(*args)
+
+        transaction.on_commit(apply)
+
+    def _ensure_loaded(self) -> None:
+
+        if self._loaded:
+            return
+        vendors = Vendor.objects.values_list('pk', 'vendor_name', 'user', 'is_approved', 'is_listed', 'user__is_active')
+        for vendor_id, vendor_name, user_id, is_approved, is_listed, is_active in vendors:
+            self._set_vendor(vendor_id, vendor_name, user_id, is_approved and is_listed, is_active)
+        for category_id, category_name, vendor_id in Category.objects.values_list('pk', 'category_name', 'vendor'):
+            self._categories[category_id] = (category_name, vendor_id)
+            self._add_labels(category_name, vendor_id)
+        for dish in FoodItem.objects.filter(is_available=True).values(*_DISH_FIELDS):
+            self._add_dish(dish)
+        self._loaded = True
+
+    def _is_valid(self, vendor_id: int) -> bool:
+        vendor = self._vendors.get(vendor_id)
+        return vendor is not None and vendor['is_listed'] and vendor['is_active']
+
+    def _set_vendor(self, vendor_id: int, vendor_name: str, user_id: int, is_listed: bool, is_active) -> None:
+
+        if is_active is None:
+            is_active = self._vendors.get(vendor_id, {}).get('is_active', False)
+        self._vendors[vendor_id] = {'user_id': user_id, 'is_listed': is_listed, 'is_active': is_active}
+        self._vendor_ids_by_user[user_id] = vendor_id
+        self._add_doc(('vendor', vendor_id), vendor_id, {vendor_name: self.VENDOR_NAME_WEIGHT})
+
+    def _remove_vendor(self, vendor_id: int) -> None:
+
+        vendor = self._vendors.pop(vendor_id, None)
+        if vendor is not None:
+            self._vendor_ids_by_user.pop(vendor['user_id'], None)
+        self._remove_doc(('vendor', vendor_id))
+
+    def _set_user_active(self, user_id: int, is_active: bool) -> None:
+
+        vendor = self._vendors.get(self._vendor_ids_by_user.get(user_id))
+        if vendor is not None:
+            vendor['is_active'] = is_active
+
+    def _add_dish(self, dish: dict) -> None:
+        """Index an available dish from the values of its _DISH_FIELDS"""
+
+        fooditem_id, category_id = dish['id'], dish['category_id']
+        previous = self._docs.get(('dish', fooditem_id))
+        if previous is not None:
+            # the dish could be moved to another category
+            self._category_dishes[previous['category_id']].discard(fooditem_id)
+        self._category_dishes[category_id].add(fooditem_id)
+        names = {dish['food_title']: self.FOOD_TITLE_WEIGHT}
+        category_name, _ = self._categories.get(category_id, (None, None))
+        if category_name:
+            names.setdefault(category_name, self.CATEGORY_NAME_WEIGHT)
+        self._add_doc(('dish', fooditem_id), dish['vendor_id'], names, category_id=category_id, dish=dish)
+
+    def _remove_dish(self, fooditem_id: int) -> None:
+
+        doc = self._docs.get(('dish', fooditem_id))
+        if doc is not None:
+            self._category_dishes[doc['category_id']].discard(fooditem_id)
+        self._remove_doc(('dish', fooditem_id))
+
+    def _set_category(self, category_id: int, category_name, vendor_id: int) -> None:
+
+        old_name, old_vendor_id = self._categories.pop(category_id, (None, None))
+        if old_name:
+            self._remove_labels(old_name, old_vendor_id)
+        if category_name:
+            self._categories[category_id] = (category_name, vendor_id)
+            self._add_labels(category_name, vendor_id)
+        # the dishes of the category carry its name
+        for fooditem_id in list(self._category_dishes[category_id]):
+            doc = self._docs[('dish', fooditem_id)]
+            self._remove_doc(('dish', fooditem_id))
+            if category_name:
+                self._add_dish(doc['dish'])
+            else:
+                self._category_dishes[category_id].discard(fooditem_id)
+
+    def _add_doc(self, doc: tuple, vendor_id: int, names: dict, category_id=None, dish=None) -> None:
+        """Index the names of the document, the first one is its own label for suggestions"""
+
+        self._remove_doc(doc)
+        tokens = {}
+        for name, weight in names.items():
+            for token in _tokenize(name):
+                tokens[token] = max(tokens.get(token, 0.0), weight)
+        for token in tokens:
+            self._trie.add(token)
+            self._postings[token].add(doc)
+        labels = list(names)[:1]
+        for label in labels:
+            self._add_labels(label, vendor_id)
+        self._docs[doc] = {'vendor_id': vendor_id, 'category_id': category_id, 'tokens': tokens, 'labels': labels,
+                           'dish': dish}
+
+    def _remove_doc(self, doc: tuple) -> None:
+
+        data = self._docs.pop(doc, None)
+        if data is None:
+            return
+        for token in data['tokens']:
+            self._postings[token].discard(doc)
+            if not self._postings[token]:
+                del self._postings[token]
+                if not self._labels.get(token):
+                    self._trie.remove(token)
+        for label in data['labels']:
+            self._remove_labels(label, data['vendor_id'])
+
+    def _add_labels(self, label: str, vendor_id: int) -> None:
+        for token in _tokenize(label):
+            self._labels[token][(label, vendor_id)] += 1
+            self._trie.add(token)
+
+    def _remove_labels(self, label: str, vendor_id: int) -> None:
+
+        for token in _tokenize(label):
+            labels = self._labels.get(token)
+            if labels is None:
+                continue
+            labels[(label, vendor_id)] -= 1
+            if labels[(label, vendor_id)] <= 0:
+                del labels[(label, vendor_id)]
+            if not labels:
+                del self._labels[token]
+                if token not in self._postings:
+                    self._trie.remove(token)
+
+
+def _tokenize(text: str) -> list:
+    return re.findall(r'\w+', text.lower())
+
+
+def _build_dish(dish: dict, category) -> FoodItem:
+    """FoodItem of the indexed values, with its category as far as the index knows it"""
+
+    fooditem = FoodItem(**dish)
+    category_name, vendor_id = category or ('', dish['vendor_id'])
+    fooditem.category = Category(pk=dish['category_id'], category_name=category_name, vendor_id=vendor_id)
+    return fooditem
+
+
+@lru_cache(maxsize=None)
+def get_search_backend() -> BaseSearchBackend:
+
+    backend = getattr(settings, 'SEARCH_BACKEND', 'marketplace.services.search_backend_service.PostgresSearchBackend')
+    return import_string(backend)()
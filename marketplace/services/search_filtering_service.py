@@ -1,51 +1,50 @@
-from django.contrib.gis.db.models.functions import Distance
-from django.contrib.gis.geos import GEOSGeometry
-from django.contrib.gis.measure import D
+from django.db.models import QuerySet
 
-from menu.models import FoodItem
+from marketplace.services.nearest_vendors_service import get_nearest_vendors, sort_vendors_by_distance
+from marketplace.services.search_backend_service import get_search_backend, SUGGESTIONS_LIMIT
 from vendors.models import Vendor
 
 
-def get_all_valid_vendors() -> dict:
+def get_all_valid_vendors(open_now: bool = False) -> dict:
 
-    vendors = Vendor.objects.valid_vendors()
+    # open vendors first, the open_now flag is read from weekly_open_slots in the query
+    vendors = Vendor.objects.valid_vendors().with_open_now().select_related('user_profile').order_by(
+        '-open_now', 'vendor_name')
+    if open_now:
+        vendors = vendors.filter(open_now=True)
     vendors_count = vendors.count()
 
     response = {'vendors': vendors, 'vendors_count': vendors_count}
     return response
 
 
-def search_vendors_by_keyword(keyword: tuple, options: str) -> dict:
+def search_vendors_by_keyword(keyword: tuple, options: str, open_now: bool = False) -> dict:
 
-    if options == 'vendor':
-        vendors = Vendor.objects.valid_vendors().filter(vendor_name__icontains=keyword)
-        vendors_count = vendors.count()
-    else:  # options == fooditem
-        fetch_vendors_by_fooditems = FoodItem.objects.filter(food_title__icontains=keyword, is_available=True) \
-            .values_list('vendor', flat=True)
-        vendors = Vendor.objects.valid_vendors().filter(id__in=fetch_vendors_by_fooditems)
-        vendors_count = vendors.count()
+    # options == 'vendor' looks for vendor names, 'fooditem' for dishes
+    vendors = get_search_backend().search(keyword, match_vendors=options == 'vendor',
+                                          match_dishes=options != 'vendor', open_now=open_now)
 
-    response = {'vendors': vendors, 'vendors_count': vendors_count}
+    response = {'vendors': vendors, 'vendors_count': len(vendors)}
     return response
 
 
 def filter_vendors_by_geo_position(latitude: tuple, longitude: tuple, radius: tuple, address: tuple, context: dict) -> dict:
 
-    pnt = GEOSGeometry("POINT(%s %s)" % (longitude, latitude))
-
-    vendors = Vendor.objects.valid_vendors().filter(
-        id__in=context['vendors'],
-        user_profile__location__distance_lte=(pnt, D(km=radius))
-    ).annotate(distance=Distance("user_profile__location", pnt)).order_by("distance")
-
-    for vendor in vendors:
-        vendor.kms = round(vendor.distance.km, 1)
-    vendors_count = vendors.count()
+    if isinstance(context['vendors'], QuerySet):
+        vendors = get_nearest_vendors(longitude=longitude, latitude=latitude, radius_km=radius,
+                                      vendors=context['vendors'])
+    else:
+        vendors = sort_vendors_by_distance(context['vendors'], longitude=longitude, latitude=latitude,
+                                           radius_km=radius)
 
     response = {
         'vendors': vendors,
-        'vendors_count': vendors_count,
+        'vendors_count': len(vendors),
         'customer_location': address
     }
     return response
+
+
+def suggest_search_terms(prefix: str, limit: int = SUGGESTIONS_LIMIT) -> dict:
+
+    return {'suggestions': get_search_backend().suggest(prefix, limit=limit)}
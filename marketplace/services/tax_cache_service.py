@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from food_marketplace.money import Money, to_basis_points
+from marketplace.models import Tax
+
+_VERSION_KEY = 'tax_rules:version'
+
+
+class _TaxRulesCache:
+    """Active tax rules of this worker process.
+
+    Rules are reloaded only when the shared version key in the default cache changes. The key itself is
+    re-read at most once per TAX_RULES_VERSION_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def get_rules(self) -> tuple:
+
+        check_interval = getattr(settings, 'TAX_RULES_VERSION_CHECK_INTERVAL', 5)
+        with self._lock:
+            now = time.monotonic()
+            if self._rules is not None and now - self._checked_at < check_interval:
+                return self._rules
+            version = cache.get(_VERSION_KEY)
+            if self._rules is None or version != self._version:
+                self._rules = tuple(
+                    (tax_type, str(percentage), to_basis_points(percentage))
+                    for tax_type, percentage in Tax.objects.filter(is_active=True).values_list('tax_type',
+                                                                                              'tax_percentage')
+                )
+                self._version = version
+            self._checked_at = now
+            return self._rules
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rules = None
+
+
+_tax_rules_cache = _TaxRulesCache()
+
+
+def get_active_tax_rules() -> tuple:
+    """Return ((tax_type, tax_percentage, basis_points), ...) of the active taxes"""
+
+    return _tax_rules_cache.get_rules()
+
+
+def invalidate_tax_rules() -> None:
+    """Make every worker reload the tax rules once the current transaction is committed"""
+
+    def _bump_version():
+        _tax_rules_cache.reset()
+        cache.add(_VERSION_KEY, 0, timeout=None)
+        cache.incr(_VERSION_KEY)
+
+    transaction.on_commit(_bump_version)
+
+
+def get_tax_data(subtotal: Money) -> dict:
+
+    return get_tax_data_batch(subtotals=[subtotal])[0]
+
+
+def get_tax_data_batch(subtotals: Iterable[Money]) -> list:
+    """Compute {'tax_dict': ..., 'taxes': ...} for every subtotal with one lookup of the tax rules"""
+
+    rules = get_active_tax_rules()
+    response = []
+    for subtotal in subtotals:
+        tax_dict = {}
+        taxes = Money(0)
+        for tax_type, percentage, basis_points in rules:
+            tax_amount = subtotal.apply_rate(basis_points)
+            tax_dict.update({tax_type: {percentage: tax_amount}})
+            taxes += tax_amount
+        response.append({'tax_dict': tax_dict, 'taxes': taxes})
+    return response
@@ -4,7 +4,7 @@ from django.db.models import Prefetch
 
 from accounts.models import UserProfile
 from food_marketplace.services import get_today_day
-from marketplace.models import Cart
+from marketplace.services.cart_manipulation_services import get_live_cart_items
 from menu.models import Category, FoodItem
 from vendors.models import Vendor, OpeningHour
 
@@ -44,8 +44,7 @@ def _get_ordered_opening_hours_by_vendor(vendor_slug: str):
 
 def _get_cart_items_by_user(user_id) -> dict:
 
-    cart_items = Cart.objects.filter(user_id=user_id)
-    return {'cart_items': cart_items}
+    return {'cart_items': get_live_cart_items(user_id=user_id)}
 
 
 def get_vendor_detail(vendor_slug, user_id):
@@ -0,0 +1,106 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import User, UserProfile
+from marketplace.models import Tax
+from marketplace.services.nearest_vendors_service import invalidate_nearby_vendors
+from marketplace.services.search_backend_service import get_search_backend
+from menu.models import Category, FoodItem
+from marketplace.services.tax_cache_service import invalidate_tax_rules
+from vendors.models import Vendor
+
+
+@receiver([post_save, post_delete], sender=Tax)
+def invalidate_tax_rules_on_change(sender, **kwargs):
+    invalidate_tax_rules()
+
+
+@receiver(pre_save, sender=Vendor)
+def detect_nearby_vendor_change(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding:
+        instance._nearby_vendors_changed = instance.is_approved and instance.is_listed
+    else:
+        instance._nearby_vendors_changed = _has_changed(instance, ['is_approved', 'is_listed', 'user_profile_id'],
+                                                        update_fields)
+
+
+@receiver(post_save, sender=Vendor)
+def invalidate_nearby_vendors_on_vendor_change(sender, instance, **kwargs):
+    if instance._nearby_vendors_changed:
+        invalidate_nearby_vendors()
+
+
+@receiver(post_delete, sender=Vendor)
+def invalidate_nearby_vendors_on_vendor_removal(sender, **kwargs):
+    invalidate_nearby_vendors()
+
+
+@receiver(pre_save, sender=UserProfile)
+def detect_location_change(sender, instance, update_fields=None, **kwargs):
+    # a new profile has no vendor yet
+    instance._nearby_vendors_changed = not instance._state.adding and _has_changed(instance, ['location'],
+                                                                                   update_fields)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_nearby_vendors_on_location_change(sender, instance, **kwargs):
+    if instance._nearby_vendors_changed and Vendor.objects.filter(user_profile=instance).exists():
+        invalidate_nearby_vendors()
+
+
+@receiver(pre_save, sender=User)
+def detect_vendor_activation(sender, instance, update_fields=None, **kwargs):
+    instance._nearby_vendors_changed = (instance.role == User.VENDOR and not instance._state.adding
+                                        and _has_changed(instance, ['is_active'], update_fields))
+
+
+@receiver(post_save, sender=User)
+def invalidate_nearby_vendors_on_vendor_activation(sender, instance, **kwargs):
+    if instance._nearby_vendors_changed:
+        invalidate_nearby_vendors()
+
+
+@receiver(post_save, sender=Vendor)
+def index_vendor(sender, instance, **kwargs):
+    get_search_backend().index_vendor(instance)
+
+
+@receiver(post_delete, sender=Vendor)
+def remove_vendor_from_index(sender, instance, **kwargs):
+    get_search_backend().remove_vendor(instance)
+
+
+@receiver(post_save, sender=User)
+def index_vendor_user(sender, instance, update_fields=None, **kwargs):
+    if instance.role == User.VENDOR and (update_fields is None or 'is_active' in update_fields):
+        get_search_backend().index_user(instance)
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):
+    get_search_backend().index_category(instance)
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_from_index(sender, instance, **kwargs):
+    get_search_backend().remove_category(instance)
+
+
+@receiver(post_save, sender=FoodItem)
+def index_fooditem(sender, instance, **kwargs):
+    get_search_backend().index_fooditem(instance)
+
+
+@receiver(post_delete, sender=FoodItem)
+def remove_fooditem_from_index(sender, instance, **kwargs):
+    get_search_backend().remove_fooditem(instance)
+
+
+def _has_changed(instance, fields: list, update_fields=None) -> bool:
+    """Whether the instance about to be saved differs from its row in any of the fields, given by attname"""
+
+    if update_fields is not None and not any(instance._meta.get_field(name).attname in fields
+                                             for name in update_fields):
+        return False
+    row = type(instance)._default_manager.filter(pk=instance.pk).values(*fields).first()
+    return row is None or any(row[field] != getattr(instance, field) for field in fields)
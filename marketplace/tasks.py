@@ -0,0 +1,21 @@
+from celery import shared_task
+
+from marketplace.services.cart_storage_service import flush_cart, get_cart_storage
+
+
+@shared_task(bind=True, max_retries=3)
+def flush_cart_task(self, user_id: int):
+    try:
+        flush_cart(user_id=user_id)
+        return 'Success'
+    except Exception:
+        self.retry(countdown=3)
+
+
+@shared_task
+def flush_dirty_carts_task():
+    """Persist carts whose scheduled flush was lost, e.g. because the worker was restarted"""
+    storage = get_cart_storage()
+    for user_id in getattr(storage, 'get_dirty_user_ids', list)():
+        flush_cart(user_id=user_id)
+    return 'Success'
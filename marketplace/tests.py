@@ -1,3 +1,482 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User, UserProfile
+from food_marketplace.money import Money, format_amounts, to_basis_points
+from food_marketplace.testing import create_category, create_customer, create_fooditem, create_vendor
+from marketplace.context_processors import cart_context_evaluations, get_cart_amounts, get_cart_counter
+from marketplace.models import Cart, Tax
+from marketplace.services.cart_data_service import CartSummary, get_cart_summary
+from marketplace.services.cart_manipulation_services import get_live_cart_items
+from marketplace.services.cart_storage_service import flush_cart, get_cart_storage
+from marketplace.services.full_text_search_service import search_vendors, update_fooditem_search_vectors, \
+    SEARCH_CONFIG
+from marketplace.services.nearest_vendors_service import get_nearest_vendors, get_nearby_vendor_distances
+from marketplace.services.search_backend_service import get_search_backend
+from marketplace.services.tax_cache_service import _tax_rules_cache, get_active_tax_rules, get_tax_data_batch
+from menu.models import Category, FoodItem
+from vendors.models import Vendor
+
+
+class MarketplaceQueryPlanTest(TestCase):
+    """Cart, food item and vendor lookups must be served by their indexes on realistically sized, analyzed tables"""
+
+    VENDORS_COUNT = 2000
+    FOODITEMS_PER_VENDOR = 5
+    CUSTOMERS_COUNT = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([
+            User(first_name='Vendor', last_name=str(i), username=f'vendor{i}', email=f'vendor{i}@example.com',
+                 role=User.VENDOR, is_active=True)
+            for i in range(cls.VENDORS_COUNT)
+        ], batch_size=1000)
+        profiles = UserProfile.objects.bulk_create([UserProfile(user=user) for user in users], batch_size=1000)
+        # one vendor in 50 is valid
+        cls.vendors = Vendor.objects.bulk_create([
+            Vendor(user=user, user_profile=profile, vendor_name=f'Vendor {i}', vendor_slug=f'vendor-{i}',
+                   vendor_license='license.png', is_approved=i % 50 == 0, is_listed=i % 50 == 0)
+            for i, (user, profile) in enumerate(zip(users, profiles))
+        ], batch_size=1000)
+        categories = Category.objects.bulk_create([
+            Category(vendor=vendor, category_name='Pizza' if i % 100 == 0 else 'Salads', slug=f'category-{i}')
+            for i, vendor in enumerate(cls.vendors)
+        ], batch_size=1000)
+        cls.category = categories[0]
+        FoodItem.objects.bulk_create([
+            FoodItem(vendor=category.vendor, category=category, food_title=f'Dish {i} {j}', slug=f'dish-{i}-{j}',
+                     price='9.99', image='food.png', is_available=j % 2 == 0)
+            for i, category in enumerate(categories) for j in range(cls.FOODITEMS_PER_VENDOR)
+        ], batch_size=1000)
+        update_fooditem_search_vectors(FoodItem.objects.all())
+
+        customers = User.objects.bulk_create([
+            User(first_name='Customer', last_name=str(i), username=f'customer{i}', email=f'customer{i}@example.com',
+                 role=User.CUSTOMER, is_active=True)
+            for i in range(cls.CUSTOMERS_COUNT)
+        ])
+        cls.customer = customers[0]
+        fooditems = list(FoodItem.objects.order_by('pk')[:10])
+        Cart.objects.bulk_create([Cart(user=customer, fooditem=fooditem, quantity=1)
+                                  for customer in customers for fooditem in fooditems], batch_size=1000)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, msg=plan)
+
+    def test_cart_items_by_user(self):
+        queryset = Cart.objects.filter(user=self.customer).order_by('created_at')
+        self.assertUsesIndex(queryset, 'cart_user_created_idx')
+
+    def test_valid_vendors(self):
+        self.assertUsesIndex(Vendor.objects.valid_vendors(), 'vendor_approved_listed_idx')
+
+    def test_available_fooditems_by_vendor_and_category(self):
+        queryset = FoodItem.objects.filter(vendor=self.vendors[0], is_available=True, category=self.category)
+        self.assertUsesIndex(queryset, 'fooditem_vendor_avail_cat_idx')
+
+    def test_fooditem_full_text_and_trigram_search(self):
+        query = SearchQuery('pizza', search_type='websearch', config=SEARCH_CONFIG)
+        queryset = FoodItem.objects.filter(Q(search_vector=query) | Q(food_title__trigram_similar='piza'))
+        self.assertUsesIndex(queryset, 'fooditem_search_vector_idx')
+        self.assertUsesIndex(queryset, 'fooditem_title_trgm_idx')
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class NearestVendorsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # roughly 0, 11, 55 and 111 km east of the origin
+        cls.vendors = []
+        for i, longitude in enumerate(['0', '0.1', '0.5', '1']):
+            cls.vendors.append(create_vendor(i, latitude='0', longitude=longitude, is_approved=True, is_listed=True))
+        Vendor.objects.filter(pk=cls.vendors[1].pk).update(is_listed=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_nearest_first_within_radius(self):
+        vendors = get_nearest_vendors(longitude='0.6', latitude='0', radius_km=100)
+        self.assertEqual(vendors, [self.vendors[2], self.vendors[3], self.vendors[0]])
+        for vendor, kms in zip(vendors, [11.1, 44.5, 66.7]):
+            self.assertAlmostEqual(vendor.kms, kms, delta=0.1)
+
+    def test_distances_are_measured_from_the_point(self):
+        # both points are in the geocell spanning longitudes 0.59326 to 0.60425
+        [(vendor_id, km)] = get_nearby_vendor_distances(longitude='0.5935', latitude='0', radius_km=11)
+        self.assertEqual(vendor_id, self.vendors[2].pk)
+        self.assertAlmostEqual(km, 10.4, delta=0.1)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_nearby_vendor_distances(longitude='0.604', latitude='0', radius_km=11), [])
+
+    def test_limit(self):
+        vendors = get_nearest_vendors(longitude='0', latitude='0', radius_km=500, limit=2)
+        self.assertEqual(vendors, [self.vendors[0], self.vendors[2]])
+
+    def test_same_cell_skips_the_spatial_query(self):
+        get_nearby_vendor_distances(longitude='0.6', latitude='0', radius_km=100)
+        with self.assertNumQueries(0):
+            distances = get_nearby_vendor_distances(longitude='0.6001', latitude='0.0001', radius_km=60)
+        self.assertEqual([vendor_id for vendor_id, _ in distances], [self.vendors[2].pk, self.vendors[3].pk])
+
+    def test_location_change_invalidates_the_cache(self):
+        get_nearby_vendor_distances(longitude='0.6', latitude='0', radius_km=100)
+
+        profile = self.vendors[0].user_profile
+        profile.longitude = '0.6'
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+
+        distances = get_nearby_vendor_distances(longitude='0.6', latitude='0', radius_km=100)
+        self.assertEqual(distances[0][0], self.vendors[0].pk)
+
+    def test_unrelated_changes_keep_the_cache(self):
+        get_nearby_vendor_distances(longitude='0.6', latitude='0', radius_km=100)
+
+        profile = self.vendors[0].user_profile
+        profile.address = 'Street'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            profile.save()
+            self.vendors[0].user.save(update_fields=['last_login'])
+        self.assertEqual(callbacks, [])
+
+
+class SearchVendorsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendors = {}
+        menus = {'Pizza Palace': {'Pizza': ['Margherita', 'Pepperoni']}, 'Sushi Bar': {'Rolls': ['Salmon roll']}}
+        for i, (vendor_name, categories) in enumerate(menus.items()):
+            vendor = create_vendor(i, vendor_name, is_approved=True, is_listed=True)
+            for category_name, dishes in categories.items():
+                category = create_category(vendor, category_name, slug=f'{category_name.lower()}-{i}')
+                for j, dish in enumerate(dishes):
+                    create_fooditem(vendor, category, dish, slug=f'{category.slug}-{j}', price='9.99',
+                                    is_available=True)
+            cls.vendors[vendor_name] = vendor
+
+    def test_dishes_are_ranked_with_their_vendor(self):
+        [vendor] = search_vendors('pepperoni', match_vendors=False)
+        self.assertEqual(vendor, self.vendors['Pizza Palace'])
+        self.assertEqual([dish.food_title for dish in vendor.matching_dishes], ['Pepperoni'])
+
+    def test_typos_match_by_trigrams(self):
+        [vendor] = search_vendors('peperoni', match_vendors=False)
+        self.assertEqual(vendor, self.vendors['Pizza Palace'])
+
+    def test_category_name_matches_its_dishes(self):
+        [vendor] = search_vendors('rolls', match_vendors=False)
+        self.assertEqual(vendor, self.vendors['Sushi Bar'])
+
+    def test_vendor_names(self):
+        self.assertEqual(search_vendors('sushi', match_dishes=False), [self.vendors['Sushi Bar']])
+
+
+@override_settings(SEARCH_BACKEND='marketplace.services.search_backend_service.InMemorySearchBackend')
+class InMemorySearchBackendTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(vendor_name='Pizza Palace', is_approved=True, is_listed=True)
+        cls.category = create_category(cls.vendor, slug='pizza-0')
+        cls.fooditem = create_fooditem(cls.vendor, cls.category, 'Pepperoni', slug='pizza-0-0', price='9.99',
+                                       is_available=True)
+
+    def setUp(self):
+        get_search_backend.cache_clear()
+        self.addCleanup(get_search_backend.cache_clear)
+        self.backend = get_search_backend()
+
+    def test_prefixes_match_dishes(self):
+        [vendor] = self.backend.search('pepp', match_vendors=False)
+        self.assertEqual(vendor, self.vendor)
+        self.assertEqual(vendor.matching_dishes, [self.fooditem])
+
+    def test_open_now_is_part_of_the_query(self):
+        self.assertEqual(self.backend.search('pepp', open_now=True), [])
+        Vendor.objects.filter(pk=self.vendor.pk).update(weekly_open_slots=[(1 << 48) - 1] * 7)
+        self.assertEqual(self.backend.search('pepp', open_now=True), [self.vendor])
+
+    def test_suggestions_complete_the_last_word(self):
+        self.assertEqual(self.backend.suggest('pi'), ['Pizza Palace', 'Pizza'])
+        self.assertEqual(self.backend.suggest('pizza pa'), ['Pizza Palace'])
+
+    def test_index_is_updated_on_commit(self):
+        self.backend.search('pepperoni')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fooditem.food_title = 'Margherita'
+            self.fooditem.save()
+        self.assertEqual(self.backend.search('pepperoni'), [])
+        self.assertEqual(self.backend.suggest('marg'), ['Margherita'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fooditem.delete()
+        self.assertEqual(self.backend.search('margherita', match_vendors=False), [])
+
+    def test_moved_dish_leaves_its_old_category(self):
+        self.backend.search('pepperoni')
+        with self.captureOnCommitCallbacks(execute=True):
+            category = create_category(self.vendor, 'Specials', slug='specials-0')
+            self.fooditem.category = category
+            self.fooditem.save()
+            self.category.category_name = 'Calzone'
+            self.category.save()
+        self.assertEqual(self.backend.search('calzone', match_vendors=False), [])
+        self.assertEqual(self.backend.search('specials', match_vendors=False), [self.vendor])
+
+    def test_invalid_vendors_are_not_suggested(self):
+        vendor = create_vendor(1, 'Pizza Hidden')
+        create_category(vendor, 'Pizzeria', slug='pizzeria-1')
+
+        self.assertEqual(self.backend.suggest('pizz'), ['Pizza Palace', 'Pizza'])
+
+    def test_suggestions_are_read_from_the_index(self):
+        self.backend.suggest('pi')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.suggest('pi'), ['Pizza Palace', 'Pizza'])
+
+    def test_dishes_are_displayed_from_the_index(self):
+        self.backend.search('pepp')
+        with self.assertNumQueries(1):
+            [vendor] = self.backend.search('pepp', match_vendors=False)
+        [dish] = vendor.matching_dishes
+        self.assertEqual((dish.pk, dish.food_title, str(dish.category)), (self.fooditem.pk, 'Pepperoni', 'Pizza'))
+
+    def test_deactivated_vendor_leaves_the_results(self):
+        self.backend.suggest('pi')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vendor.user.is_active = False
+            self.vendor.user.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.suggest('pi'), [])
+        self.assertEqual(self.backend.search('pizza'), [])
+
+    def test_suggest_endpoint(self):
+        response = self.client.get(reverse('search-suggest'), {'q': 'pepp'})
+        self.assertEqual(response.json(), {'suggestions': ['Pepperoni']})
+
+
+@override_settings(CART_STORAGE_BACKEND='marketplace.services.cart_storage_service.DatabaseCartStorage',
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CartTestCase(TestCase):
+    """Two vendors with one dish each, a customer and a 10% VAT"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendors = []
+        cls.fooditems = []
+        for i, price in enumerate(['5.00', '3.50']):
+            vendor = create_vendor(i, is_approved=True, is_listed=True)
+            category = create_category(vendor, slug=f'pizza-{i}')
+            cls.vendors.append(vendor)
+            cls.fooditems.append(create_fooditem(vendor, category, slug=f'margherita-{i}', price=price,
+                                                 is_available=True))
+        cls.customer = create_customer()
+        Tax.objects.create(tax_type='VAT', tax_percentage='10.00')
+
+    def setUp(self):
+        cache.clear()
+        _tax_rules_cache.reset()
+        self.addCleanup(_tax_rules_cache.reset)
+        get_cart_storage.cache_clear()
+        self.addCleanup(get_cart_storage.cache_clear)
+
+
+class CartSummaryTest(CartTestCase):
+
+    def _fill_cart(self):
+        Cart.objects.create(user=self.customer, fooditem=self.fooditems[0], quantity=2)
+        Cart.objects.create(user=self.customer, fooditem=self.fooditems[1], quantity=1)
+
+    def test_summary_is_computed_with_one_query(self):
+        self._fill_cart()
+        get_active_tax_rules()
+
+        with self.assertNumQueries(1):
+            summary = CartSummary.for_user(self.customer.pk)
+
+        self.assertEqual(summary.cart_count, 3)
+        self.assertEqual(summary.subtotal_by_vendor, {self.vendors[0].pk: Money(1000), self.vendors[1].pk: Money(350)})
+        self.assertEqual((summary.subtotal, summary.taxes, summary.grand_total), (Money(1350), Money(135), Money(1485)))
+        self.assertEqual(summary.tax_dict, {'VAT': {'10.00': Money(135)}})
+
+    def test_summary_is_computed_once_per_request(self):
+        self._fill_cart()
+        get_active_tax_rules()
+        request = RequestFactory().get('/')
+        request.user = self.customer
+
+        with self.assertNumQueries(1):
+            summary = get_cart_summary(request)
+            self.assertIs(get_cart_summary(request), summary)
+
+    def test_anonymous_user_has_an_empty_cart(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cart_summary(request), CartSummary())
+
+
+class CartUpsertTest(CartTestCase):
+
+    def test_quantities_are_upserted_with_one_query(self):
+        fooditem_id = self.fooditems[0].pk
+        with self.assertNumQueries(1):
+            self.assertEqual(Cart.objects.add_quantity(self.customer.pk, fooditem_id), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(Cart.objects.add_quantity(self.customer.pk, fooditem_id, quantity=2), 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(Cart.objects.set_quantity(self.customer.pk, fooditem_id, quantity=5), 5)
+        self.assertEqual(list(Cart.objects.values_list('fooditem', 'quantity')), [(fooditem_id, 5)])
+
+    def test_decrease_deletes_the_last_item(self):
+        fooditem_id = self.fooditems[0].pk
+        Cart.objects.set_quantity(self.customer.pk, fooditem_id, quantity=2)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(Cart.objects.decrease_quantity(self.customer.pk, fooditem_id), 1)
+        self.assertEqual(Cart.objects.decrease_quantity(self.customer.pk, fooditem_id), 0)
+        self.assertIsNone(Cart.objects.decrease_quantity(self.customer.pk, fooditem_id))
+        self.assertFalse(Cart.objects.exists())
+
+    def test_food_item_is_in_the_cart_once(self):
+        Cart.objects.create(user=self.customer, fooditem=self.fooditems[0], quantity=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Cart.objects.create(user=self.customer, fooditem=self.fooditems[0], quantity=1)
+
+
+@override_settings(CART_STORAGE_BACKEND='marketplace.services.cart_storage_service.LocMemCartStorage')
+class LocMemCartStorageTest(CartTestCase):
+
+    def test_changes_are_persisted_by_flush(self):
+        storage = get_cart_storage()
+        storage.add(self.customer.pk, self.fooditems[0].pk, quantity=2)
+        storage.add(self.customer.pk, self.fooditems[1].pk)
+        storage.decrease(self.customer.pk, self.fooditems[1].pk)
+
+        self.assertEqual(storage.get_items(self.customer.pk), {self.fooditems[0].pk: 2})
+        self.assertFalse(Cart.objects.exists())
+        flush_cart(self.customer.pk)
+        self.assertEqual(list(Cart.objects.values_list('fooditem', 'quantity')), [(self.fooditems[0].pk, 2)])
+
+    def test_cart_is_loaded_from_the_database(self):
+        Cart.objects.create(user=self.customer, fooditem=self.fooditems[0], quantity=3)
+        self.assertEqual(get_cart_storage().get_items(self.customer.pk), {self.fooditems[0].pk: 3})
+
+    def test_summary_prices_the_live_cart(self):
+        storage = get_cart_storage()
+        storage.set(self.customer.pk, self.fooditems[0].pk, quantity=2)
+        storage.set(self.customer.pk, self.fooditems[1].pk, quantity=1)
+
+        summary = CartSummary.for_user(self.customer.pk)
+        self.assertEqual((summary.cart_count, summary.subtotal, summary.grand_total), (3, Money(1350), Money(1485)))
+
+    def test_live_items_are_read_without_a_flush(self):
+        cart = Cart.objects.create(user=self.customer, fooditem=self.fooditems[0], quantity=1)
+        storage = get_cart_storage()
+        storage.set(self.customer.pk, self.fooditems[0].pk, quantity=2)
+        storage.set(self.customer.pk, self.fooditems[1].pk, quantity=1)
+
+        items = get_live_cart_items(self.customer.pk)
+        self.assertEqual([(item.pk, item.fooditem, item.quantity) for item in items],
+                         [(cart.pk, self.fooditems[0], 2), (None, self.fooditems[1], 1)])
+        self.assertEqual(list(Cart.objects.values_list('quantity', flat=True)), [1])
+
+    def test_setting_a_quantity_below_one_removes_the_item(self):
+        storage = get_cart_storage()
+        storage.set(self.customer.pk, self.fooditems[0].pk, quantity=2)
+        self.assertEqual(storage.set(self.customer.pk, self.fooditems[0].pk, quantity=0), 0)
+        self.assertEqual(storage.get_items(self.customer.pk), {})
+
+
+@override_settings(TAX_RULES_VERSION_CHECK_INTERVAL=0)
+class TaxRulesCacheTest(CartTestCase):
+
+    def test_rules_are_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(get_active_tax_rules(), (('VAT', '10.00', 1000), ))
+            get_tax_data_batch(subtotals=[Money(1000), Money(2000)])
+            get_active_tax_rules()
+
+    def test_rules_are_reloaded_once_the_change_is_committed(self):
+        get_active_tax_rules()
+        tax = Tax.objects.get(tax_type='VAT')
+        with self.captureOnCommitCallbacks() as callbacks:
+            tax.tax_percentage = '12.50'
+            tax.save()
+            self.assertEqual(get_active_tax_rules(), (('VAT', '10.00', 1000), ))
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(get_active_tax_rules(), (('VAT', '12.50', 1250), ))
+
+
+class MoneyTest(SimpleTestCase):
+
+    def test_amounts_are_rounded_half_up_to_cents(self):
+        self.assertEqual(Money.from_decimal('9.99'), 999)
+        self.assertEqual(Money.from_decimal(0.1 + 0.2), 30)
+        self.assertEqual(Money.from_decimal('0.125'), 13)
+        self.assertEqual(Money(1234).to_decimal(), Decimal('12.34'))
+
+    def test_arithmetic_keeps_the_type(self):
+        for amount in (Money(500) + 250, 250 + Money(500), Money(1000) - 250, 1000 - Money(250), Money(250) * 3):
+            self.assertIsInstance(amount, Money)
+            self.assertEqual(amount, 750)
+        self.assertIsInstance(sum([Money(1), Money(2)], Money(0)), Money)
+
+    def test_rate_is_rounded_half_up(self):
+        self.assertEqual(Money(1350).apply_rate(to_basis_points('10.00')), 135)
+        self.assertEqual(Money(999).apply_rate(to_basis_points('12.50')), 125)
+        self.assertEqual(Money(-999).apply_rate(1250), -125)
+
+    def test_amounts_are_rendered_in_major_units(self):
+        self.assertEqual([str(Money(1234)), str(Money(5)), str(Money(-5))], ['12.34', '0.05', '-0.05'])
+        self.assertEqual(format_amounts({'total': Money(1100), 'tax_dict': {'VAT': {'10.00': Money(100)}}, 'count': 2}),
+                         {'total': '11.00', 'tax_dict': {'VAT': {'10.00': '1.00'}}, 'count': 2})
+
+
+class CartContextProcessorsTest(CartTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cart_context_evaluations.reset()
+        self.addCleanup(cart_context_evaluations.reset)
+        Cart.objects.create(user=self.customer, fooditem=self.fooditems[0], quantity=2)
+        self.request = RequestFactory().get('/')
+        self.request.user = self.customer
+
+    def test_unread_values_run_no_queries(self):
+        with self.assertNumQueries(0):
+            get_cart_counter(self.request)
+            get_cart_amounts(self.request)
+        self.assertEqual(cart_context_evaluations.snapshot(), {})
+
+    def test_read_values_share_one_summary(self):
+        get_active_tax_rules()
+        context = {**get_cart_counter(self.request), **get_cart_amounts(self.request)}
+
+        with self.assertNumQueries(1):
+            self.assertEqual(context['cart_count'], 2)
+            self.assertEqual(str(context['subtotal']), '10.00')
+            self.assertEqual(str(context['grand_total']), '11.00')
+        self.assertEqual(cart_context_evaluations.snapshot(), {'cart_count': 1, 'subtotal': 1, 'grand_total': 1})
+
+    def test_anonymous_user_has_no_amounts(self):
+        self.request.user = AnonymousUser()
+        self.assertEqual(get_cart_amounts(self.request), {})
+        self.assertEqual(get_cart_counter(self.request)['cart_count'], 0)
@@ -1,12 +1,14 @@
+import uuid
+
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.shortcuts import render, redirect
 
 from accounts.services.services import get_user_profile_data
 from marketplace.services.cart_manipulation_services import check_does_fooditem_exist, add_item_to_cart, \
-    decrease_cart_item_quantity, check_does_cart_item_exist, delete_cart_item, get_ordered_cart_items_by_user
+    decrease_cart_item_quantity, delete_cart_item, get_ordered_cart_items_by_user
 from marketplace.services.search_filtering_service import search_vendors_by_keyword, get_all_valid_vendors, \
-    filter_vendors_by_geo_position
+    filter_vendors_by_geo_position, suggest_search_terms
 from marketplace.services.vendor_detail_service import get_vendor_detail
 from orders.forms import OrderForm
 
@@ -45,17 +47,8 @@ def decrease_cart(request, food_id):
 
     # check is it ajax request
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        is_food_existed = check_does_fooditem_exist(food_id=food_id)
-        # check if the food item exists
-        if is_food_existed:
-            is_cart_existed = check_does_cart_item_exist(food_id=food_id, user_id=request.user.pk)
-            # check if the cart item exists
-            if is_cart_existed:
-                response = decrease_cart_item_quantity(food_id=food_id, user_id=request.user.pk, qty=is_cart_existed['item_qty'])
-            else:
-                response = {'status': 'Failed', 'message': 'You do not have this item in your cart'}
-        else:
-            response = {'status': 'Failed', 'message': 'add_item_to_cart: This food does not exist'}
+        # fails if the user has no such cart item
+        response = decrease_cart_item_quantity(food_id=food_id, user_id=request.user.pk)
     else:
         response = {'status': 'Failed', 'message': 'Invalid request'}
     return JsonResponse(response)
@@ -85,11 +78,12 @@ def search(request):
     radius = request.GET['radius']
     keyword = request.GET['keyword']
     options = request.GET['options']
+    open_now = request.GET.get('open_now') in ('true', '1')
 
     if not keyword:
-        context = get_all_valid_vendors()
+        context = get_all_valid_vendors(open_now=open_now)
     else:
-        context = search_vendors_by_keyword(keyword=keyword, options=options)
+        context = search_vendors_by_keyword(keyword=keyword, options=options, open_now=open_now)
 
     if latitude and longitude and radius and address:
         context = filter_vendors_by_geo_position(latitude=latitude, longitude=longitude,
@@ -98,6 +92,12 @@ def search(request):
     return render(request, 'marketplace/listings.html', context=context)
 
 
+def search_suggest(request):
+
+    response = suggest_search_terms(prefix=request.GET.get('q', '')[:100])
+    return JsonResponse(response)
+
+
 @login_required()
 def checkout(request):
 
@@ -106,7 +106,7 @@ def checkout(request):
         return redirect('marketplace')
 
     initial_values = get_user_profile_data(request.user.pk)
-    form = OrderForm(initial=initial_values)
+    form = OrderForm(initial=dict(initial_values, checkout_token=uuid.uuid4()))
     context = {
         'form': form,
         'cart_items': cart_items['cart_items'],
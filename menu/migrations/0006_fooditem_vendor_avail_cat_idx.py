@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('menu', '0005_alter_fooditem_food_title'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='fooditem',
+            index=models.Index(fields=['vendor', 'is_available', 'category'], name='fooditem_vendor_avail_cat_idx'),
+        ),
+    ]
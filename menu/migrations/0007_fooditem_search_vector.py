@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_search_vector(apps, schema_editor):
+    Category = apps.get_model('menu', 'Category')
+    FoodItem = apps.get_model('menu', 'FoodItem')
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('category_name'))
+    FoodItem.objects.update(search_vector=SearchVector('food_title', weight='A', config='english')
+                            + SearchVector(category_name, weight='B', config='english')
+                            + SearchVector('description', weight='C', config='english'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        # pg_trgm is installed there
+        ('vendors', '0012_vendor_search_vector'),
+        ('menu', '0006_fooditem_vendor_avail_cat_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fooditem',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
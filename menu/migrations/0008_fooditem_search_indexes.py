@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('menu', '0007_fooditem_search_vector'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='fooditem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='fooditem_search_vector_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='fooditem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['food_title'], name='fooditem_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
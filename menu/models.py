@@ -1,3 +1,5 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.db.models import Q
 
@@ -45,6 +47,15 @@ class FoodItem(models.Model):
     is_available = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # title, category name and description, kept up to date by marketplace.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', 'is_available', 'category'], name='fooditem_vendor_avail_cat_idx'),
+            GinIndex(fields=['search_vector'], name='fooditem_search_vector_idx'),
+            GinIndex(fields=['food_title'], name='fooditem_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.food_title
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from orders.models import Order, OrderedFood, Payment
+from orders.models import Order, OrderedFood, Payment, VendorOrder, ArchivedOrder, ArchivedVendorOrder
 
 
 class OrderedFoodInline(admin.TabularInline):
@@ -9,12 +9,39 @@ class OrderedFoodInline(admin.TabularInline):
     extra = 0
 
 
+class VendorOrderInline(admin.TabularInline):
+    model = VendorOrder
+    readonly_fields = ('vendor', 'subtotal', 'tax_data', 'total_tax', 'total', 'created_at')
+    extra = 0
+
+
 class OrderAdmin(admin.ModelAdmin):
     list_display = ['order_number', 'name', 'phone', 'total', 'payment_method', 'status', 'order_placed_to',
                     'is_ordered', 'created_at']
-    inlines = [OrderedFoodInline]
+    inlines = [VendorOrderInline, OrderedFoodInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('vendor_orders__vendor')
+
+
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ['transaction_id', 'user', 'payment_method', 'amount', 'status', 'order_missing', 'created_at']
+    list_filter = ['order_missing']
+
+
+class ArchivedVendorOrderInline(admin.TabularInline):
+    model = ArchivedVendorOrder
+    readonly_fields = ('vendor', 'total_tax', 'total', 'items_count', 'created_at')
+    extra = 0
+
+
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ['order_number', 'user', 'total', 'created_at', 'file_name', 'archived_at']
+    readonly_fields = ('order_number', 'user', 'total', 'created_at', 'file_name', 'line')
+    inlines = [ArchivedVendorOrderInline]
 
 
 admin.site.register(Order, OrderAdmin)
-admin.site.register(Payment)
+admin.site.register(ArchivedOrder, ArchivedOrderAdmin)
+admin.site.register(Payment, PaymentAdmin)
 admin.site.register(OrderedFood)
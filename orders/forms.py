@@ -5,6 +5,9 @@ from orders.models import Order
 
 class OrderForm(forms.ModelForm):
 
+    # issued once per checkout page, repeated submissions of the page reuse its pending order
+    checkout_token = forms.UUIDField(widget=forms.HiddenInput)
+
     class Meta:
         model = Order
         fields = ['first_name', 'last_name', 'phone', 'email', 'address', 'country', 'state', 'city', 'pin_code']
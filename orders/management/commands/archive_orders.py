@@ -0,0 +1,22 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.services.order_archive_service import archive_orders, ORDER_ARCHIVE_BATCH_SIZE, get_archive_dir
+
+
+class Command(BaseCommand):
+    help = 'Move completed orders older than the given age from the orders tables into gzipped JSONL archive files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365))
+        parser.add_argument('--batch-size', type=int, default=ORDER_ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+
+        older_than = timezone.now() - datetime.timedelta(days=options['days'])
+        archived = archive_orders(older_than, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} orders created before {older_than:%Y-%m-%d} '
+                                             f'to {get_archive_dir()}'))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from orders.models import Order, VendorOrder
+
+
+class Command(BaseCommand):
+    help = 'Create VendorOrder rows from the legacy Order.total_data of orders placed before VendorOrder existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+
+        batch_size = options['batch_size']
+        last_pk = 0
+        created = skipped = 0
+        while True:
+            orders = list(
+                Order.objects.filter(pk__gt=last_pk, vendor_orders__isnull=True)
+                .only('pk', 'total_data', 'status', 'created_at').order_by('pk')[:batch_size]
+            )
+            if not orders:
+                break
+            last_pk = orders[-1].pk
+
+            vendor_orders = []
+            for order in orders:
+                if not order.total_data:
+                    skipped += 1
+                    continue
+                for vendor_id, data in order.total_data.items():
+                    vendor_orders.append(VendorOrder(
+                        order_id=order.pk,
+                        vendor_id=int(vendor_id),
+                        subtotal=data['subtotal'],
+                        tax_data=data['tax_dict'],
+                        total_tax=data['total'] - data['subtotal'],
+                        total=data['total'],
+                        status=order.status,
+                        created_at=order.created_at,
+                    ))
+
+            with transaction.atomic():
+                VendorOrder.objects.bulk_create(vendor_orders, ignore_conflicts=True)
+            created += len(vendor_orders)
+            self.stdout.write(f'Processed orders up to pk {last_pk}')
+
+        self.stdout.write(self.style.SUCCESS(f'Created {created} vendor orders, skipped {skipped} orders '
+                                             f'without total_data'))
@@ -0,0 +1,21 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.services.order_cleanup_service import purge_unpaid_orders, UNPAID_ORDERS_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Delete orders that were placed but never paid'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=getattr(settings, 'UNPAID_ORDER_TTL_HOURS', 24))
+        parser.add_argument('--batch-size', type=int, default=UNPAID_ORDERS_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+
+        older_than = timezone.now() - datetime.timedelta(hours=options['hours'])
+        purged = purge_unpaid_orders(older_than, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {purged} unpaid orders placed before {older_than:%Y-%m-%d %H:%M}'))
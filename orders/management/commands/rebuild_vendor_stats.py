@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from orders.services.vendor_stats_service import rebuild_vendor_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute VendorDailyStats and VendorLifetimeStats from the finalized and archived orders'
+
+    def handle(self, *args, **options):
+
+        rows = rebuild_vendor_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} daily vendor stats rows'))
@@ -0,0 +1,110 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+import json
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+import food_marketplace.money
+
+
+def _to_cents(amount) -> int:
+    return int((Decimal(str(amount)) * 100).to_integral_value(rounding='ROUND_HALF_UP'))
+
+
+def _to_units(cents) -> str:
+    return str(Decimal(int(cents)).scaleb(-2))
+
+
+def _load_tax_data(tax_data) -> dict:
+    # tax data used to be saved as a json.dumps() string
+    if isinstance(tax_data, str):
+        tax_data = json.loads(tax_data)
+    return tax_data or {}
+
+
+def convert_amounts_to_cents(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderedFood = apps.get_model('orders', 'OrderedFood')
+
+    Order.objects.update(total=Round(F('total') * 100), total_tax=Round(F('total_tax') * 100))
+    OrderedFood.objects.update(price=Round(F('price') * 100), amount=Round(F('amount') * 100))
+
+    # {"vendor_id": {"subtotal": {"tax_type": {"tax_percentage": "tax_amount"}}}} ->
+    # {"vendor_id": {"subtotal": cents, "tax_dict": {"tax_type": {"tax_percentage": cents}}, "total": cents}}
+    for order in Order.objects.only('id', 'tax_data', 'total_data').iterator(chunk_size=500):
+        tax_data = {tax_type: {percentage: _to_cents(amount) for percentage, amount in data.items()}
+                    for tax_type, data in _load_tax_data(order.tax_data).items()}
+        total_data = {}
+        for vendor_id, data in (order.total_data or {}).items():
+            subtotal = 0
+            tax_dict = {}
+            for subtotal_, vendor_tax_data in data.items():
+                subtotal += _to_cents(subtotal_)
+                for tax_type, tax in vendor_tax_data.items():
+                    tax_dict[tax_type] = {percentage: _to_cents(amount) for percentage, amount in tax.items()}
+            taxes = sum(amount for tax in tax_dict.values() for amount in tax.values())
+            total_data[vendor_id] = {'subtotal': subtotal, 'tax_dict': tax_dict, 'total': subtotal + taxes}
+        Order.objects.filter(pk=order.pk).update(tax_data=tax_data, total_data=total_data)
+
+
+def convert_amounts_from_cents(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderedFood = apps.get_model('orders', 'OrderedFood')
+
+    Order.objects.update(total=F('total') / 100, total_tax=F('total_tax') / 100)
+    OrderedFood.objects.update(price=F('price') / 100, amount=F('amount') / 100)
+
+    for order in Order.objects.only('id', 'tax_data', 'total_data').iterator(chunk_size=500):
+        tax_data = {tax_type: {percentage: _to_units(amount) for percentage, amount in data.items()}
+                    for tax_type, data in (order.tax_data or {}).items()}
+        total_data = {}
+        for vendor_id, data in (order.total_data or {}).items():
+            tax_dict = {tax_type: {percentage: _to_units(amount) for percentage, amount in tax.items()}
+                        for tax_type, tax in data['tax_dict'].items()}
+            total_data[vendor_id] = {_to_units(data['subtotal']): tax_dict}
+        Order.objects.filter(pk=order.pk).update(tax_data=json.dumps(tax_data), total_data=total_data)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_alter_order_pin_code'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_amounts_to_cents, convert_amounts_from_cents),
+        migrations.AlterField(
+            model_name='order',
+            name='total',
+            field=food_marketplace.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='total_tax',
+            field=food_marketplace.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='tax_data',
+            field=models.JSONField(blank=True, help_text="Data format: {'tax_type': {'tax_percentage': cents}}"),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='total_data',
+            field=models.JSONField(blank=True, help_text="Data format: {'vendor_id': {'subtotal': cents, "
+                                                         "'tax_dict': {...}, 'total': cents}}", null=True),
+        ),
+        migrations.AlterField(
+            model_name='orderedfood',
+            name='price',
+            field=food_marketplace.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='orderedfood',
+            name='amount',
+            field=food_marketplace.money.MoneyField(),
+        ),
+    ]
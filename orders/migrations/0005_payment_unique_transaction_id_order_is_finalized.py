@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_payments(apps, schema_editor):
+    Payment = apps.get_model('orders', 'Payment')
+    Order = apps.get_model('orders', 'Order')
+    OrderedFood = apps.get_model('orders', 'OrderedFood')
+
+    duplicates = (Payment.objects.values('transaction_id')
+                  .annotate(payments=Count('id'), first_id=Min('id'))
+                  .filter(payments__gt=1))
+    for duplicate in duplicates:
+        payments = Payment.objects.filter(transaction_id=duplicate['transaction_id']).exclude(pk=duplicate['first_id'])
+        Order.objects.filter(payment__in=payments).update(payment=duplicate['first_id'])
+        OrderedFood.objects.filter(payment__in=payments).update(payment=duplicate['first_id'])
+        payments.delete()
+
+        # every repeated payment call copied the cart into ordered food again, keep the first copy of each item
+        ordered_food = OrderedFood.objects.filter(payment=duplicate['first_id'])
+        first_ids = ordered_food.values('order', 'fooditem').annotate(first_id=Min('id')).values('first_id')
+        ordered_food.exclude(pk__in=first_ids).delete()
+
+
+def mark_paid_orders_finalized(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.filter(is_ordered=True).update(is_finalized=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_money_in_cents'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_payments, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='payment',
+            name='transaction_id',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='is_finalized',
+            field=models.BooleanField(default=False, help_text='Ordered food, notifications and cart cleanup are done'),
+        ),
+        migrations.RunPython(mark_paid_orders_finalized, migrations.RunPython.noop),
+    ]
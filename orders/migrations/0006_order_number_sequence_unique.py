@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def make_order_numbers_unique(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+
+    # numbers used to be built from the current second and the user pk, so they could repeat
+    duplicates = (Order.objects.values('order_number')
+                  .annotate(orders=Count('id'), first_id=Min('id'))
+                  .filter(orders__gt=1))
+    for duplicate in duplicates:
+        orders = Order.objects.filter(order_number=duplicate['order_number']).exclude(pk=duplicate['first_id'])
+        for order in orders.only('id', 'order_number'):
+            Order.objects.filter(pk=order.pk).update(order_number=f'{order.order_number}-{order.pk}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_payment_unique_transaction_id_order_is_finalized'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE SEQUENCE orders_order_number_seq START WITH 1 INCREMENT BY 100',
+            'DROP SEQUENCE orders_order_number_seq',
+        ),
+        migrations.RunPython(make_order_numbers_unique, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='order_number',
+            field=models.CharField(max_length=28, unique=True),
+        ),
+    ]
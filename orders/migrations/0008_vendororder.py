@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import food_marketplace.money
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0011_vendor_approved_listed_idx'),
+        ('orders', '0007_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subtotal', food_marketplace.money.MoneyField()),
+                ('tax_data', models.JSONField(default=dict, help_text="Data format: {'tax_type': {'tax_percentage': cents}}")),
+                ('total_tax', food_marketplace.money.MoneyField()),
+                ('total', food_marketplace.money.MoneyField()),
+                ('created_at', models.DateTimeField(help_text='Copy of order.created_at')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_orders', to='orders.order')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_orders', to='vendors.vendor')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vendororder',
+            constraint=models.UniqueConstraint(fields=('order', 'vendor'), name='unique_vendor_order'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import food_marketplace.money
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0011_vendor_approved_listed_idx'),
+        ('orders', '0008_vendororder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders_count', models.PositiveIntegerField(default=0)),
+                ('gross', food_marketplace.money.MoneyField(default=0, help_text='Vendor totals including taxes')),
+                ('tax', food_marketplace.money.MoneyField(default=0)),
+                ('items_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='vendors.vendor')),
+            ],
+            options={
+                'verbose_name_plural': 'vendor daily stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='VendorLifetimeStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders_count', models.PositiveIntegerField(default=0)),
+                ('gross', food_marketplace.money.MoneyField(default=0, help_text='Vendor totals including taxes')),
+                ('tax', food_marketplace.money.MoneyField(default=0)),
+                ('items_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lifetime_stats', to='vendors.vendor')),
+            ],
+            options={
+                'verbose_name_plural': 'vendor lifetime stats',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vendordailystats',
+            constraint=models.UniqueConstraint(fields=('vendor', 'day'), name='unique_vendor_daily_stats'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_order_status(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    VendorOrder = apps.get_model('orders', 'VendorOrder')
+
+    VendorOrder.objects.update(status=Subquery(Order.objects.filter(pk=OuterRef('order_id')).values('status')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_vendor_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendororder',
+            name='status',
+            field=models.CharField(choices=[('New', 'New'), ('Accepted', 'Accepted'), ('Completed', 'Completed')], default='New'),
+        ),
+        migrations.RunPython(copy_order_status, migrations.RunPython.noop),
+    ]
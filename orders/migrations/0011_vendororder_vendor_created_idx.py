@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('orders', '0010_vendororder_status'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='vendororder',
+            index=models.Index(fields=['vendor', '-created_at', '-id'], name='vendororder_vendor_created_idx'),
+        ),
+    ]
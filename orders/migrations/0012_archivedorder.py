@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import food_marketplace.money
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('vendors', '0011_vendor_approved_listed_idx'),
+        ('orders', '0011_vendororder_vendor_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_number', models.CharField(max_length=28, unique=True)),
+                ('total', food_marketplace.money.MoneyField()),
+                ('created_at', models.DateTimeField()),
+                ('file_name', models.CharField(max_length=255)),
+                ('line', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedVendorOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_tax', food_marketplace.money.MoneyField()),
+                ('total', food_marketplace.money.MoneyField()),
+                ('items_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_orders', to='orders.archivedorder')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_vendor_orders', to='vendors.vendor')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='archivedvendororder',
+            constraint=models.UniqueConstraint(fields=('archived_order', 'vendor'), name='unique_archived_vendor_order'),
+        ),
+    ]
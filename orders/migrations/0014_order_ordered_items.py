@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_order_checkout_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='ordered_items',
+            field=models.JSONField(blank=True, default=list, help_text="Cart snapshot the order was priced from, ordered food is created from it. Data format: [{'fooditem_id': id, 'quantity': qty, 'price': cents}]"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0014_order_ordered_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='order_missing',
+            field=models.BooleanField(default=False, help_text='Captured after its unpaid order had been purged, to be refunded'),
+        ),
+    ]
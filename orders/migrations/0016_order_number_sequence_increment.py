@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0015_payment_order_missing'),
+    ]
+
+    operations = [
+        # workers used to reserve blocks of 100 counters, skip past the last block that may have been handed out
+        migrations.RunSQL(
+            "ALTER SEQUENCE orders_order_number_seq INCREMENT BY 1; "
+            "SELECT setval('orders_order_number_seq', last_value + 99) FROM orders_order_number_seq",
+            'ALTER SEQUENCE orders_order_number_seq INCREMENT BY 100',
+        ),
+    ]
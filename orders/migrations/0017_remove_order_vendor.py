@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.db import migrations
+
+
+def backfill_vendor_orders(apps, schema_editor):
+    """Same as the backfill_vendor_orders command, for the databases it has not been run on yet"""
+
+    Order = apps.get_model('orders', 'Order')
+    VendorOrder = apps.get_model('orders', 'VendorOrder')
+
+    last_pk = 0
+    while True:
+        orders = list(
+            Order.objects.filter(pk__gt=last_pk, vendor_orders__isnull=True)
+            .only('pk', 'total_data', 'status', 'created_at').order_by('pk')[:500]
+        )
+        if not orders:
+            break
+        last_pk = orders[-1].pk
+        VendorOrder.objects.bulk_create([
+            VendorOrder(order_id=order.pk, vendor_id=int(vendor_id), subtotal=data['subtotal'],
+                        tax_data=data['tax_dict'], total_tax=data['total'] - data['subtotal'], total=data['total'],
+                        status=order.status, created_at=order.created_at)
+            for order in orders for vendor_id, data in (order.total_data or {}).items()
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0016_order_number_sequence_increment'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_vendor_orders, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='order',
+            name='vendor',
+        ),
+    ]
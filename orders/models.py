@@ -1,9 +1,9 @@
-import datetime
-
-from django.db import models
-from django.db.models import QuerySet
+from django.db import models, connections
+from django.db.models import Sum
+from django.utils import timezone
 
 from accounts.models import User
+from food_marketplace.money import Money, MoneyField, load_tax_dict
 from menu.models import FoodItem
 from vendors.models import Vendor
 
@@ -16,10 +16,12 @@ class Payment(models.Model):
         # ('Cash', 'Cash'),
     )
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    transaction_id = models.CharField(max_length=100)
+    transaction_id = models.CharField(max_length=100, unique=True)
     payment_method = models.CharField(choices=PAYMENT_METHOD, max_length=100)
     amount = models.CharField(max_length=10)
     status = models.CharField(max_length=100)
+    order_missing = models.BooleanField(default=False,
+                                        help_text='Captured after its unpaid order had been purged, to be refunded')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -30,39 +32,14 @@ class OrderQuerySet(models.QuerySet):
     def paid_orders_by_user(self, user):
         return self.filter(user=user, is_ordered=True)
 
-    def current_month_orders_by_vendor(self, vendor_pk, today):
-        return Order.objects.filter(vendor__in=[vendor_pk],
-                                    created_at__month=today.month,
-                                    created_at__year=today.year,
-                                    is_ordered=True)
-
-    def current_day_orders_by_vendor(self, vendor_pk, today):
-        return Order.objects.filter(vendor__in=[vendor_pk],
-                                    created_at__day=today.day,
-                                    created_at__month=today.month,
-                                    created_at__year=today.year,
-                                    is_ordered=True)
-
 
 class OrderManager(models.Manager):
     def get_queryset(self):
         return OrderQuerySet(self.model, using=self._db)
 
-    def get_total_revenue(self, orders: QuerySet, vendor_id: int) -> float:
-        revenue = 0
-        for order in orders:
-            revenue += order.get_total_by_vendor(vendor_id=vendor_id)
-        return round(revenue, 2)
-
     def paid_orders_by_user(self, user):
         return self.get_queryset().paid_orders_by_user(user)
 
-    def current_month_orders_by_vendor(self, vendor_pk: int, today: datetime.datetime):
-        return self.get_queryset().current_month_orders_by_vendor(vendor_pk, today)
-
-    def current_day_orders_by_vendor(self, vendor_pk: int, today: datetime.datetime):
-        return self.get_queryset().current_day_orders_by_vendor(vendor_pk, today)
-
 
 class Order(models.Model):
     STATUS = (
@@ -72,8 +49,9 @@ class Order(models.Model):
     )
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True)
-    vendor = models.ManyToManyField(Vendor, blank=True)
-    order_number = models.CharField(max_length=28)
+    order_number = models.CharField(max_length=28, unique=True)
+    checkout_token = models.UUIDField(unique=True, null=True, blank=True, editable=False,
+                                      help_text='Issued by the checkout page, dedupes repeated submissions')
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
     phone = models.CharField(max_length=15)
@@ -83,48 +61,217 @@ class Order(models.Model):
     state = models.CharField(max_length=15, blank=True)
     city = models.CharField(max_length=50)
     pin_code = models.CharField(max_length=10, blank=True, null=True)
-    total = models.FloatField(max_length=10)
-    total_data = models.JSONField(blank=True, null=True)
-    tax_data = models.JSONField(blank=True, help_text="Data format: {'tax_ty}")
-    total_tax = models.FloatField()
+    total = MoneyField()
+    # legacy, replaced by VendorOrder; dropped once backfill_vendor_orders has run everywhere
+    total_data = models.JSONField(blank=True, null=True,
+                                  help_text="Data format: {'vendor_id': {'subtotal': cents, 'tax_dict': {...}, "
+                                            "'total': cents}}")
+    tax_data = models.JSONField(blank=True, help_text="Data format: {'tax_type': {'tax_percentage': cents}}")
+    ordered_items = models.JSONField(default=list, blank=True,
+                                     help_text="Cart snapshot the order was priced from, ordered food is created "
+                                               "from it. Data format: [{'fooditem_id': id, 'quantity': qty, "
+                                               "'price': cents}]")
+    total_tax = MoneyField()
     payment_method = models.CharField(max_length=25)
     status = models.CharField(choices=STATUS, default='New')
     is_ordered = models.BooleanField(default=False)
+    is_finalized = models.BooleanField(default=False, help_text='Ordered food, notifications and cart cleanup are done')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     objects = OrderManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_ordered', 'created_at'], name='order_user_ordered_created_idx'),
+            models.Index(fields=['created_at'], name='order_created_at_idx'),
+        ]
+
     @property
     def name(self):
         return f'{self.first_name} {self.last_name}'
 
     def order_placed_to(self):
-        return ', '.join([str(i) for i in self.vendor.all()])
+        # reads prefetched vendor_orders__vendor when present
+        return ', '.join(vendor_order.vendor.vendor_name for vendor_order in self.vendor_orders.all())
 
-    def get_total_by_vendor(self, vendor_id: int) -> float:
+    @property
+    def subtotal(self) -> Money:
+        return self.total - self.total_tax
 
-        total_data = self.total_data
-        data = total_data.get(str(vendor_id))
-        subtotal = 0.00
-        for subtotal_, tax_data in data.items():
-            subtotal += float(subtotal_)
-        return round(subtotal, 2)
+    def get_tax_dict(self) -> dict:
+        return load_tax_dict(self.tax_data)
 
     def __str__(self):
         return self.order_number
 
 
+class VendorOrderQuerySet(models.QuerySet):
+
+    def paid_orders_by_vendor(self, vendor_pk):
+        return self.filter(vendor=vendor_pk, order__is_ordered=True)
+
+    def get_revenue(self) -> Money:
+        return Money(self.aggregate(revenue=Sum('subtotal'))['revenue'] or 0)
+
+
+class VendorOrder(models.Model):
+    """Part of the order placed to one vendor"""
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='vendor_orders')
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='vendor_orders')
+    subtotal = MoneyField()
+    tax_data = models.JSONField(default=dict, help_text="Data format: {'tax_type': {'tax_percentage': cents}}")
+    total_tax = MoneyField()
+    total = MoneyField()
+    status = models.CharField(choices=Order.STATUS, default='New')
+    created_at = models.DateTimeField(help_text='Copy of order.created_at')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = VendorOrderQuerySet().as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'vendor'], name='unique_vendor_order'),
+        ]
+        indexes = [
+            models.Index(fields=['vendor', '-created_at', '-id'], name='vendororder_vendor_created_idx'),
+        ]
+
+    def get_tax_dict(self) -> dict:
+        return load_tax_dict(self.tax_data)
+
+    def __str__(self):
+        return f'{self.order_id}, {self.vendor_id}'
+
+
 class OrderedFood(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='ordered_food')
     payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, blank=True, null=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='customer_ordered_food')
     fooditem = models.ForeignKey(FoodItem, on_delete=models.CASCADE)
     quantity = models.IntegerField()
-    price = models.FloatField()
-    amount = models.FloatField()
+    price = MoneyField()
+    amount = MoneyField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.fooditem.food_title
+
+
+class ArchivedOrder(models.Model):
+    """Index row of an order moved out of the orders tables into a gzipped JSONL archive file.
+    The full order is line `line` (counted from 0) of `file_name` under ORDER_ARCHIVE_DIR"""
+
+    order_number = models.CharField(max_length=28, unique=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='archived_orders')
+    total = MoneyField()
+    created_at = models.DateTimeField()
+    file_name = models.CharField(max_length=255)
+    line = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.order_number
+
+
+class ArchivedVendorOrder(models.Model):
+    """Vendor's part of an archived order, kept in the database for lookups and vendor stats rebuilds"""
+
+    archived_order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='vendor_orders')
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='archived_vendor_orders')
+    total_tax = MoneyField()
+    total = MoneyField()
+    items_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['archived_order', 'vendor'], name='unique_archived_vendor_order'),
+        ]
+
+    def __str__(self):
+        return f'{self.archived_order_id}, {self.vendor_id}'
+
+
+STATS_COUNTERS = ('orders_count', 'gross', 'tax', 'items_count')
+
+
+class VendorStatsManager(models.Manager):
+
+    def increment(self, rows: list) -> None:
+        """Add the counters of each row to the stats row with the same key fields, inserting missing ones,
+        in one INSERT ... ON CONFLICT statement"""
+
+        if not rows:
+            return
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        key_fields = self.model.KEY_FIELDS
+        columns = key_fields + STATS_COUNTERS + ('updated_at', )
+        values = ', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * len(rows))
+        updates = ', '.join(f'{counter} = {table}.{counter} + EXCLUDED.{counter}' for counter in STATS_COUNTERS)
+        sql = f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES {values}
+            ON CONFLICT ({', '.join(key_fields)})
+            DO UPDATE SET {updates}, updated_at = EXCLUDED.updated_at
+        """
+        now = timezone.now()
+        params = []
+        # the same key order in every transaction keeps concurrent upserts from deadlocking
+        for row in sorted(rows, key=lambda row_: [row_[field] for field in key_fields]):
+            params.extend(row[field] for field in key_fields + STATS_COUNTERS)
+            params.append(now)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+class VendorStats(models.Model):
+    orders_count = models.PositiveIntegerField(default=0)
+    gross = MoneyField(default=0, help_text='Vendor totals including taxes')
+    tax = MoneyField(default=0)
+    items_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = VendorStatsManager()
+
+    class Meta:
+        abstract = True
+
+    @property
+    def revenue(self) -> Money:
+        return Money(self.gross - self.tax)
+
+
+class VendorDailyStats(VendorStats):
+    """Rollup of the vendor's finalized orders per day, maintained by finalize_order"""
+
+    KEY_FIELDS = ('vendor_id', 'day')
+
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+
+    class Meta:
+        verbose_name_plural = 'vendor daily stats'
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'day'], name='unique_vendor_daily_stats'),
+        ]
+
+    def __str__(self):
+        return f'{self.vendor_id}, {self.day}'
+
+
+class VendorLifetimeStats(VendorStats):
+    """Rollup of all finalized orders of the vendor, maintained by finalize_order"""
+
+    KEY_FIELDS = ('vendor_id', )
+
+    vendor = models.OneToOneField(Vendor, on_delete=models.CASCADE, related_name='lifetime_stats')
+
+    class Meta:
+        verbose_name_plural = 'vendor lifetime stats'
+
+    def __str__(self):
+        return str(self.vendor_id)
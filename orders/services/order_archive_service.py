@@ -0,0 +1,211 @@
+import datetime
+import gzip
+import json
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from menu.models import FoodItem
+from orders.models import Order, OrderedFood, Payment, VendorOrder, ArchivedOrder, ArchivedVendorOrder
+from vendors.models import Vendor
+
+logger = logging.getLogger(__name__)
+
+ORDER_ARCHIVE_BATCH_SIZE = 500
+
+# only what the order detail pages show, food items and vendors may change or go away after archiving
+ARCHIVED_FOODITEM_FIELDS = ('id', 'vendor_id', 'food_title', 'slug', 'image', 'price')
+ARCHIVED_VENDOR_FIELDS = ('id', 'vendor_name', 'vendor_slug')
+
+
+@dataclass
+class ArchivedOrderDetail:
+    """Unsaved model instances rebuilt from an archive record, enough to render the order detail pages"""
+
+    order: Order
+    ordered_food: list = field(default_factory=list)
+    vendor_orders: list = field(default_factory=list)
+
+    def get_ordered_food_by_vendor(self, vendor_id: int) -> list:
+        return [item for item in self.ordered_food if item.fooditem.vendor_id == vendor_id]
+
+    def get_vendor_order(self, vendor_id: int) -> Optional[VendorOrder]:
+        return next((vendor_order for vendor_order in self.vendor_orders if vendor_order.vendor_id == vendor_id), None)
+
+
+def get_archive_dir() -> Path:
+    return Path(getattr(settings, 'ORDER_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'orders'))
+
+
+def archive_old_orders() -> int:
+    """Archive the completed orders older than ORDER_ARCHIVE_AFTER_DAYS"""
+
+    days = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 365)
+    return archive_orders(timezone.now() - datetime.timedelta(days=days))
+
+
+def archive_orders(older_than: datetime.datetime, batch_size: int = ORDER_ARCHIVE_BATCH_SIZE) -> int:
+    """Move completed orders created before older_than out of the orders tables, one archive file per batch.
+    Return the number of archived orders"""
+
+    archived = 0
+    while True:
+        batch = _archive_batch(older_than, batch_size)
+        archived += batch
+        if batch < batch_size:
+            return archived
+
+
+def _archive_batch(older_than: datetime.datetime, batch_size: int) -> int:
+
+    with transaction.atomic():
+        # orders locked by a status change or another archiving run are left for the next run
+        order_ids = list(
+            Order.objects.filter(created_at__lt=older_than, is_finalized=True, status='Completed')
+            .select_for_update(skip_locked=True).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return 0
+
+        orders = list(
+            Order.objects.filter(pk__in=order_ids).select_related('payment').prefetch_related(
+                'vendor_orders',
+                Prefetch('ordered_food', queryset=OrderedFood.objects.select_related('fooditem__vendor')),
+            ).order_by('pk')
+        )
+        file_name = f'{timezone.now():%Y%m%d%H%M%S}-{order_ids[0]}.jsonl.gz'
+        path = get_archive_dir() / file_name
+        _write_archive(path, [_order_record(order) for order in orders])
+
+        try:
+            archived_orders = ArchivedOrder.objects.bulk_create([
+                ArchivedOrder(order_number=order.order_number, user_id=order.user_id, total=order.total,
+                              created_at=order.created_at, file_name=file_name, line=line)
+                for line, order in enumerate(orders)
+            ])
+            archived_vendor_orders = []
+            for archived_order, order in zip(archived_orders, orders):
+                items_count = Counter()
+                for item in order.ordered_food.all():
+                    items_count[item.fooditem.vendor_id] += item.quantity
+                archived_vendor_orders.extend(
+                    ArchivedVendorOrder(archived_order=archived_order, vendor_id=vendor_order.vendor_id,
+                                        total_tax=vendor_order.total_tax, total=vendor_order.total,
+                                        items_count=items_count[vendor_order.vendor_id],
+                                        created_at=vendor_order.created_at)
+                    for vendor_order in order.vendor_orders.all()
+                )
+            ArchivedVendorOrder.objects.bulk_create(archived_vendor_orders)
+            Order.objects.filter(pk__in=order_ids).delete()
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+
+    return len(orders)
+
+
+def get_archived_order(order_number: str, user_id: Optional[int] = None,
+                       vendor_id: Optional[int] = None) -> Optional[ArchivedOrderDetail]:
+    """Archived order with the number, limited to the customer's or the vendor's orders when given.
+    None as well when its archive file or line is gone"""
+
+    archived_orders = ArchivedOrder.objects.filter(order_number=order_number)
+    if user_id is not None:
+        archived_orders = archived_orders.filter(user=user_id)
+    if vendor_id is not None:
+        archived_orders = archived_orders.filter(vendor_orders__vendor=vendor_id)
+    archived_order = archived_orders.first()
+    if archived_order is None:
+        return None
+    try:
+        record = _read_record(archived_order)
+    except (LookupError, FileNotFoundError):
+        logger.exception('Archived order %s cannot be read from %s', order_number, archived_order.file_name)
+        return None
+    return _restore(record)
+
+
+def _order_record(order: Order) -> dict:
+
+    ordered_food = []
+    for item in order.ordered_food.all():
+        ordered_food.append(dict(
+            _dump(item),
+            fooditem=_dump(item.fooditem, ARCHIVED_FOODITEM_FIELDS),
+            vendor=_dump(item.fooditem.vendor, ARCHIVED_VENDOR_FIELDS),
+        ))
+    return {
+        'order': _dump(order),
+        'payment': _dump(order.payment) if order.payment else None,
+        'vendor_orders': [_dump(vendor_order) for vendor_order in order.vendor_orders.all()],
+        'ordered_food': ordered_food,
+    }
+
+
+def _restore(record: dict) -> ArchivedOrderDetail:
+
+    order = _load(Order, record['order'])
+    if record['payment']:
+        order.payment = _load(Payment, record['payment'])
+
+    ordered_food = []
+    for item_record in record['ordered_food']:
+        item = _load(OrderedFood, item_record)
+        item.order = order
+        item.fooditem = _load(FoodItem, item_record['fooditem'])
+        item.fooditem.vendor = _load(Vendor, item_record['vendor'])
+        ordered_food.append(item)
+
+    vendor_orders = []
+    for vendor_order_record in record['vendor_orders']:
+        vendor_order = _load(VendorOrder, vendor_order_record)
+        vendor_order.order = order
+        vendor_orders.append(vendor_order)
+
+    return ArchivedOrderDetail(order=order, ordered_food=ordered_food, vendor_orders=vendor_orders)
+
+
+def _dump(instance, fields: Optional[tuple] = None) -> dict:
+
+    record = {}
+    for model_field in instance._meta.concrete_fields:
+        if fields is not None and model_field.attname not in fields:
+            continue
+        value = model_field.value_from_object(instance)
+        record[model_field.attname] = value.name if isinstance(value, FieldFile) else value
+    return record
+
+
+def _load(model, record: dict):
+    return model(**{model_field.attname: model_field.to_python(record[model_field.attname])
+                    for model_field in model._meta.concrete_fields if model_field.attname in record})
+
+
+def _write_archive(path: Path, records: list) -> None:
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'{path.name}.tmp')
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+        for record in records:
+            archive.write(json.dumps(record, cls=DjangoJSONEncoder) + '\n')
+    os.replace(tmp_path, path)
+
+
+def _read_record(archived_order: ArchivedOrder) -> dict:
+
+    with gzip.open(get_archive_dir() / archived_order.file_name, 'rt', encoding='utf-8') as archive:
+        line = next(islice(archive, archived_order.line, None), None)
+    if line is None:
+        raise LookupError(f'Order {archived_order.order_number} is missing from {archived_order.file_name}')
+    return json.loads(line)
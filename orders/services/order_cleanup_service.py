@@ -0,0 +1,35 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order
+
+UNPAID_ORDERS_BATCH_SIZE = 500
+
+
+def purge_stale_unpaid_orders() -> int:
+    """Delete the unpaid orders older than UNPAID_ORDER_TTL_HOURS"""
+
+    hours = getattr(settings, 'UNPAID_ORDER_TTL_HOURS', 24)
+    return purge_unpaid_orders(timezone.now() - datetime.timedelta(hours=hours))
+
+
+def purge_unpaid_orders(older_than: datetime.datetime, batch_size: int = UNPAID_ORDERS_BATCH_SIZE) -> int:
+    """Delete orders that were placed before older_than and never paid, one short transaction per batch.
+    Return the number of deleted orders"""
+
+    purged = 0
+    while True:
+        with transaction.atomic():
+            # orders being paid right now are locked by create_payment and left for the next run
+            order_ids = list(
+                Order.objects.filter(is_ordered=False, created_at__lt=older_than)
+                .select_for_update(skip_locked=True).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if order_ids:
+                Order.objects.filter(pk__in=order_ids).delete()
+        purged += len(order_ids)
+        if len(order_ids) < batch_size:
+            return purged
@@ -1,15 +1,20 @@
-import json
+import uuid
 from dataclasses import dataclass
-from datetime import datetime
-from typing import List
+from typing import Optional, Tuple
 
-from accounts.models import User
-from mailings.tasks import send_notification_task
+from django.db import transaction
+
+from food_marketplace.money import Money, format_amounts
+from mailings.tasks import send_notification_task, send_notifications_task
 from marketplace.models import Cart
-from marketplace.services.cart_data_service import get_tax_data_of_cart
-from marketplace.services.cart_manipulation_services import get_ordered_cart_items_by_user
+from marketplace.services.cart_manipulation_services import remove_ordered_items_from_cart
+from marketplace.services.cart_storage_service import flush_cart
+from marketplace.services.tax_cache_service import get_tax_data_batch
 from menu.models import FoodItem
-from orders.models import Order, Payment, OrderedFood
+from orders.forms import OrderForm
+from orders.models import Order, Payment, OrderedFood, VendorOrder
+from orders.services.order_number_service import generate_order_number
+from orders.services.vendor_stats_service import record_vendor_stats
 
 
 @dataclass
@@ -25,68 +30,125 @@ class OrderDataRow:
     city: str
     pin_code: str
     user: int
-    total_tax: dict
-    total: str
-    tax_data: str
-    total_data: dict
+    total_tax: Money
+    total: Money
+    tax_data: dict
     payment_method: str
     order_number: str
 
+    @property
+    def name(self):
+        return f'{self.first_name} {self.last_name}'
 
-def get_vendor_ids_from_cart_items(user_id: int) -> list:
-
-    ids = set()
-    cart_items = get_ordered_cart_items_by_user(user_id=user_id)
-    if cart_items['items_qty'] < 1:
-        return list(ids)
 
-    for item in cart_items['cart_items']:
-        vendor_id = item.fooditem.vendor.id
-        ids.add(vendor_id)
+@dataclass
+class CheckoutSnapshot:
+    """Cart items of the user joined to their food items and vendors, with amounts computed in memory"""
 
-    return list(ids)
+    cart_items: list
+    vendors_id: list
+    subtotal: Money
+    tax_dict: dict
+    taxes: Money
+    grand_total: Money
+    vendor_totals: dict
 
+    def get_amounts(self) -> dict:
+        return dict(subtotal=self.subtotal, taxes=self.taxes, grand_total=self.grand_total, tax_dict=self.tax_dict)
 
-def split_order_data_by_vendor(vendors_id: List[int], cart_items_id: List[int]) -> dict:
+    def get_ordered_items(self) -> list:
+        return [{'fooditem_id': item.fooditem_id, 'quantity': item.quantity,
+                 'price': int(Money.from_decimal(item.fooditem.price))} for item in self.cart_items]
 
-    total_data = {}
-    subtotal_by_vendor = _get_subtotal_by_vendor(cart_items_id=cart_items_id)
-    for id_ in vendors_id:
-        subtotal = round(subtotal_by_vendor[id_], 2)
-        tax_data = get_tax_data_of_cart(subtotal=subtotal)
-        total_data.update({id_: {subtotal: tax_data['tax_dict']}})
 
-    return total_data
+def take_checkout_snapshot(user_id: int, lock: bool = False) -> CheckoutSnapshot:
+    """Read the cart once and split its amounts by vendor.
+    With lock=True the cart rows stay locked until the surrounding transaction ends"""
 
+    flush_cart(user_id=user_id)
+    cart_items = Cart.objects.filter(user=user_id).select_related('fooditem__vendor').order_by('created_at')
+    if lock:
+        cart_items = cart_items.select_for_update(of=('self',))
+    cart_items = list(cart_items)
 
-def create_order_from_form(form_data: dict, user_id: int, vendors_id: List[int],
-                           cart_data: dict, total_data: dict, payment_method: str) -> OrderDataRow:
+    subtotal_by_vendor = {}
+    for item in cart_items:
+        vendor_id = item.fooditem.vendor_id
+        item_amount = Money.from_decimal(item.fooditem.price) * item.quantity
+        subtotal_by_vendor[vendor_id] = subtotal_by_vendor.get(vendor_id, Money(0)) + item_amount
+
+    vendors_id = list(subtotal_by_vendor)
+    subtotals = [subtotal_by_vendor[id_] for id_ in vendors_id]
+    subtotal = Money(sum(subtotals))
+    # taxes of the whole cart are calculated on its subtotal, not summed from the vendor parts
+    *tax_data_by_vendor, tax_data = get_tax_data_batch(subtotals=subtotals + [subtotal])
+
+    vendor_totals = {}
+    for id_, vendor_subtotal, vendor_tax_data in zip(vendors_id, subtotals, tax_data_by_vendor):
+        vendor_totals[id_] = {
+            'subtotal': vendor_subtotal,
+            'tax_dict': vendor_tax_data['tax_dict'],
+            'taxes': vendor_tax_data['taxes'],
+            'total': vendor_subtotal + vendor_tax_data['taxes'],
+        }
+
+    return CheckoutSnapshot(
+        cart_items=cart_items,
+        vendors_id=vendors_id,
+        subtotal=subtotal,
+        tax_dict=tax_data['tax_dict'],
+        taxes=tax_data['taxes'],
+        grand_total=subtotal + tax_data['taxes'],
+        vendor_totals=vendor_totals,
+    )
 
-    order = Order()
-    user = User.objects.get(id=user_id)
 
-    order.first_name = form_data['first_name']
-    order.last_name = form_data['last_name']
-    order.phone = form_data['phone']
-    order.email = form_data['email']
-    order.address = form_data['address']
-    order.country = form_data['country']
-    order.state = form_data['state']
-    order.city = form_data['city']
-    order.pin_code = form_data['pin_code']
-    order.user = user
-    order.total_tax = cart_data['taxes']
-    order.total = cart_data['grand_total']
-    order.tax_data = json.dumps(cart_data['tax_dict'])
-    order.total_data = total_data
-    order.payment_method = payment_method
+def place_order_from_cart(form_data: dict, user_id: int, payment_method: str,
+                          checkout_token: Optional[uuid.UUID] = None) -> Tuple[Optional[OrderDataRow], CheckoutSnapshot]:
+    """Create the order of the user's cart in one transaction: a locked cart snapshot,
+    one INSERT of the order and one bulk INSERT of its vendor orders. No order is created for an empty cart.
 
-    order.save()
-    order.order_number = _generate_order_number(user_id)
+    A repeated submission with the same checkout_token updates the pending order of the first one instead
+    of inserting another. No order is returned for a token of a paid or another user's order"""
 
-    order.vendor.add(*vendors_id)
+    with transaction.atomic():
+        # the locked cart rows also serialize concurrent submissions of the same user
+        snapshot = take_checkout_snapshot(user_id=user_id, lock=True)
+        if not snapshot.cart_items:
+            return None, snapshot
 
-    order.save()
+        order = None
+        if checkout_token is not None:
+            order = Order.objects.select_for_update().filter(checkout_token=checkout_token).first()
+        if order is None:
+            order = Order(user_id=user_id, order_number=generate_order_number(), checkout_token=checkout_token)
+        elif order.user_id != user_id or order.is_ordered:
+            return None, snapshot
+        else:
+            # the cart may have changed since the first submission
+            VendorOrder.objects.filter(order=order).delete()
+
+        order.total_tax = snapshot.taxes
+        order.total = snapshot.grand_total
+        order.tax_data = snapshot.tax_dict
+        order.ordered_items = snapshot.get_ordered_items()
+        order.payment_method = payment_method
+        for field in OrderForm.Meta.fields:
+            setattr(order, field, form_data[field])
+        order.save()
+
+        VendorOrder.objects.bulk_create([
+            VendorOrder(
+                order=order,
+                vendor_id=vendor_id,
+                subtotal=totals['subtotal'],
+                tax_data=totals['tax_dict'],
+                total_tax=totals['taxes'],
+                total=totals['total'],
+                created_at=order.created_at,
+            )
+            for vendor_id, totals in snapshot.vendor_totals.items()
+        ])
 
     order_dto = OrderDataRow(
         first_name=order.first_name,
@@ -98,56 +160,112 @@ def create_order_from_form(form_data: dict, user_id: int, vendors_id: List[int],
         state=order.state,
         city=order.city,
         pin_code=order.pin_code,
-        user=order.user,
+        user=order.user_id,
         total_tax=order.total_tax,
         total=order.total,
         tax_data=order.tax_data,
-        total_data=order.total_data,
         payment_method=order.payment_method,
         order_number=order.order_number
     )
 
-    return order_dto
+    return order_dto, snapshot
+
+
+def create_payment(user_id: int, order_number: int, payment_method: str, status: str, transaction_id: str,
+                   domain: str) -> Optional[int]:
+    """Record the payment of the order once per transaction_id and schedule the order finalization.
+    Repeated calls with the same transaction_id return the already saved payment. Returns None if the
+    transaction belongs to another user or order, or the order has been paid by another transaction.
+
+    A capture of an order purged as unpaid meanwhile is saved with order_missing set, for a refund"""
+
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(order_number=order_number, user=user_id).first()
+        if order is None:
+            if not Order.objects.filter(order_number=order_number).exists():
+                Payment.objects.get_or_create(
+                    transaction_id=transaction_id,
+                    defaults={
+                        'user_id': user_id,
+                        'payment_method': payment_method,
+                        'amount': '',
+                        'status': status,
+                        'order_missing': True,
+                    }
+                )
+            return None
+        if order.payment_id is not None:
+            if not Payment.objects.filter(pk=order.payment_id, transaction_id=transaction_id).exists():
+                return None
+            if not order.is_finalized:
+                transaction.on_commit(lambda: _schedule_finalization(order_number, domain))
+            return order.payment_id
+
+        payment, created = Payment.objects.get_or_create(
+            transaction_id=transaction_id,
+            defaults={
+                'user_id': user_id,
+                'payment_method': payment_method,
+                'amount': str(order.total),
+                'status': status,
+            }
+        )
+        if not created and (payment.user_id != user_id or Order.objects.filter(payment=payment).exists()):
+            return None
 
+        order.payment = payment
+        order.is_ordered = True
+        order.save(update_fields=['payment', 'is_ordered', 'updated_at'])
+        transaction.on_commit(lambda: _schedule_finalization(order_number, domain))
 
-def create_payment(user_id: int, order_number: int, payment_method: str, status: str, transaction_id: str) -> int:
+    return payment.pk
 
-    user = User.objects.get(id=user_id)
-    order = Order.objects.get(order_number=order_number, user=user_id)
-    payment = Payment(
-        user=user,
-        transaction_id=transaction_id,
-        payment_method=payment_method,
-        amount=order.total,
-        status=status,
-    )
-    payment.save()
-    order.payment = payment
-    order.is_ordered = True
-    order.save()
 
-    return payment.pk
+def finalize_order(order_number: str, domain: str) -> bool:
+    """Materialize ordered food, send notifications and clean the cart of a paid order.
+    Returns False if the order has already been finalized"""
 
+    with transaction.atomic():
+        order = Order.objects.select_for_update().select_related('payment').get(order_number=order_number)
+        if order.is_finalized or not order.is_ordered:
+            return False
 
-def create_ordered_food_item(order_number: str, payment_id: int, user_id: int) -> float:
+        ordered_food = create_ordered_food_items(order=order, payment=order.payment)
+        record_vendor_stats(order=order, ordered_food=ordered_food)
+        order.is_finalized = True
+        order.save(update_fields=['is_finalized', 'updated_at'])
 
-    cart_items = Cart.objects.filter(user=user_id)
-    order = Order.objects.get(order_number=order_number)
-    payment = Payment.objects.get(id=payment_id)
-    user = User.objects.get(id=user_id)
-    for item in cart_items:
-        ordered_food = OrderedFood(
+        user_id = order.user_id
+        # items added to the cart after checkout stay there
+        quantities = {item.fooditem_id: item.quantity for item in ordered_food}
+        transaction.on_commit(lambda: remove_ordered_items_from_cart(user_id=user_id, quantities=quantities))
+        transaction.on_commit(lambda: send_order_notification_to_vendors(order_number=order_number))
+        transaction.on_commit(lambda: send_order_notification_to_customer(order_number=order_number, domain=domain))
+
+    return True
+
+
+def create_ordered_food_items(order: Order, payment: Payment) -> list:
+    """Ordered food of the cart snapshot taken when the order was placed, so it matches the charged totals"""
+
+    # food items could be deleted since the order was placed, vendors of the rest are read by record_vendor_stats
+    fooditems = FoodItem.objects.only('pk', 'vendor').in_bulk([item['fooditem_id'] for item in order.ordered_items])
+    ordered_food = []
+    for item in order.ordered_items:
+        if item['fooditem_id'] not in fooditems:
+            continue
+        price = Money(item['price'])
+        ordered_food.append(OrderedFood(
             order=order,
             payment=payment,
-            user=user,
-            fooditem=item.fooditem,
-            quantity=item.quantity,
-            price=item.fooditem.price,
-            amount=item.quantity * item.fooditem.price
-        )
-        ordered_food.save()
-    subtotal = order.total - order.total
-    return subtotal
+            user_id=order.user_id,
+            fooditem=fooditems[item['fooditem_id']],
+            quantity=item['quantity'],
+            price=price,
+            amount=price * item['quantity']
+        ))
+
+    return OrderedFood.objects.bulk_create(ordered_food)
 
 
 def send_order_notification_to_customer(order_number: str, domain: str):
@@ -164,19 +282,17 @@ def send_order_notification_to_customer(order_number: str, domain: str):
             food.fooditem.food_title: {
                 'image_url': food.fooditem.image.url,
                 'quantity': food.quantity,
-                'price': food.price,
+                'price': str(food.price),
             }
         })
 
-    tax_data = json.loads(order.tax_data)
-    subtotal = round((order.total - order.total_tax), 2)
     order_data = {
         'created_at': order.created_at,
         'order_number': order.order_number,
         'payment_method': order.payment_method,
         'transaction_id': order.payment.transaction_id,
-        'total': order.total,
-        'subtotal': subtotal
+        'total': str(order.total),
+        'subtotal': str(order.subtotal)
     }
 
     context = {
@@ -184,7 +300,7 @@ def send_order_notification_to_customer(order_number: str, domain: str):
         'to_email': [order.email],
         'ordered_food': ordered_food,
         'domain': domain,
-        'tax_data': tax_data
+        'tax_data': format_amounts(order.get_tax_dict())
     }
 
     send_notification_task.delay(message_subject, email_template, context)
@@ -194,91 +310,56 @@ def send_order_notification_to_vendors(order_number: str):
 
     message_subject = 'You have received a new order.'
     email_template = 'orders/email/new_order_received.html'
-    order = Order.objects.get(order_number=order_number)
-    ordered_food = OrderedFood.objects.filter(order=order)
-
-    to_email = []
-    for ordered_item in ordered_food:
-        vendor = ordered_item.fooditem.vendor
-        email = vendor.user.email
-        if email not in to_email:
-            to_email.append(email)
-            ordered_food_to_vendor = OrderedFood.objects.filter(order=order, fooditem__vendor=vendor)
-            ordered_food = {}
-            for food in ordered_food_to_vendor:
-                ordered_food.update({
-                    food.fooditem.food_title: {
-                        'image_url': food.fooditem.image.url,
-                        'quantity': food.quantity,
-                        'price': food.price,
-                    }
-                })
-                print(ordered_food)
-            order_by_vendor = get_order_data_by_vendor(order_number=order_number, vendor_id=vendor.pk)
-            order_data = {
-                    'created_at': order.created_at,
-                    'order_number': order.order_number,
-                    'payment_method': order.payment_method,
-                    'transaction_id': order.payment.transaction_id
-                }
-            context = {
-                'order': order_data,
-                'to_email': [email],
-                'ordered_food': ordered_food,
-                'vendor_subtotal': order_by_vendor['subtotal'],
-                'tax_data': order_by_vendor['tax_dict'],
-                'vendor_grand_total': order_by_vendor['total'],
+    order = Order.objects.select_related('payment').get(order_number=order_number)
+    order_data = {
+        'created_at': order.created_at,
+        'order_number': order.order_number,
+        'payment_method': order.payment_method,
+        'transaction_id': order.payment.transaction_id
+    }
+
+    ordered_food_by_vendor = {}
+    for food in OrderedFood.objects.filter(order=order).select_related('fooditem'):
+        ordered_food_by_vendor.setdefault(food.fooditem.vendor_id, {}).update({
+            food.fooditem.food_title: {
+                'image_url': food.fooditem.image.url,
+                'quantity': food.quantity,
+                'price': str(food.price),
             }
+        })
 
-            send_notification_task.delay(message_subject, email_template, context)
+    contexts = []
+    for vendor_order in order.vendor_orders.select_related('vendor__user'):
+        contexts.append({
+            'order': order_data,
+            'to_email': [vendor_order.vendor.user.email],
+            'ordered_food': ordered_food_by_vendor.get(vendor_order.vendor_id, {}),
+            'vendor_subtotal': str(vendor_order.subtotal),
+            'tax_data': format_amounts(vendor_order.get_tax_dict()),
+            'vendor_grand_total': str(vendor_order.total),
+        })
 
+    if contexts:
+        send_notifications_task.delay(message_subject, email_template, contexts)
 
-def _get_subtotal_by_vendor(cart_items_id: List[int]) -> dict:
 
-    subtotal_by_vendor = {}
+def _schedule_finalization(order_number: str, domain: str) -> None:
 
-    for cart_id in cart_items_id:
-        cart_item = Cart.objects.get(id=cart_id)
-        fooditem = FoodItem.objects.get(pk=cart_item.fooditem.pk)
-        vendor_id = fooditem.vendor.id
-        item_amount = float(fooditem.price * cart_item.quantity)
-        if vendor_id in subtotal_by_vendor:
-            subtotal = subtotal_by_vendor[vendor_id]
-            subtotal += item_amount
-            subtotal_by_vendor[vendor_id] = subtotal
-        else:
-            subtotal_by_vendor[vendor_id] = item_amount
+    from orders.tasks import finalize_order_task
+    finalize_order_task.delay(order_number, domain)
 
-    return subtotal_by_vendor
 
+def get_order_data_by_vendor(order_number: str, vendor_id: int):
 
-def _generate_order_number(pk):
-    current_datetime = datetime.now().strftime('%Y%m%d%H%M%S')
-    order_number = current_datetime + str(pk)
-    return order_number
+    vendor_order = VendorOrder.objects.get(order__order_number=order_number, vendor=vendor_id)
+    return get_vendor_order_amounts(vendor_order)
 
 
-def get_order_data_by_vendor(order_number: str, vendor_id: int):
+def get_vendor_order_amounts(vendor_order: VendorOrder) -> dict:
 
-    order = Order.objects.get(order_number=order_number)
-    total_data = order.total_data
-    data = total_data.get(str(vendor_id))
-    subtotal = 0
-    taxes_amount = 0
-    tax_dict = {}
-    for subtotal_, tax_data in data.items():
-        subtotal += float(subtotal_)
-        tax_dict.update(tax_data)
-        for tax in tax_data.values():
-            for tax_amount in tax.values():
-                taxes_amount += float(tax_amount)
-    total = subtotal + taxes_amount
     context = {
-        'subtotal': round(subtotal, 2),
-        'tax_dict': tax_dict,
-        'total': round(total, 2),
+        'subtotal': vendor_order.subtotal,
+        'tax_dict': vendor_order.get_tax_dict(),
+        'total': vendor_order.total,
     }
     return context
-
-
-
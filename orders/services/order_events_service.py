@@ -0,0 +1,100 @@
+import json
+import queue
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterator, Optional
+
+import redis
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseOrderEventBroker:
+    """Publish/subscribe of order events between the processes that change orders and the SSE streams"""
+
+    def publish(self, channel: str, event: dict) -> None:
+        raise NotImplementedError
+
+    def listen(self, channels: list, timeout: float) -> Iterator[Optional[dict]]:
+        """Yield events published to the channels, or None after `timeout` seconds without events.
+        Closing the generator unsubscribes"""
+        raise NotImplementedError
+
+
+class RedisOrderEventBroker(BaseOrderEventBroker):
+    """Redis PUBLISH/SUBSCRIBE on the CACHES['default'] server, events reach every web worker"""
+
+    def __init__(self):
+        self.client = redis.Redis.from_url(settings.CACHES['default']['LOCATION'])
+
+    def publish(self, channel: str, event: dict) -> None:
+        self.client.publish(channel, json.dumps(event))
+
+    def listen(self, channels: list, timeout: float) -> Iterator[Optional[dict]]:
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*channels)
+        try:
+            while True:
+                message = pubsub.get_message(timeout=timeout)
+                yield None if message is None else json.loads(message['data'])
+        finally:
+            pubsub.close()
+
+
+class InProcessOrderEventBroker(BaseOrderEventBroker):
+    """Events are delivered only inside this process, meant for tests and the development server"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel: str, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.put(event)
+
+    def listen(self, channels: list, timeout: float) -> Iterator[Optional[dict]]:
+        subscriber = queue.Queue()
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscriber)
+        try:
+            while True:
+                try:
+                    yield subscriber.get(timeout=timeout)
+                except queue.Empty:
+                    yield None
+        finally:
+            with self._lock:
+                for channel in channels:
+                    self._subscribers[channel].discard(subscriber)
+                    if not self._subscribers[channel]:
+                        del self._subscribers[channel]
+
+
+@lru_cache(maxsize=None)
+def get_order_event_broker() -> BaseOrderEventBroker:
+
+    backend = getattr(settings, 'ORDER_EVENTS_BACKEND',
+                      'orders.services.order_events_service.InProcessOrderEventBroker')
+    return import_string(backend)()
+
+
+def vendor_channel(vendor_id: int) -> str:
+    return f'orders:vendor:{vendor_id}'
+
+
+def customer_channel(user_id: int) -> str:
+    return f'orders:user:{user_id}'
+
+
+def publish_order_status_events(events: list) -> None:
+    """Send each status event to the vendor of the sub-order and to the customer"""
+
+    broker = get_order_event_broker()
+    for event in events:
+        payload = {key: value for key, value in event.items() if key != 'user_id'}
+        broker.publish(vendor_channel(event['vendor_id']), payload)
+        broker.publish(customer_channel(event['user_id']), payload)
@@ -0,0 +1,27 @@
+from django.db import connection
+from django.utils import timezone
+
+ORDER_NUMBER_SEQUENCE = 'orders_order_number_seq'
+
+
+class _OrderNumberAllocator:
+    """Hands out order counters from the database sequence, one nextval() per order.
+
+    The sequence is shared by every worker, so counters are unique and follow the order in which they were taken.
+    """
+
+    def allocate(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT nextval(%s)', [ORDER_NUMBER_SEQUENCE])
+            return cursor.fetchone()[0]
+
+
+_order_number_allocator = _OrderNumberAllocator()
+
+
+def generate_order_number() -> str:
+    """Return a unique order number: the local date followed by a 12 digit counter, e.g. '20261018000000000101'.
+
+    Numbers sort in the order they were generated."""
+
+    return f'{timezone.localdate():%Y%m%d}{_order_number_allocator.allocate():012d}'
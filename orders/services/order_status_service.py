@@ -0,0 +1,65 @@
+from django.db import transaction
+from django.utils import timezone
+
+from orders.models import Order, VendorOrder
+from orders.services.order_events_service import publish_order_status_events
+
+ORDER_STATUS_TRANSITIONS = {
+    'New': ('Accepted', 'Completed'),
+    'Accepted': ('Completed', ),
+    'Completed': (),
+}
+_STATUS_RANK = {status: rank for rank, (status, _) in enumerate(Order.STATUS)}
+
+
+def change_vendor_orders_status(vendor_id: int, order_numbers: list, status: str) -> dict:
+    """Move the vendor's parts of the paid orders to the status, skipping the ones that can't make that transition.
+    The order status follows the least advanced of its vendor orders. Events are published after commit"""
+
+    with transaction.atomic():
+        # every status change locks the orders first, so the order status is computed from up to date parts
+        orders = {
+            order.pk: order for order in Order.objects.select_for_update(of=('self', )).filter(
+                order_number__in=order_numbers, is_ordered=True, vendor_orders__vendor=vendor_id
+            ).order_by('pk')
+        }
+        vendor_orders = VendorOrder.objects.filter(order__in=list(orders), vendor=vendor_id)
+        changed = [vendor_order for vendor_order in vendor_orders
+                   if status in ORDER_STATUS_TRANSITIONS[vendor_order.status]]
+        VendorOrder.objects.filter(pk__in=[vendor_order.pk for vendor_order in changed]).update(
+            status=status, updated_at=timezone.now()
+        )
+
+        order_statuses = _update_orders_status(order_ids=[vendor_order.order_id for vendor_order in changed])
+        events = [
+            {
+                'order_number': orders[vendor_order.order_id].order_number,
+                'vendor_id': vendor_id,
+                'status': status,
+                'order_status': order_statuses[vendor_order.order_id],
+                'user_id': orders[vendor_order.order_id].user_id,
+            }
+            for vendor_order in changed
+        ]
+        transaction.on_commit(lambda: publish_order_status_events(events))
+
+    updated = [event['order_number'] for event in events]
+    return {
+        'updated': updated,
+        'skipped': [order_number for order_number in order_numbers if order_number not in updated],
+    }
+
+
+def _update_orders_status(order_ids: list) -> dict:
+
+    order_statuses = {}
+    for order_id, vendor_status in VendorOrder.objects.filter(order__in=order_ids).values_list('order_id', 'status'):
+        current = order_statuses.get(order_id)
+        if current is None or _STATUS_RANK[vendor_status] < _STATUS_RANK[current]:
+            order_statuses[order_id] = vendor_status
+
+    for status in set(order_statuses.values()):
+        ids = [order_id for order_id, order_status in order_statuses.items() if order_status == status]
+        Order.objects.filter(pk__in=ids).update(status=status, updated_at=timezone.now())
+
+    return order_statuses
@@ -0,0 +1,63 @@
+import base64
+import binascii
+import datetime
+from typing import Optional
+
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from orders.models import VendorOrder
+
+VENDOR_ORDERS_PAGE_SIZE = 20
+
+
+def get_vendor_orders_page(vendor_id: int, cursor: Optional[str] = None, date_from: Optional[datetime.date] = None,
+                           date_to: Optional[datetime.date] = None, status: Optional[str] = None,
+                           page_size: int = VENDOR_ORDERS_PAGE_SIZE) -> dict:
+    """Newest first page of the vendor's paid orders after the cursor.
+    Pages are cut by (created_at, id) so every page is one descending range scan of the vendor's index"""
+
+    vendor_orders = filter_vendor_orders(vendor_id, date_from=date_from, date_to=date_to, status=status)
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, pk = position
+        vendor_orders = vendor_orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk),
+                                             created_at__lte=created_at)
+
+    rows = list(vendor_orders.order_by('-created_at', '-pk')[:page_size + 1])
+    page = rows[:page_size]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > page_size else None
+    return {'vendor_orders': page, 'next_cursor': next_cursor}
+
+
+def filter_vendor_orders(vendor_id: int, date_from: Optional[datetime.date] = None,
+                         date_to: Optional[datetime.date] = None, status: Optional[str] = None) -> QuerySet:
+    """Vendor's paid orders narrowed down by the order date range and status, not ordered"""
+
+    vendor_orders = VendorOrder.objects.paid_orders_by_vendor(vendor_id).select_related('order')
+    if date_from:
+        vendor_orders = vendor_orders.filter(created_at__gte=_start_of_day(date_from))
+    if date_to:
+        vendor_orders = vendor_orders.filter(created_at__lt=_start_of_day(date_to + datetime.timedelta(days=1)))
+    if status:
+        vendor_orders = vendor_orders.filter(status=status)
+    return vendor_orders
+
+
+def encode_cursor(vendor_order: VendorOrder) -> str:
+    position = f'{vendor_order.created_at.isoformat()}|{vendor_order.pk}'
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Optional[tuple]:
+    """Return (created_at, id) of the cursor, None for a malformed one"""
+
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def _start_of_day(day: datetime.date) -> datetime.datetime:
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
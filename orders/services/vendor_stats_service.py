@@ -0,0 +1,119 @@
+import datetime
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from food_marketplace.money import Money
+from orders.models import Order, OrderedFood, VendorOrder, VendorDailyStats, VendorLifetimeStats, STATS_COUNTERS, \
+    ArchivedVendorOrder
+
+
+def record_vendor_stats(order: Order, ordered_food: list) -> None:
+    """Add the finalized order to the daily and lifetime stats of its vendors.
+    Must run in the transaction that finalizes the order, so each order is counted once"""
+
+    items_by_vendor = {}
+    for food in ordered_food:
+        vendor_id = food.fooditem.vendor_id
+        items_by_vendor[vendor_id] = items_by_vendor.get(vendor_id, 0) + food.quantity
+
+    day = timezone.localdate(order.created_at)
+    rows = [
+        {
+            'vendor_id': vendor_id,
+            'day': day,
+            'orders_count': 1,
+            'gross': total,
+            'tax': total_tax,
+            'items_count': items_by_vendor.get(vendor_id, 0),
+        }
+        for vendor_id, total, total_tax in order.vendor_orders.values_list('vendor_id', 'total', 'total_tax')
+    ]
+    VendorDailyStats.objects.increment(rows)
+    VendorLifetimeStats.objects.increment(rows)
+
+
+def get_vendor_dashboard_stats(vendor_id: int, today: datetime.date) -> dict:
+    """Day, month and all-time revenue and all-time orders count of the vendor read from the rollups"""
+
+    daily_stats = VendorDailyStats.objects.filter(vendor=vendor_id, day__gte=today.replace(day=1), day__lte=today)
+    month = daily_stats.aggregate(gross=Sum('gross'), tax=Sum('tax'))
+    day = daily_stats.filter(day=today).values('gross', 'tax').first() or {'gross': 0, 'tax': 0}
+    lifetime = (VendorLifetimeStats.objects.filter(vendor=vendor_id).values('orders_count', 'gross', 'tax').first()
+                or {'orders_count': 0, 'gross': 0, 'tax': 0})
+
+    return {
+        'orders_count': lifetime['orders_count'],
+        'total_revenue': Money(lifetime['gross'] - lifetime['tax']),
+        'day_revenue': Money(day['gross'] - day['tax']),
+        'month_revenue': Money((month['gross'] or 0) - (month['tax'] or 0)),
+    }
+
+
+def rebuild_vendor_stats() -> int:
+    """Recompute all vendor rollups from the finalized and archived orders, return the number of daily rows"""
+
+    with transaction.atomic():
+        # finalizations that commit after the lock is taken wait for the rebuild, then add themselves on top of it
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {VendorDailyStats._meta.db_table}, {VendorLifetimeStats._meta.db_table} '
+                           f'IN EXCLUSIVE MODE')
+
+        daily = {}
+        vendor_orders = (
+            VendorOrder.objects.filter(order__is_finalized=True)
+            .annotate(day=TruncDate('created_at'))
+            .values('vendor_id', 'day')
+            .annotate(orders_count=Count('id'), gross=Sum('total'), tax=Sum('total_tax'))
+            .order_by()
+        )
+        for row in vendor_orders:
+            daily[row['vendor_id'], row['day']] = dict(row, items_count=0)
+
+        items = (
+            OrderedFood.objects.filter(order__is_finalized=True)
+            .annotate(day=TruncDate('order__created_at'))
+            .values('fooditem__vendor_id', 'day')
+            .annotate(items_count=Sum('quantity'))
+            .order_by()
+        )
+        for row in items:
+            key = (row['fooditem__vendor_id'], row['day'])
+            if key in daily:
+                daily[key]['items_count'] = row['items_count']
+
+        # archived orders left the orders tables but still count
+        archived = (
+            ArchivedVendorOrder.objects
+            .annotate(day=TruncDate('created_at'))
+            .values('vendor_id', 'day')
+            .annotate(orders_count=Count('id'), gross=Sum('total'), tax=Sum('total_tax'),
+                      items_count=Sum('items_count'))
+            .order_by()
+        )
+        for row in archived:
+            totals = daily.setdefault((row['vendor_id'], row['day']), dict.fromkeys(STATS_COUNTERS, 0))
+            for counter in STATS_COUNTERS:
+                totals[counter] += row[counter]
+
+        lifetime = {}
+        for (vendor_id, _), row in daily.items():
+            totals = lifetime.setdefault(vendor_id, dict.fromkeys(STATS_COUNTERS, 0))
+            for counter in STATS_COUNTERS:
+                totals[counter] += row[counter]
+
+        VendorDailyStats.objects.all().delete()
+        VendorLifetimeStats.objects.all().delete()
+        VendorDailyStats.objects.bulk_create(
+            [VendorDailyStats(vendor_id=vendor_id, day=day, **{counter: row[counter] for counter in STATS_COUNTERS})
+             for (vendor_id, day), row in daily.items()],
+            batch_size=1000
+        )
+        VendorLifetimeStats.objects.bulk_create(
+            [VendorLifetimeStats(vendor_id=vendor_id, **totals) for vendor_id, totals in lifetime.items()],
+            batch_size=1000
+        )
+
+    return len(daily)
@@ -0,0 +1,32 @@
+from celery import shared_task
+
+from orders.services.order_archive_service import archive_old_orders
+from orders.services.order_cleanup_service import purge_stale_unpaid_orders
+from orders.services.order_creation_service import finalize_order
+
+
+@shared_task(bind=True, max_retries=3)
+def finalize_order_task(self, order_number: str, domain: str):
+    try:
+        finalize_order(order_number, domain)
+        return 'Success'
+    except Exception:
+        self.retry(countdown=3)
+
+
+@shared_task(bind=True, max_retries=3)
+def archive_old_orders_task(self):
+    try:
+        archive_old_orders()
+        return 'Success'
+    except Exception:
+        self.retry(countdown=3)
+
+
+@shared_task(bind=True, max_retries=3)
+def purge_unpaid_orders_task(self):
+    try:
+        purge_stale_unpaid_orders()
+        return 'Success'
+    except Exception:
+        self.retry(countdown=3)
@@ -1,3 +1,455 @@
-from django.test import TestCase
+import tempfile
+import uuid
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.admin import site
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from food_marketplace.money import Money
+from food_marketplace.testing import create_category, create_customer, create_fooditem, create_user, create_vendor
+from marketplace.models import Cart, Tax
+from marketplace.services.cart_storage_service import get_cart_storage
+from marketplace.services.tax_cache_service import _tax_rules_cache
+from menu.models import FoodItem
+from orders.admin import OrderAdmin
+from orders.models import Order, VendorOrder, OrderedFood, Payment, ArchivedOrder, ArchivedVendorOrder, \
+    VendorDailyStats, VendorLifetimeStats
+from orders.services.order_archive_service import archive_orders, get_archived_order, get_archive_dir
+from orders.services.order_cleanup_service import purge_unpaid_orders
+from orders.services.order_creation_service import place_order_from_cart, create_payment, finalize_order, \
+    get_order_data_by_vendor
+from orders.services.order_events_service import get_order_event_broker, vendor_channel, customer_channel
+from orders.services.order_number_service import _OrderNumberAllocator, generate_order_number
+from orders.services.order_status_service import change_vendor_orders_status
+from orders.services.vendor_order_list_service import get_vendor_orders_page, encode_cursor, decode_cursor, \
+    filter_vendor_orders
+from orders.services.vendor_stats_service import get_vendor_dashboard_stats
+
+
+class OrderQueryPlanTest(TestCase):
+    """Main order lookups must be served by their indexes on a realistically sized, analyzed table"""
+
+    ORDERS_COUNT = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendors = []
+        for i in range(10):
+            cls.vendors.append(create_vendor(i, is_approved=True, is_listed=True))
+        cls.customers = [create_customer(f'customer{i}', str(i)) for i in range(10)]
+
+        now = timezone.now()
+        orders = Order.objects.bulk_create([
+            Order(user=cls.customers[i % 10], order_number=f'20261018{i:012d}', first_name='Customer', last_name='0',
+                  phone='123', email='customer@example.com', address='Street', city='City', total=Money(1000),
+                  total_tax=Money(100), tax_data={}, payment_method='PayPal', is_ordered=i % 2 == 0,
+                  is_finalized=i % 2 == 0, status='Completed')
+            for i in range(cls.ORDERS_COUNT)
+        ], batch_size=1000)
+        # one order an hour back from now
+        for i, order in enumerate(orders):
+            order.created_at = now - timedelta(hours=i)
+        Order.objects.bulk_update(orders, ['created_at'], batch_size=1000)
+        VendorOrder.objects.bulk_create([
+            VendorOrder(order=order, vendor=cls.vendors[i % 10], subtotal=Money(900), total_tax=Money(100),
+                        total=Money(1000), created_at=order.created_at)
+            for i, order in enumerate(orders)
+        ], batch_size=1000)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, msg=plan)
+
+    def test_paid_orders_by_user(self):
+        queryset = Order.objects.paid_orders_by_user(user=self.customers[0]).order_by('-created_at')[:5]
+        self.assertUsesIndex(queryset, 'order_user_ordered_created_idx')
+
+    def test_orders_to_archive(self):
+        # the archiving query of the oldest orders
+        older_than = timezone.now() - timedelta(hours=self.ORDERS_COUNT - 50)
+        queryset = Order.objects.filter(created_at__lt=older_than, is_finalized=True, status='Completed')
+        self.assertUsesIndex(queryset.order_by('pk').values('pk')[:500], 'order_created_at_idx')
+
+    def test_vendor_orders_of_a_day(self):
+        today = timezone.localdate()
+        queryset = filter_vendor_orders(self.vendors[0].pk, date_from=today, date_to=today)
+        self.assertUsesIndex(queryset.order_by('-created_at', '-pk')[:20], 'vendororder_vendor_created_idx')
+
+    def test_order_by_order_number(self):
+        self.assertUsesIndex(Order.objects.filter(order_number='20261018000000000001'),
+                             'orders_order_order_number_')
+
+
+@override_settings(ORDER_EVENTS_BACKEND='orders.services.order_events_service.InProcessOrderEventBroker')
+class OrderStatusTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendors = [create_vendor(i) for i in range(2)]
+        cls.customer = create_customer()
+        cls.order = Order.objects.create(user=cls.customer, order_number='20261018000000000001', first_name='Customer',
+                                         last_name='0', phone='123', email='customer@example.com', address='Street',
+                                         city='City', total=Money(2000), total_tax=Money(200), tax_data={},
+                                         payment_method='PayPal', is_ordered=True)
+        for vendor in cls.vendors:
+            VendorOrder.objects.create(order=cls.order, vendor=vendor, subtotal=Money(900), total_tax=Money(100),
+                                       total=Money(1000), created_at=cls.order.created_at)
+
+    def setUp(self):
+        get_order_event_broker.cache_clear()
+        self.addCleanup(get_order_event_broker.cache_clear)
+
+    def _listen(self, channel):
+        events = get_order_event_broker().listen([channel], timeout=0.01)
+        # the first step subscribes and times out
+        self.assertIsNone(next(events))
+        self.addCleanup(events.close)
+        return events
+
+    def test_order_status_follows_least_advanced_vendor_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = change_vendor_orders_status(self.vendors[0].pk, [self.order.order_number], 'Completed')
+
+        self.assertEqual(result, {'updated': [self.order.order_number], 'skipped': []})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'New')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            change_vendor_orders_status(self.vendors[1].pk, [self.order.order_number], 'Accepted')
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'Accepted')
+
+    def test_invalid_transition_is_skipped(self):
+        VendorOrder.objects.filter(vendor=self.vendors[0]).update(status='Completed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = change_vendor_orders_status(self.vendors[0].pk, [self.order.order_number], 'Accepted')
+
+        self.assertEqual(result, {'updated': [], 'skipped': [self.order.order_number]})
+
+    def test_events_are_published_to_vendor_and_customer(self):
+        vendor_events = self._listen(vendor_channel(self.vendors[0].pk))
+        customer_events = self._listen(customer_channel(self.customer.pk))
+        other_vendor_events = self._listen(vendor_channel(self.vendors[1].pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            change_vendor_orders_status(self.vendors[0].pk, [self.order.order_number], 'Accepted')
+
+        expected = {'order_number': self.order.order_number, 'vendor_id': self.vendors[0].pk, 'status': 'Accepted',
+                    'order_status': 'New'}
+        self.assertEqual(next(vendor_events), expected)
+        self.assertEqual(next(customer_events), expected)
+        self.assertIsNone(next(other_vendor_events))
+
+    @override_settings(ORDER_EVENTS_HEARTBEAT=0.01, ORDER_EVENTS_STREAM_LIFETIME=0)
+    def test_event_stream_ends_after_its_lifetime(self):
+        self.client.force_login(self.customer)
+
+        response = self.client.get(reverse('order-events'))
+        self.assertEqual(b''.join(response.streaming_content), b'retry: 3000\n\n: heartbeat\n\n')
+
+    def test_vendor_account_without_a_vendor_gets_no_stream(self):
+        self.client.force_login(create_user('vendor2', User.VENDOR, last_name='2'))
+
+        self.assertEqual(self.client.get(reverse('order-events')).status_code, 404)
+
+
+class OrderArchiveTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor()
+        fooditem = create_fooditem(cls.vendor, create_category(cls.vendor))
+
+        cls.customer = create_customer()
+        payment = Payment.objects.create(user=cls.customer, transaction_id='transaction', payment_method='PayPal',
+                                         amount='11.00', status='COMPLETED')
+        cls.order = Order.objects.create(user=cls.customer, payment=payment, order_number='20241018000000000001',
+                                         first_name='Customer', last_name='0', phone='123',
+                                         email='customer@example.com', address='Street', city='City',
+                                         total=Money(1100), total_tax=Money(100), tax_data={'VAT': {'10.00': 100}},
+                                         payment_method='PayPal', status='Completed', is_ordered=True,
+                                         is_finalized=True)
+        Order.objects.filter(pk=cls.order.pk).update(created_at=timezone.now() - timedelta(days=400))
+        VendorOrder.objects.create(order=cls.order, vendor=cls.vendor, subtotal=Money(1000), total_tax=Money(100),
+                                   total=Money(1100), status='Completed', tax_data={'VAT': {'10.00': 100}},
+                                   created_at=timezone.now() - timedelta(days=400))
+        OrderedFood.objects.create(order=cls.order, payment=payment, user=cls.customer, fooditem=fooditem,
+                                   quantity=2, price=Money(500), amount=Money(1000))
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings_override = override_settings(ORDER_ARCHIVE_DIR=archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_old_orders_are_moved_to_the_archive(self):
+        self.assertEqual(archive_orders(timezone.now() - timedelta(days=365)), 1)
+
+        self.assertFalse(Order.objects.filter(pk=self.order.pk).exists())
+        self.assertFalse(OrderedFood.objects.exists())
+        archived_vendor_order = ArchivedVendorOrder.objects.get(archived_order__order_number=self.order.order_number)
+        self.assertEqual((archived_vendor_order.total, archived_vendor_order.items_count), (Money(1100), 2))
+
+    def test_recent_orders_stay(self):
+        self.assertEqual(archive_orders(timezone.now() - timedelta(days=500)), 0)
+        self.assertTrue(Order.objects.filter(pk=self.order.pk).exists())
+
+    def test_archived_order_is_restored(self):
+        archive_orders(timezone.now() - timedelta(days=365))
+
+        self.assertIsNone(get_archived_order(self.order.order_number, user_id=self.customer.pk + 1))
+        archived_order = get_archived_order(self.order.order_number, user_id=self.customer.pk)
+        self.assertEqual(archived_order.order.total, Money(1100))
+        self.assertEqual(archived_order.order.payment.transaction_id, 'transaction')
+        [item] = archived_order.get_ordered_food_by_vendor(self.vendor.pk)
+        self.assertEqual((item.fooditem.food_title, item.fooditem.vendor.vendor_slug, item.quantity),
+                         ('Margherita', 'vendor-0', 2))
+        self.assertEqual(archived_order.get_vendor_order(self.vendor.pk).get_tax_dict(), {'VAT': {'10.00': Money(100)}})
+
+    def test_order_with_a_missing_archive_file_is_not_found(self):
+        archive_orders(timezone.now() - timedelta(days=365))
+        archived_order = ArchivedOrder.objects.get(order_number=self.order.order_number)
+        (get_archive_dir() / archived_order.file_name).unlink()
+
+        with self.assertLogs('orders.services.order_archive_service', level='ERROR'):
+            self.assertIsNone(get_archived_order(self.order.order_number, user_id=self.customer.pk))
+
+
+class OrderNumberTest(TestCase):
+
+    def test_numbers_of_two_allocators_interleave_in_creation_order(self):
+        first, second = _OrderNumberAllocator(), _OrderNumberAllocator()
+        counters = [first.allocate(), second.allocate(), first.allocate(), second.allocate()]
+        self.assertEqual(counters, sorted(counters))
+        self.assertEqual(len(set(counters)), 4)
+
+    def test_order_numbers_sort_by_creation(self):
+        numbers = [generate_order_number() for _ in range(3)]
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertTrue(numbers[0].startswith(f'{timezone.localdate():%Y%m%d}'))
+
+
+@override_settings(CART_STORAGE_BACKEND='marketplace.services.cart_storage_service.DatabaseCartStorage',
+                   CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PlaceOrderTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        vendor = create_vendor()
+        fooditem = create_fooditem(vendor, create_category(vendor))
+        cls.customer = create_customer()
+        Cart.objects.create(user=cls.customer, fooditem=fooditem, quantity=2)
+        cls.fooditem = fooditem
+        vendor = create_vendor(1)
+        cls.other_fooditem = create_fooditem(vendor, create_category(vendor, 'Pasta', slug='pasta'), 'Carbonara',
+                                             slug='carbonara', price='3.50')
+        cls.form_data = {'first_name': 'Customer', 'last_name': '0', 'phone': '123', 'email': 'customer@example.com',
+                         'address': 'Street', 'country': '', 'state': '', 'city': 'City', 'pin_code': ''}
+
+    def setUp(self):
+        get_cart_storage.cache_clear()
+        self.addCleanup(get_cart_storage.cache_clear)
+
+    def _place_order(self, checkout_token):
+        order, _ = place_order_from_cart(form_data=self.form_data, user_id=self.customer.pk, payment_method='PayPal',
+                                         checkout_token=checkout_token)
+        return order
+
+    def test_repeated_submission_returns_the_pending_order(self):
+        checkout_token = uuid.uuid4()
+        first = self._place_order(checkout_token)
+        second = self._place_order(checkout_token)
+
+        self.assertEqual(first.order_number, second.order_number)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(VendorOrder.objects.count(), 1)
+
+    def test_new_checkout_places_a_new_order(self):
+        self._place_order(uuid.uuid4())
+        self._place_order(uuid.uuid4())
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_token_of_a_paid_order_is_rejected(self):
+        checkout_token = uuid.uuid4()
+        self._place_order(checkout_token)
+        Order.objects.update(is_ordered=True)
+
+        self.assertIsNone(self._place_order(checkout_token))
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_checkout_query_count_does_not_grow_with_the_cart(self):
+        self._place_order(uuid.uuid4())
+        with CaptureQueriesContext(connection) as one_item_checkout:
+            self._place_order(uuid.uuid4())
+
+        Cart.objects.create(user=self.customer, fooditem=self.other_fooditem, quantity=3)
+        with self.assertNumQueries(len(one_item_checkout)):
+            order = self._place_order(uuid.uuid4())
+        self.assertEqual(VendorOrder.objects.filter(order__order_number=order.order_number).count(), 2)
+
+    def test_vendor_orders_split_the_order_amounts(self):
+        Tax.objects.create(tax_type='VAT', tax_percentage='10.00')
+        _tax_rules_cache.reset()
+        self.addCleanup(_tax_rules_cache.reset)
+        Cart.objects.create(user=self.customer, fooditem=self.other_fooditem, quantity=3)
+        order = self._place_order(uuid.uuid4())
+
+        vendor_orders = VendorOrder.objects.filter(order__order_number=order.order_number).order_by('vendor_id')
+        self.assertEqual([(vendor_order.subtotal, vendor_order.total_tax, vendor_order.total)
+                          for vendor_order in vendor_orders],
+                         [(Money(1000), Money(100), Money(1100)), (Money(1050), Money(105), Money(1155))])
+        self.assertEqual((order.total_tax, order.total), (Money(205), Money(2255)))
+        self.assertEqual(get_order_data_by_vendor(order.order_number, self.other_fooditem.vendor_id),
+                         {'subtotal': Money(1050), 'tax_dict': {'VAT': {'10.00': Money(105)}}, 'total': Money(1155)})
+
+    def test_admin_lists_order_vendors_without_a_query_per_order(self):
+        Cart.objects.create(user=self.customer, fooditem=self.other_fooditem, quantity=3)
+        for _ in range(3):
+            self._place_order(uuid.uuid4())
+
+        orders = list(OrderAdmin(Order, site).get_queryset(RequestFactory().get('/')))
+        with self.assertNumQueries(0):
+            vendor_names = [sorted(order.order_placed_to().split(', ')) for order in orders]
+        self.assertEqual(vendor_names, [['Vendor 0', 'Vendor 1']] * 3)
+
+    def _pay(self, order_number, transaction_id, user_id=None):
+        with self.captureOnCommitCallbacks():
+            return create_payment(user_id=user_id or self.customer.pk, order_number=order_number,
+                                  payment_method='PayPal', status='COMPLETED', transaction_id=transaction_id,
+                                  domain='example.com')
+
+    def test_transaction_pays_one_order(self):
+        first = self._place_order(uuid.uuid4())
+        second = self._place_order(uuid.uuid4())
+
+        payment_id = self._pay(first.order_number, 'transaction')
+        self.assertEqual(self._pay(first.order_number, 'transaction'), payment_id)
+        self.assertIsNone(self._pay(second.order_number, 'transaction'))
+        self.assertIsNone(self._pay(first.order_number, 'another-transaction'))
+        self.assertEqual(list(Order.objects.order_by('pk').values_list('payment', flat=True)), [payment_id, None])
+
+    def test_ordered_food_is_created_from_the_priced_snapshot(self):
+        order = self._place_order(uuid.uuid4())
+        FoodItem.objects.filter(pk=self.fooditem.pk).update(price='7.00')
+        Cart.objects.filter(user=self.customer).update(quantity=5)
+        self._pay(order.order_number, 'transaction')
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertTrue(finalize_order(order.order_number, 'example.com'))
+        # the first callback cleans the cart, the others send notifications
+        callbacks[0]()
+
+        [item] = OrderedFood.objects.filter(order__order_number=order.order_number)
+        self.assertEqual((item.quantity, item.price, item.amount), (2, Money(500), Money(1000)))
+        self.assertEqual(list(Cart.objects.filter(user=self.customer).values_list('quantity', flat=True)), [3])
+
+    def test_capture_of_a_purged_order_is_kept_for_a_refund(self):
+        order = self._place_order(uuid.uuid4())
+        purge_unpaid_orders(timezone.now() + timedelta(minutes=1))
+
+        self.assertIsNone(self._pay(order.order_number, 'transaction'))
+        self.assertTrue(Payment.objects.get(transaction_id='transaction').order_missing)
+
+    def test_finalization_query_count_does_not_grow_with_the_order(self):
+        first = self._place_order(uuid.uuid4())
+        self._pay(first.order_number, 'first-transaction')
+        with CaptureQueriesContext(connection) as one_item_finalization, self.captureOnCommitCallbacks():
+            finalize_order(first.order_number, 'example.com')
+
+        Cart.objects.create(user=self.customer, fooditem=self.other_fooditem, quantity=3)
+        second = self._place_order(uuid.uuid4())
+        self._pay(second.order_number, 'second-transaction')
+        with self.assertNumQueries(len(one_item_finalization)), self.captureOnCommitCallbacks():
+            finalize_order(second.order_number, 'example.com')
+        self.assertEqual(OrderedFood.objects.filter(order__order_number=second.order_number).count(), 2)
+
+    def test_stale_unpaid_orders_are_purged(self):
+        self._place_order(uuid.uuid4())
+        self._place_order(uuid.uuid4())
+        Order.objects.filter(pk=Order.objects.order_by('pk').values('pk')[:1]).update(is_ordered=True)
+
+        self.assertEqual(purge_unpaid_orders(timezone.now() + timedelta(minutes=1), batch_size=1), 1)
+        self.assertEqual(list(Order.objects.values_list('is_ordered', flat=True)), [True])
+
+
+class VendorDashboardStatsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor()
+
+    def test_vendor_without_orders(self):
+        stats = get_vendor_dashboard_stats(vendor_id=self.vendor.pk, today=timezone.localdate())
+        self.assertEqual(stats['orders_count'], 0)
+        self.assertEqual((str(stats['day_revenue']), str(stats['month_revenue']), str(stats['total_revenue'])),
+                         ('0.00', '0.00', '0.00'))
+
+    def test_stats_are_read_from_the_rollups(self):
+        today = timezone.localdate()
+        row = {'vendor_id': self.vendor.pk, 'day': today, 'orders_count': 2, 'gross': Money(2200),
+               'tax': Money(200), 'items_count': 3}
+        VendorDailyStats.objects.increment([row])
+        VendorLifetimeStats.objects.increment([row])
+
+        stats = get_vendor_dashboard_stats(vendor_id=self.vendor.pk, today=today)
+        self.assertEqual(stats, {'orders_count': 2, 'total_revenue': Money(2000), 'day_revenue': Money(2000),
+                                 'month_revenue': Money(2000)})
+        self.assertEqual(str(VendorLifetimeStats.objects.get(vendor=self.vendor).revenue), '20.00')
+
+
+class VendorOrdersPageTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor()
+        customer = create_customer()
+        now = timezone.now()
+        paid_vendor_orders = []
+        for i in range(25):
+            order = Order.objects.create(user=customer, order_number=f'20261018{i:012d}', first_name='Customer',
+                                         last_name='0', phone='123', email='customer@example.com', address='Street',
+                                         city='City', total=Money(1000), total_tax=Money(100), tax_data={},
+                                         payment_method='PayPal', is_ordered=i > 0)
+            # every two orders share their date, so pages are also cut between equal dates
+            vendor_order = VendorOrder.objects.create(order=order, vendor=cls.vendor, subtotal=Money(900),
+                                                      total_tax=Money(100), total=Money(1000),
+                                                      created_at=now - timedelta(hours=i // 2))
+            if order.is_ordered:
+                paid_vendor_orders.append(vendor_order)
+        cls.paid_vendor_orders = sorted(paid_vendor_orders, key=lambda vendor_order: (vendor_order.created_at,
+                                                                                     vendor_order.pk), reverse=True)
+
+    def test_pages_list_every_paid_order_once(self):
+        pages = []
+        cursor = None
+        while True:
+            with self.assertNumQueries(1):
+                page = get_vendor_orders_page(self.vendor.pk, cursor=cursor, page_size=5)
+            pages.append([vendor_order.pk for vendor_order in page['vendor_orders']])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 4])
+        self.assertEqual([pk for page in pages for pk in page],
+                         [vendor_order.pk for vendor_order in self.paid_vendor_orders])
+
+    def test_cursor_keeps_the_position(self):
+        vendor_order = self.paid_vendor_orders[3]
+        self.assertEqual(decode_cursor(encode_cursor(vendor_order)), (vendor_order.created_at, vendor_order.pk))
+
+    def test_malformed_cursor_starts_from_the_first_page(self):
+        self.assertIsNone(decode_cursor('not a cursor'))
+        page = get_vendor_orders_page(self.vendor.pk, cursor='not a cursor', page_size=5)
+        self.assertEqual(page['vendor_orders'], self.paid_vendor_orders[:5])
@@ -6,4 +6,6 @@ urlpatterns = [
     path('place_order/', views.place_order, name='place-order'),
     path('payments/', views.payments, name='payments'),
     path('order_complete/', views.order_complete, name='order-complete'),
+    path('order_status/', views.order_status, name='order-status'),
+    path('order_events/', views.order_events, name='order-events'),
     ]
\ No newline at end of file
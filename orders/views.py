@@ -1,44 +1,41 @@
-import simplejson as json
+import json
+import time
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.sites.shortcuts import get_current_site
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 
-from marketplace.models import Cart
-from marketplace.services.cart_manipulation_services import get_cart_amounts, get_ordered_cart_items_by_user, \
-    clean_customer_cart
+from accounts.models import User
 from orders.forms import OrderForm
 from orders.models import Order, OrderedFood
-from orders.services.order_creation_service import get_vendor_ids_from_cart_items, split_order_data_by_vendor, \
-    create_order_from_form, send_order_notification_to_customer, send_order_notification_to_vendors, \
-    create_ordered_food_item, create_payment
+from orders.services.order_creation_service import place_order_from_cart, create_payment
+from orders.services.order_events_service import get_order_event_broker, vendor_channel, customer_channel
+from vendors.models import Vendor
 
 
 @login_required()
 def place_order(request):
 
-    user_id = request.user.pk
-    vendors_id = get_vendor_ids_from_cart_items(user_id=user_id)
-
-    # {"vendor_id":{"subtotal":{"tax_type": {"tax_percentage": "tax_amount"}}}}
-    cart_items_id = get_ordered_cart_items_by_user(user_id=user_id, get_ids=True)['cart_items']
-    total_data = split_order_data_by_vendor(vendors_id=vendors_id, cart_items_id=cart_items_id)
-
-    cart_data = get_cart_amounts(user_id=user_id)
-
     if request.method == 'POST':
         form = OrderForm(request.POST)
         if form.is_valid():
             payment_method = request.POST['payment_method']
-            order = create_order_from_form(form_data=form.cleaned_data, user_id=user_id, vendors_id=vendors_id,
-                                           total_data=total_data, cart_data=cart_data, payment_method=payment_method)
-            cart_items = Cart.objects.filter(id__in=cart_items_id)
+            order, checkout = place_order_from_cart(form_data=form.cleaned_data, user_id=request.user.pk,
+                                                    payment_method=payment_method,
+                                                    checkout_token=form.cleaned_data['checkout_token'])
+            if order is None:
+                return redirect('cart')
+
             context = {
                 'order': order,
-                'cart_items': cart_items,
+                'cart_items': checkout.cart_items,
+                **checkout.get_amounts(),
             }
 
             return render(request, 'orders/place_order.html', context)
+        return redirect('checkout')
     else:
         return render(request, 'orders/place_order.html')
 
@@ -52,15 +49,12 @@ def payments(request):
         payment_method = request.POST.get('payment_method')
         status = request.POST.get('status')
 
-        payment_id = create_payment(user_id=request.user.pk, order_number=order_number, payment_method=payment_method,
-                                    status=status, transaction_id=transaction_id)
-        create_ordered_food_item(user_id=request.user.pk, order_number=order_number, payment_id=payment_id)
-        send_order_notification_to_vendors(order_number=order_number)
-        send_order_notification_to_customer(
-            order_number=order_number,
-            domain=str(get_current_site(request))
-        )
-        clean_customer_cart(user_id=request.user.id)
+        payment_id = create_payment(user_id=request.user.pk, order_number=order_number,
+                                    payment_method=payment_method, status=status, transaction_id=transaction_id,
+                                    domain=str(get_current_site(request)))
+        if payment_id is None:
+            return JsonResponse({'status': 'Failed', 'message': 'This transaction can not pay the order'},
+                                status=400)
 
         response = {
             'order_number': order_number,
@@ -79,16 +73,64 @@ def order_complete(request):
     try:
         order = Order.objects.get(order_number=order_number, payment__transaction_id=transaction_id, is_ordered=True)
         ordered_food = OrderedFood.objects.filter(order=order)
-        total = round(order.total, 2)
-        subtotal = round((total - order.total_tax), 2)
-        taxes = json.loads(order.tax_data)
         context = {
             'order': order,
             'ordered_food': ordered_food,
-            'total': total,
-            'subtotal': subtotal,
-            'taxes': taxes,
+            'total': order.total,
+            'subtotal': order.subtotal,
+            'taxes': order.get_tax_dict(),
         }
         return render(request, 'orders/order_complete.html', context=context)
     except Exception:
         return redirect('home')
+
+
+@login_required()
+def order_status(request):
+
+    order = Order.objects.filter(order_number=request.GET.get('order_no'), user=request.user).values(
+        'order_number', 'is_ordered', 'is_finalized').first()
+    if order is None:
+        return JsonResponse({'status': 'Failed', 'message': 'Order not found'}, status=404)
+
+    return JsonResponse(order)
+
+
+@login_required()
+def order_events(request):
+    """Server-Sent Events stream of status changes of the user's orders, or of the vendor's orders for vendors.
+
+    Every stream holds a worker, so it ends after ORDER_EVENTS_STREAM_LIFETIME seconds and the browser reconnects
+    after the `retry` delay"""
+
+    if request.user.role == User.VENDOR:
+        vendor_id = Vendor.objects.filter(user=request.user).values_list('pk', flat=True).first()
+        if vendor_id is None:
+            return JsonResponse({'status': 'Failed', 'message': 'Vendor not found'}, status=404)
+        channels = [vendor_channel(vendor_id)]
+    else:
+        channels = [customer_channel(request.user.pk)]
+
+    response = StreamingHttpResponse(_order_event_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _order_event_stream(channels: list):
+
+    heartbeat = getattr(settings, 'ORDER_EVENTS_HEARTBEAT', 15)
+    closes_at = time.monotonic() + getattr(settings, 'ORDER_EVENTS_STREAM_LIFETIME', 300)
+    yield 'retry: 3000\n\n'
+    events = get_order_event_broker().listen(channels, timeout=heartbeat)
+    try:
+        for event in events:
+            if event is None:
+                # keeps proxies from closing an idle stream and lets the server notice gone clients
+                yield ': heartbeat\n\n'
+            else:
+                yield f'event: order_status\ndata: {json.dumps(event)}\n\n'
+            if time.monotonic() >= closes_at:
+                break
+    finally:
+        events.close()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class VendorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vendors'
+
+    def ready(self):
+        import vendors.signals  # noqa: F401
@@ -1,5 +1,6 @@
 from django import forms
 from accounts.validators import allow_only_images_validator
+from orders.models import Order
 from vendors.models import Vendor, OpeningHour
 
 
@@ -17,3 +18,11 @@ class OpeningHourForm(forms.ModelForm):
     class Meta:
         model = OpeningHour
         fields = ['day', 'from_hour', 'to_hour', 'is_closed']
+
+
+class VendorOrderFilterForm(forms.Form):
+
+    date_from = forms.DateField(required=False, widget=forms.DateInput({'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput({'type': 'date'}))
+    status = forms.ChoiceField(required=False, choices=(('', 'All'), ) + Order.STATUS)
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
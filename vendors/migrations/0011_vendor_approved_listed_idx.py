@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('vendors', '0010_vendor_is_listed'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='vendor',
+            index=models.Index(fields=['is_approved', 'is_listed'], name='vendor_approved_listed_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vector(apps, schema_editor):
+    Vendor = apps.get_model('vendors', 'Vendor')
+    Vendor.objects.update(search_vector=SearchVector('vendor_name', weight='A', config='english'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0011_vendor_approved_listed_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='vendor',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-18 10:00
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+import vendors.models
+
+
+def _slot_index(hour):
+    hours, minutes = hour.split(':')
+    return (int(hours) * 60 + int(minutes)) // 30
+
+
+def fill_weekly_open_slots(apps, schema_editor):
+    Vendor = apps.get_model('vendors', 'Vendor')
+    OpeningHour = apps.get_model('vendors', 'OpeningHour')
+
+    weeks = {}
+    for opening_hour in OpeningHour.objects.filter(is_closed=False).exclude(from_hour=None).exclude(to_hour=None):
+        start = _slot_index(opening_hour.from_hour)
+        end = _slot_index(opening_hour.to_hour)
+        if end > start:
+            week = weeks.setdefault(opening_hour.vendor_id, [0] * 7)
+            week[opening_hour.day - 1] |= (1 << end) - (1 << start)
+    for vendor_id, week in weeks.items():
+        Vendor.objects.filter(pk=vendor_id).update(weekly_open_slots=week)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0013_vendor_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='weekly_open_slots',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(),
+                                                            default=vendors.models.closed_week, editable=False,
+                                                            size=7),
+        ),
+        migrations.RunPython(fill_weekly_open_slots, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,51 @@
 from datetime import time, datetime
+from typing import Optional
+
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.utils import timezone
 from accounts.models import UserProfile, User
 from vendors.services.service import notify_vendor_of_status_change
 
 
+# opening hours are set in half hours, a day is a 48 bit mask of them in Vendor.weekly_open_slots
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+
+def closed_week() -> list:
+    return [0] * 7
+
+
+def get_week_slot(moment: Optional[datetime] = None) -> tuple:
+    """Return (day index from 0 for Monday, slot index) of the moment in the current time zone, now by default"""
+
+    moment = timezone.localtime(moment)
+    return moment.weekday(), (moment.hour * 60 + moment.minute) // SLOT_MINUTES
+
+
 class VendorQuerySet(models.QuerySet):
 
     def valid_vendors(self):
         return self.filter(is_approved=True, user__is_active=True, is_listed=True)
 
+    def with_open_now(self, moment: Optional[datetime] = None):
+        """Annotate open_now, tested on the slot bit of the moment in weekly_open_slots"""
+
+        return self._alias_open_slot(moment).annotate(
+            open_now=ExpressionWrapper(Q(current_open_slot__gt=0), output_field=BooleanField())
+        )
+
+    def open_now(self, moment: Optional[datetime] = None):
+        return self._alias_open_slot(moment).filter(current_open_slot__gt=0)
+
+    def _alias_open_slot(self, moment: Optional[datetime]):
+        day, slot = get_week_slot(moment)
+        return self.alias(current_open_slot=F(f'weekly_open_slots__{day}').bitand(1 << slot))
+
 
 class Vendor(models.Model):
 
@@ -21,30 +58,31 @@ class Vendor(models.Model):
     is_listed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
+    # kept up to date by marketplace.signals, see marketplace.services.full_text_search_service
+    search_vector = SearchVectorField(null=True, editable=False)
+    # kept up to date by vendors.signals, bit n of day d is set when the vendor is open
+    # from n * SLOT_MINUTES minutes after midnight for SLOT_MINUTES minutes, days start from Monday
+    weekly_open_slots = ArrayField(models.BigIntegerField(), size=7, default=closed_week, editable=False)
 
     objects = VendorQuerySet().as_manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_approved', 'is_listed'], name='vendor_approved_listed_idx'),
+            GinIndex(fields=['search_vector'], name='vendor_search_vector_idx'),
+            GinIndex(fields=['vendor_name'], name='vendor_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
+
     def __str__(self):
         return self.vendor_name
 
     @property
-    def is_open(self):
-        now = datetime.now()
-        today = datetime.isoweekday(now)
-        current_opening_hours = OpeningHour.objects.get_by_vendor_and_day(self, today)
-
-        current_time = now.strftime("%H:%M")
-
-        if not current_opening_hours.is_closed:
-            start = str(datetime.strptime(current_opening_hours.from_hour, "%H:%M").time())
-            end = str(datetime.strptime(current_opening_hours.to_hour, "%H:%M").time())
-            if end > current_time > start:
-                is_open = True
-            else:
-                is_open = False
-        else:
-            is_open = False
-        return is_open
+    def is_open(self) -> bool:
+        return self.is_open_at()
+
+    def is_open_at(self, moment: Optional[datetime] = None) -> bool:
+        day, slot = get_week_slot(moment)
+        return bool(self.weekly_open_slots[day] >> slot & 1)
 
     def save(self, *args, **kwargs):
         if self.pk is not None:
@@ -90,5 +128,38 @@ class OpeningHour(models.Model):
         ordering = ('day', '-from_hour')
         unique_together = ('vendor', 'day')
 
+    @property
+    def open_slots(self) -> int:
+        """Mask of the half hours the vendor is open from the start of the day.
+
+        Hours closing at or before the hour they open, midnight ('00:00') included, run past the end of the day:
+        the bits above SLOTS_PER_DAY are the half hours of the next day.
+        """
+
+        if self.is_closed or not self.from_hour or not self.to_hour:
+            return 0
+        start, end = _slot_index(self.from_hour), _slot_index(self.to_hour)
+        if end <= start:
+            end += SLOTS_PER_DAY
+        return (1 << end) - (1 << start)
+
     def __str__(self):
         return self.get_day_display()
+
+
+def _slot_index(hour: str) -> int:
+    hours, minutes = hour.split(':')
+    return (int(hours) * 60 + int(minutes)) // SLOT_MINUTES
+
+
+def compile_weekly_open_slots(opening_hours) -> list:
+    """weekly_open_slots value of the opening hours of a vendor"""
+
+    week = closed_week()
+    day_mask = (1 << SLOTS_PER_DAY) - 1
+    for opening_hour in opening_hours:
+        day, open_slots = opening_hour.day - 1, opening_hour.open_slots
+        week[day] |= open_slots & day_mask
+        # overnight hours of Sunday go on on Monday
+        week[(day + 1) % 7] |= open_slots >> SLOTS_PER_DAY
+    return week
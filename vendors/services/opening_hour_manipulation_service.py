@@ -1,4 +1,4 @@
-from vendors.models import Vendor, OpeningHour
+from vendors.models import Vendor, OpeningHour, compile_weekly_open_slots
 
 
 def _create_opening_hour(vendor_id: int, day: int, from_hour: str = None, to_hour: str = None, is_closed: str = None) -> int:
@@ -39,3 +39,9 @@ def set_default_opening_hours(vendor_id: int) -> None:
             is_closed=True
         )
 
+
+def rebuild_weekly_open_slots(vendor_id: int) -> None:
+
+    # update() skips Vendor.save, which notifies the vendor of approval changes
+    opening_hours = OpeningHour.objects.filter(vendor=vendor_id)
+    Vendor.objects.filter(pk=vendor_id).update(weekly_open_slots=compile_weekly_open_slots(opening_hours))
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from vendors.models import OpeningHour
+from vendors.services.opening_hour_manipulation_service import rebuild_weekly_open_slots
+
+
+@receiver([post_save, post_delete], sender=OpeningHour)
+def rebuild_weekly_open_slots_on_change(sender, instance, **kwargs):
+    rebuild_weekly_open_slots(instance.vendor_id)
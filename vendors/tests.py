@@ -1,3 +1,67 @@
+import datetime
+
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User, UserProfile
+from vendors.models import Vendor, OpeningHour
+
+
+class WeeklyOpenSlotsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(first_name='Vendor', last_name='0', username='vendor0',
+                                        email='vendor0@example.com', password='password')
+        profile = UserProfile.objects.create(user=user)
+        cls.vendor = Vendor.objects.create(user=user, user_profile=profile, vendor_name='Vendor 0',
+                                           vendor_slug='vendor-0', vendor_license='license.png',
+                                           is_approved=True, is_listed=True)
+        # 2026-10-19 is a Monday
+        OpeningHour.objects.create(vendor=cls.vendor, day=1, from_hour='09:00', to_hour='17:30')
+        OpeningHour.objects.create(vendor=cls.vendor, day=2, is_closed=True)
+
+    @staticmethod
+    def _moment(day, hour, minute=0):
+        return timezone.make_aware(datetime.datetime(2026, 10, 18 + day, hour, minute))
+
+    def test_opening_hours_are_compiled_on_save(self):
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.weekly_open_slots[0], (1 << 35) - (1 << 18))
+        self.assertEqual(self.vendor.weekly_open_slots[1:], [0] * 6)
+
+    def test_hours_closing_at_midnight(self):
+        OpeningHour.objects.create(vendor=self.vendor, day=3, from_hour='18:00', to_hour='00:00')
+
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.weekly_open_slots[2], (1 << 48) - (1 << 36))
+        self.assertEqual(self.vendor.weekly_open_slots[3], 0)
+        self.assertTrue(self.vendor.is_open_at(self._moment(3, 23, 59)))
+        self.assertFalse(self.vendor.is_open_at(self._moment(4, 0)))
+
+    def test_overnight_hours_go_on_the_next_day(self):
+        OpeningHour.objects.create(vendor=self.vendor, day=7, from_hour='20:00', to_hour='02:00')
+
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.weekly_open_slots[6], (1 << 48) - (1 << 40))
+        # after midnight of Sunday, on top of the Monday hours
+        self.assertEqual(self.vendor.weekly_open_slots[0], (1 << 35) - (1 << 18) | (1 << 4) - 1)
+        self.assertTrue(self.vendor.is_open_at(self._moment(7, 23)))
+        self.assertTrue(self.vendor.is_open_at(self._moment(1, 1, 59)))
+        self.assertFalse(self.vendor.is_open_at(self._moment(1, 2)))
+        self.assertQuerySetEqual(Vendor.objects.open_now(self._moment(1, 1)), [self.vendor])
+
+    def test_is_open_runs_no_queries(self):
+        self.vendor.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.assertTrue(self.vendor.is_open_at(self._moment(1, 9)))
+            self.assertTrue(self.vendor.is_open_at(self._moment(1, 17, 29)))
+            self.assertFalse(self.vendor.is_open_at(self._moment(1, 17, 30)))
+            self.assertFalse(self.vendor.is_open_at(self._moment(2, 12)))
+
+    def test_open_now_filter(self):
+        self.assertQuerySetEqual(Vendor.objects.open_now(self._moment(1, 12)), [self.vendor])
+        self.assertQuerySetEqual(Vendor.objects.open_now(self._moment(1, 8, 59)), [])
 
-# Create your tests here.
+        OpeningHour.objects.filter(vendor=self.vendor, day=1).delete()
+        self.assertQuerySetEqual(Vendor.objects.open_now(self._moment(1, 12)), [])
@@ -25,4 +25,6 @@ urlpatterns = [
 
     path('order-detail/<int:order_number>/', views.order_detail, name='v-order-detail'),
     path('orders/', views.my_orders, name='v-my-orders'),
+    path('orders/status/', views.change_orders_status, name='v-change-orders-status'),
+    path('orders/<str:order_number>/status/', views.change_order_status, name='v-change-order-status'),
 ]
\ No newline at end of file
@@ -1,7 +1,7 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db import IntegrityError
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.shortcuts import render, redirect, get_object_or_404
 
 from accounts.forms import UserProfileForm
@@ -10,8 +10,11 @@ from accounts.utils import check_role_vendor
 from menu.forms import CategoryForm, FoodItemForm
 from menu.models import Category, FoodItem
 from orders.models import Order, OrderedFood
-from orders.services.order_creation_service import get_order_data_by_vendor
-from vendors.forms import VendorForm, OpeningHourForm
+from orders.services.order_archive_service import get_archived_order
+from orders.services.order_creation_service import get_order_data_by_vendor, get_vendor_order_amounts
+from orders.services.order_status_service import change_vendor_orders_status, ORDER_STATUS_TRANSITIONS
+from orders.services.vendor_order_list_service import get_vendor_orders_page
+from vendors.forms import VendorForm, OpeningHourForm, VendorOrderFilterForm
 from vendors.models import Vendor, OpeningHour
 from vendors.services.category_manipulation_service import create_or_update_category
 from vendors.services.fooditem_manipulation_service import create_or_update_fooditem
@@ -237,9 +240,17 @@ def order_detail(request, order_number):
 
     vendor_id = get_vendor_from_request(request)
 
-    order = get_object_or_404(Order, order_number=order_number, is_ordered=True)
-    ordered_food = OrderedFood.objects.filter(order=order, fooditem__vendor__in=[vendor_id])
-    order_data = get_order_data_by_vendor(order_number=order_number, vendor_id=vendor_id)
+    order = Order.objects.filter(order_number=order_number, is_ordered=True).first()
+    if order is not None:
+        ordered_food = OrderedFood.objects.filter(order=order, fooditem__vendor__in=[vendor_id])
+        order_data = get_order_data_by_vendor(order_number=order_number, vendor_id=vendor_id)
+    else:
+        archived_order = get_archived_order(order_number, vendor_id=vendor_id)
+        if archived_order is None:
+            raise Http404
+        order = archived_order.order
+        ordered_food = archived_order.get_ordered_food_by_vendor(vendor_id)
+        order_data = get_vendor_order_amounts(archived_order.get_vendor_order(vendor_id))
     context = {
         'order': order,
         'ordered_food': ordered_food,
@@ -253,6 +264,45 @@ def order_detail(request, order_number):
 @login_required
 @user_passes_test(check_role_vendor)
 def my_orders(request):
-    orders = Order.objects.filter(vendor=get_vendor_from_request(request), is_ordered=True).order_by('created_at')[::-1]
-    return render(request, 'vendors/orders.html', context={'orders': orders})
+    filter_form = VendorOrderFilterForm(request.GET)
+    filters = filter_form.cleaned_data if filter_form.is_valid() else {}
+    page = get_vendor_orders_page(vendor_id=get_vendor_from_request(request), **filters)
+
+    next_page_query = None
+    if page['next_cursor']:
+        query = request.GET.copy()
+        query['cursor'] = page['next_cursor']
+        next_page_query = query.urlencode()
+
+    context = {
+        'orders': page['vendor_orders'],
+        'filter_form': filter_form,
+        'next_page_query': next_page_query,
+    }
+    return render(request, 'vendors/orders.html', context=context)
+
+
+@login_required
+@user_passes_test(check_role_vendor)
+def change_order_status(request, order_number):
+
+    return _change_orders_status(request, order_numbers=[order_number])
+
+
+@login_required
+@user_passes_test(check_role_vendor)
+def change_orders_status(request):
+
+    return _change_orders_status(request, order_numbers=request.POST.getlist('order_numbers'))
+
+
+def _change_orders_status(request, order_numbers: list):
+
+    status = request.POST.get('status')
+    if request.method != 'POST' or status not in ORDER_STATUS_TRANSITIONS or not order_numbers:
+        return JsonResponse({'status': 'failed', 'message': 'Invalid request'}, status=400)
+
+    result = change_vendor_orders_status(vendor_id=get_vendor_from_request(request), order_numbers=order_numbers,
+                                         status=status)
+    return JsonResponse({'status': 'success', **result})
 